@@ -0,0 +1,99 @@
+"""
+Benchmark reading BMP images by :class:`image.image_bmp.ImageBmp` and :func:`cv2.imread`.
+
+Every variant is written to a temporary file and read by the own decoders of :meth:`ImageBmp.get_pixels`,
+by :meth:`ImageBmp.read`, which the program opens BMP files with, and by :func:`cv2.imread`.
+Uncompressed 24-bit and grayscale images are viewed memory-mapped, so the views aren't copied.
+"""
+
+from os import path
+from struct import pack
+from tempfile import TemporaryDirectory
+
+from common import print_environment, measure
+
+from cv2 import imread, IMREAD_UNCHANGED
+from numpy import arange, array_equal, full, stack, uint8, uint16
+from numpy.random import default_rng
+
+import image  # noqa: F401, the image package must be imported before the operations
+from image.image_bmp import ImageBmp
+
+WIDTH, HEIGHT = 4000, 3000
+
+# The length of runs of the RLE8 image
+RUN_LENGTH = 16
+
+
+def write_bmp(file_path, bits_per_pixel, data, compression=ImageBmp.BI_RGB, color_table=b"", bit_masks=b""):
+    """Write the BMP file with BITMAPINFOHEADER and the given pixel data of :attr:`WIDTH` x :attr:`HEIGHT`."""
+
+    data_offset = ImageBmp.FILE_HEADER_SIZE + ImageBmp.INFO_HEADER_SIZE + len(bit_masks) + len(color_table)
+    colors_num = len(color_table) // 4
+
+    with open(file_path, "wb") as file:
+        file.write(pack("<2sIHHI", b"BM", data_offset + len(data), 0, 0, data_offset))
+        file.write(pack("<IiiHHIIiiII", ImageBmp.INFO_HEADER_SIZE, WIDTH, HEIGHT, 1, bits_per_pixel, compression,
+                        len(data), 0, 0, colors_num, 0))
+        file.write(bit_masks + color_table + data)
+
+
+def write_variants(directory):
+    """
+    Write all benchmarked variants of the random image.
+
+    :return: The pairs of the variant name and the file path
+    :rtype: list[tuple[str, str]]
+    """
+
+    rng = default_rng(0)
+    color_table = rng.integers(0, 256, (256, 4), uint8)
+    gray_table = arange(256, dtype=uint8).repeat(4).reshape(256, 4)
+    indices = rng.integers(0, 256, (HEIGHT, WIDTH), uint8)
+
+    # Every row of RLE8 image consists of runs and ends with the end-of-line escape
+    runs = rng.integers(0, 256, (HEIGHT, WIDTH // RUN_LENGTH), uint8)
+    rle_data = b"".join(stack((full(len(row), RUN_LENGTH, uint8), row), axis=1).tobytes() + b"\0\0" for row in runs)
+
+    variants = [
+        ("24-bit", 24, rng.integers(0, 256, (HEIGHT, WIDTH, 3), uint8).tobytes(), {}),
+        ("8-bit palette", 8, indices.tobytes(), {"color_table": color_table.tobytes()}),
+        ("8-bit gray", 8, indices.tobytes(), {"color_table": gray_table.tobytes()}),
+        ("4-bit", 4, indices[:, :WIDTH // 2].tobytes(), {"color_table": color_table[:16].tobytes()}),
+        ("1-bit", 1, indices[:, :WIDTH // 8].tobytes(), {"color_table": color_table[:2].tobytes()}),
+        ("16-bit 565", 16, rng.integers(0, 2**16, (HEIGHT, WIDTH), uint16).tobytes(),
+         {"compression": ImageBmp.BI_BITFIELDS, "bit_masks": pack("<III", 0xF800, 0x07E0, 0x001F)}),
+        (f"RLE8 (runs of {RUN_LENGTH})", 8, rle_data + b"\0\1",
+         {"compression": ImageBmp.BI_RLE8, "color_table": color_table.tobytes()}),
+    ]
+
+    files = []
+    for name, bits_per_pixel, data, options in variants:
+        file_path = path.join(directory, f"{len(files)}.bmp")
+        write_bmp(file_path, bits_per_pixel, data, **options)
+        files.append((name, file_path))
+
+    return files
+
+
+def main():
+    print_environment()
+    print(f"{WIDTH}x{HEIGHT} images")
+
+    with TemporaryDirectory() as directory:
+        print(f"{'variant':<20}{'own decoder, ms':>16}{'ImageBmp.read, ms':>20}{'cv2.imread, ms':>16}")
+        for name, file_path in write_variants(directory):
+            img_data = ImageBmp.read(file_path)
+            assert array_equal(img_data, ImageBmp.open(file_path).pixels)
+            assert array_equal(img_data, imread(file_path, IMREAD_UNCHANGED))
+            del img_data
+
+            decode_time = measure(lambda: ImageBmp.open(file_path).pixels)
+            read_time = measure(ImageBmp.read, file_path)
+            imread_time = measure(imread, file_path, IMREAD_UNCHANGED)
+
+            print(f"{name:<20}{decode_time * 1e3:>16.1f}{read_time * 1e3:>20.1f}{imread_time * 1e3:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark the histogram calculation of :func:`image.analyze.histogram_calc.calc_histogram`.
+
+The per-pixel Python loop it replaced is measured on a small image and extrapolated by the number of pixels.
+"""
+
+from common import print_environment, measure
+
+from numpy import array_equal, iinfo, uint8, uint16
+from numpy.random import default_rng
+
+import image  # noqa: F401, the image package must be imported before the operations
+from image.analyze.histogram_calc import calc_histogram
+
+# The benchmarked images: (name, shape, data type)
+CASES = [
+    ("4K BGR 8-bit", (2160, 3840, 3), uint8),
+    ("24 MP BGR 8-bit", (4000, 6000, 3), uint8),
+    ("24 MP grayscale 16-bit", (4000, 6000), uint16),
+]
+
+# The shape of the image the Python loop is measured on
+LOOP_SHAPE = 256, 256
+
+
+def calc_histogram_loop(img_data, color_depth):
+    """Calculate the histogram pixel by pixel, the way it was calculated before."""
+
+    if img_data.ndim == 2:
+        histogram = [0] * color_depth
+        for row in img_data:
+            for value in row:
+                histogram[value] += 1
+
+        return {"b": histogram}
+
+    histograms = [[0] * color_depth for _ in range(3)]
+    for row in img_data:
+        for pixel in row:
+            for channel in range(3):
+                histograms[channel][pixel[channel]] += 1
+
+    return dict(zip("bgr", histograms))
+
+
+def main():
+    print_environment()
+    rng = default_rng(0)
+
+    print(f"{'image':<24}{'Python loop, s':>16}{'calc_histogram, s':>20}")
+    for name, shape, dtype in CASES:
+        img_data = rng.integers(0, iinfo(dtype).max, shape, dtype)
+
+        sample = img_data[:LOOP_SHAPE[0], :LOOP_SHAPE[1]]
+        expected = calc_histogram_loop(sample, iinfo(dtype).max + 1)
+        histogram = calc_histogram(sample)
+        assert all(array_equal(histogram[channel], expected[channel]) for channel in expected)
+
+        loop_time = measure(calc_histogram_loop, sample, iinfo(dtype).max + 1, repeat=1)
+        loop_time *= img_data.size / sample.size
+
+        print(f"{name:<24}{loop_time:>16.1f}{measure(calc_histogram, img_data):>20.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark the skeletonization methods of :meth:`operations.local.Morphology.calc_skeletonize`.
+
+Masks of random lines and ellipses are skeletonized by both :class:`operations.local.thinning.Thinning` methods
+and by the reference "Morphological" method with the 3x3 diamond structuring element.
+"""
+
+from common import print_environment, measure
+
+from cv2 import ellipse, line
+from numpy import zeros, uint8
+from numpy.random import default_rng
+
+import image  # noqa: F401, the image package must be imported before the operations
+from operations.local import Morphology
+
+HEIGHT, WIDTH = 4320, 7680
+
+METHODS = "Zhang-Suen", "Guo-Hall", "Morphological"
+
+
+def draw_lines(thickness, lines_num=60):
+    """Draw the mask of random lines of the given thickness."""
+
+    mask = zeros((HEIGHT, WIDTH), uint8)
+    rng = default_rng(0)
+
+    for _ in range(lines_num):
+        start, end = rng.integers(0, [WIDTH, HEIGHT], size=(2, 2)).tolist()
+        line(mask, start, end, 255, thickness)
+
+    return mask
+
+
+def draw_blobs(radius, coverage=0.3):
+    """Draw the mask of random ellipses with the given minor radius, which cover about the given part of it."""
+
+    mask = zeros((HEIGHT, WIDTH), uint8)
+    rng = default_rng(1)
+
+    for _ in range(max(1, int(coverage * HEIGHT * WIDTH / (3.14 * radius**2 * 2)))):
+        center = rng.integers(0, [WIDTH, HEIGHT]).tolist()
+        axes = int(radius * rng.uniform(1, 3)), radius
+        ellipse(mask, center, axes, float(rng.uniform(0, 180)), 0, 360, 255, -1)
+
+    return mask
+
+
+def main():
+    print_environment()
+    print(f"{WIDTH}x{HEIGHT} masks")
+
+    masks = [(f"lines {thickness}px", lambda thickness=thickness: draw_lines(thickness)) for thickness in (5, 20, 80)]
+    masks += [(f"blobs r={radius}", lambda radius=radius: draw_blobs(radius)) for radius in (32, 128, 512)]
+    structuring_element = Morphology.calc_structuring_element("Diamond", 3)
+
+    print(f"{'mask':<14}{'fg':>5}" + "".join(f"{method + ', s':>18}" for method in METHODS))
+    for name, draw in masks:
+        mask = draw()
+        times = [measure(Morphology.calc_skeletonize, None, method, "Isolated", structuring_element, mask, repeat=1)
+                 for method in METHODS]
+
+        print(f"{name:<14}{(mask > 0).mean():>5.0%}" + "".join(f"{time:>18.2f}" for time in times))
+
+
+if __name__ == "__main__":
+    main()
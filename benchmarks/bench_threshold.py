@@ -0,0 +1,75 @@
+"""
+Benchmark threshold binary and threshold to zero of :class:`operations.segmentation.Threshold`.
+
+The threshold is set at the middle of the range.
+The per-pixel Python loops they replaced are measured on a small image and extrapolated by the number of pixels.
+"""
+
+from types import SimpleNamespace
+
+from common import print_environment, measure
+
+from numpy import array_equal, iinfo, uint8, uint16
+from numpy.random import default_rng
+
+import image  # noqa: F401, the image package must be imported before the operations
+from operations.segmentation import Threshold
+
+# The benchmarked images: (name, shape, data type)
+CASES = [(f"{bits}-bit {megapixels} MP", (height, width), dtype)
+         for bits, dtype in ((8, uint8), (16, uint16))
+         for megapixels, (height, width) in ((1, (1000, 1000)), (12, (3000, 4000)), (50, (5000, 10000)))]
+
+# The shape of the image the Python loops are measured on
+LOOP_SHAPE = 200, 200
+
+
+def calc_threshold_binary_loop(operation, thresh_value, img_data):
+    """Calculate threshold binary pixel by pixel, the way it was calculated before."""
+
+    img_data = img_data.copy()
+    for w in range(img_data.shape[0]):
+        for h in range(img_data.shape[1]):
+            img_data[w][h] = operation.color_depth - 1 if img_data[w][h] > thresh_value else 0
+
+    return img_data
+
+
+def calc_threshold_zero_loop(operation, thresh_value, img_data):
+    """Calculate threshold to zero pixel by pixel, the way it was calculated before."""
+
+    img_data = img_data.copy()
+    for w in range(img_data.shape[0]):
+        for h in range(img_data.shape[1]):
+            if img_data[w][h] < thresh_value:
+                img_data[w][h] = 0
+
+    return img_data
+
+
+def main():
+    print_environment()
+    rng = default_rng(0)
+    methods = [("binary", Threshold.calc_threshold_binary, calc_threshold_binary_loop),
+               ("zero", Threshold.calc_threshold_zero, calc_threshold_zero_loop)]
+
+    print(f"{'image':<16}{'method':<8}{'Python loop, s':>16}{'Threshold, ms':>16}")
+    for name, shape, dtype in CASES:
+        # The operation reads only the color depth, so it's benchmarked without widgets
+        operation = SimpleNamespace(color_depth=iinfo(dtype).max + 1)
+        thresh_value = operation.color_depth // 2 - 1
+        img_data = rng.integers(0, operation.color_depth, shape, dtype)
+        sample = img_data[:LOOP_SHAPE[0], :LOOP_SHAPE[1]]
+
+        for method_name, calc, calc_loop in methods:
+            expected = calc_loop(operation, thresh_value, sample)
+            assert array_equal(calc(operation, thresh_value, sample), expected)
+
+            loop_time = measure(calc_loop, operation, thresh_value, sample, repeat=1) * img_data.size / sample.size
+            calc_time = measure(lambda: calc(operation, thresh_value, img_data))
+
+            print(f"{name:<16}{method_name:<8}{loop_time:>16.1f}{calc_time * 1e3:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Common helpers of the benchmarks.
+
+Benchmarks are run from the repository root, e.g. ``python benchmarks/bench_histogram.py``.
+"""
+
+from os import environ, path
+import platform
+import sys
+from time import perf_counter
+
+# The program imports its modules relative to src, and the constants relative to the repository root
+ROOT_PATH = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path[:0] = [ROOT_PATH, path.join(ROOT_PATH, "src")]
+
+# Operations are imported without a display
+environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2  # noqa: E402
+import numpy  # noqa: E402
+
+
+def print_environment():
+    """Print the versions and the number of OpenCV threads, which the timings depend on."""
+
+    print(f"Python {platform.python_version()}, NumPy {numpy.__version__}, OpenCV {cv2.__version__}, "
+          f"{cv2.getNumThreads()} OpenCV thread(s), {platform.machine()}")
+
+
+def measure(func, *args, repeat=3):
+    """
+    Measure the best time of several calls of the function.
+
+    :param func: The measured function
+    :type func: callable
+    :param args: The arguments of :attr:`func`
+    :param repeat: The number of calls
+    :type repeat: int
+    :return: The best time in seconds
+    :rtype: float
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func(*args)
+        times.append(perf_counter() - start)
+
+    return min(times)
@@ -1,2 +1,6 @@
 from .image import Image, ImageWindow
 from .image_bmp import ImageBmp
+from .image_raw import ImageRaw
+from .image_store import ImageStore
+from .image_viewer import ImagePyramid, ImageViewer
+from .undo_history import ImageDelta, UndoHistory
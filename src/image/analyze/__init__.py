@@ -1,4 +1,5 @@
 from .histogram import HistGraphical, HistList
+from .histogram_calc import calc_histogram, calc_cumulative_histogram, remap_histogram
 from .histogram_ui import MplCanvas
 from .intensity_profile import IntensityProfile
 from .object_features import ObjectFeatures
@@ -0,0 +1,101 @@
+from cv2 import calcHist
+from numpy import zeros, bincount, cumsum, int64
+
+# The maximum number of pixels counted by a single calcHist call.
+# calcHist accumulates counts in float32, which is exact only up to 2**24.
+MAX_PIXELS_PER_CALL = 2**24
+
+
+def _calc_channel_histogram(img_data, channel, color_depth):
+    """
+    Calculate the histogram data for one channel of the image.
+
+    8-bit and 16-bit images are counted with OpenCV calcHist
+    in bands of rows small enough to keep the counts exact.
+    Images of other data types are counted with :func:`numpy.bincount`.
+
+    :param img_data: The image data
+    :type img_data: :class:`numpy.ndarray`
+    :param channel: The channel index to count, 0 for a grayscale image
+    :type channel: int
+    :param color_depth: The number of possible tonal values
+    :type color_depth: int
+    :return: The number of pixels for each tonal value
+    :rtype: :class:`numpy.ndarray`
+    """
+
+    if img_data.dtype.itemsize > 2 or img_data.dtype.kind != 'u':
+        channel_data = img_data if len(img_data.shape) == 2 else img_data[..., channel]
+        return bincount(channel_data.ravel(), minlength=color_depth)[:color_depth]
+
+    histogram = zeros(color_depth, int64)
+    height, width = img_data.shape[:2]
+    band_height = max(1, MAX_PIXELS_PER_CALL // max(1, width))
+
+    for row in range(0, height, band_height):
+        band = img_data[row:row + band_height]
+        histogram += calcHist([band], [channel], None, [color_depth], [0, color_depth]).ravel().astype(int64)
+
+    return histogram
+
+
+def calc_histogram(img_data, color_depth=None):
+    """
+    Calculate the image histogram data.
+
+    Count the number of pixels for each tonal value
+    of every image channel without iterating over the pixels in Python.
+
+    :param img_data: The image data
+    :type img_data: :class:`numpy.ndarray`
+    :param color_depth: The number of possible tonal values, by default it's defined by the data type
+    :type color_depth: int or None
+    :return: The image histogram data for every channel: {channel_char: [number_of_pixels]}
+    :rtype: dict[str, :class:`numpy.ndarray`]
+    """
+
+    if color_depth is None:
+        color_depth = 2**(8 * img_data.dtype.itemsize)
+
+    if len(img_data.shape) == 2:
+        return {'b': _calc_channel_histogram(img_data, 0, color_depth)}
+
+    return {col: _calc_channel_histogram(img_data, i, color_depth) for i, col in enumerate("bgr")}
+
+
+def calc_cumulative_histogram(histogram):
+    """
+    Calculate the cumulative histogram.
+
+    :param histogram: The histogram data of a single channel
+    :type histogram: :class:`numpy.ndarray` or list[int]
+    :return: The cumulative histogram (empirical distribution)
+    :rtype: :class:`numpy.ndarray`
+    """
+
+    return cumsum(histogram, dtype=int64)
+
+
+def remap_histogram(histogram, lut, color_depth=None):
+    """
+    Calculate the histogram of an image after applying LUT to it.
+
+    The new histogram is derived from the original one
+    without touching the image pixels: the number of pixels
+    of every tonal value moves to the bin given by the LUT.
+
+    :param histogram: The histogram data of a single channel
+    :type histogram: :class:`numpy.ndarray` or list[int]
+    :param lut: The Lookup Table, must have an entry for every tonal value of :attr:`histogram`
+    :type lut: :class:`numpy.ndarray` or list[int]
+    :param color_depth: The number of possible tonal values after applying LUT,
+                        by default it's the same as for :attr:`histogram`
+    :type color_depth: int or None
+    :return: The histogram data of the mapped image
+    :rtype: :class:`numpy.ndarray`
+    """
+
+    if color_depth is None:
+        color_depth = len(histogram)
+
+    return bincount(lut, weights=histogram, minlength=color_depth)[:color_depth].astype(int64)
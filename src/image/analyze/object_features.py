@@ -27,7 +27,7 @@ class ObjectFeatures(QDialog, ObjectFeaturesUI):
         self.init_ui(self, parent.data.shape[0])
         self.__retranslate_ui()
 
-        _, self.img_data = threshold(parent.data.copy(), 127, 255, 0)
+        _, self.img_data = threshold(parent.data, 127, 255, 0)
         self.contours = None
         self.selected_object = None
 
@@ -1,13 +1,16 @@
-from cv2 import normalize, cvtColor, error, NORM_MINMAX
+from cv2 import normalize, cvtColor, convertScaleAbs, error, NORM_MINMAX
 from numpy import abs
-from PyQt5.QtWidgets import QLabel, QMdiSubWindow
-from PyQt5.QtCore import Qt, QPoint, QEvent, pyqtSignal
-from PyQt5.QtGui import QPainter, QPen, QPixmap, QIcon, QImage
+from PyQt5.QtWidgets import QMdiSubWindow, QScrollArea, QFrame, QStyle
+from PyQt5.QtCore import Qt, QPoint, QSize, QEvent, pyqtSignal
+from PyQt5.QtGui import QPixmap, QIcon
 
-from src.constants import BYTES_PER_PIXEL_2_BW_FORMAT, COLOR_CONVERSION_CODES
-from .analyze import HistGraphical, IntensityProfile, ObjectFeatures
+from src.constants import COLOR_CONVERSION_CODES
+from .analyze import HistGraphical, IntensityProfile, ObjectFeatures, calc_histogram, calc_cumulative_histogram
 from .modify import Rename
-from operations.point import Normalize, Posterize, ImageCalculator
+from .image_store import ImageStore
+from .image_viewer import ImageViewer
+from .undo_history import UndoHistory
+from operations.point import Normalize, Posterize, ImageCalculator, PointPipeline, apply_lut
 from operations.local import Smooth, EdgeDetection, DirectionalEdgeDetection, Sharpen, Convolve, Morphology
 from operations.segmentation import Threshold, Watershed
 from operations.classification import SVM
@@ -32,12 +35,15 @@ class Image:
         "SVM": SVM,
     }
 
+    # Operations streamed over the image data stored out of core, see :class:`image_store.ImageStore`
+    OUT_OF_CORE_OPERATIONS = ("equalize", "negation", "smooth", "edge_dt_dir", "sharpen", "morphology")
+
     def __init__(self, img_data, img_name):
         """
         Create a new image.
 
-        :param img_data: The image data.
-        :type img_data: :class:`numpy.ndarray`
+        :param img_data: The image data, stored in memory or out of core
+        :type img_data: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
         :param img_name: The name for an image
         :type img_name: str
         """
@@ -45,101 +51,170 @@ class Image:
         # Convert BGRA image to BGR
         try:
             if img_data.shape[2] == 4:
-                img_data = cvtColor(img_data, COLOR_CONVERSION_CODES["BGRA2BGR"])
+                if isinstance(img_data, ImageStore):
+                    img_data = img_data.map_tiles(
+                        lambda tile: cvtColor(tile, COLOR_CONVERSION_CODES["BGRA2BGR"]))
+                else:
+                    img_data = cvtColor(img_data, COLOR_CONVERSION_CODES["BGRA2BGR"])
         except LookupError:
             pass
         except error:
             pass
 
+        self.data_version = 0
+        self.__cache = dict()
+        self.__cache_version = 0
+        self.history = UndoHistory()
+
         self.data = img_data
-        self.subwindow = ImageWindow(img_data, img_name)
+        self.subwindow = ImageWindow(self.data, img_name)
         self.name = img_name
         self.histogram_graphical = HistGraphical(img_name)
         self.histogram_subwindows_added = False
         self.profile_subwindow_added = False
 
+    @property
+    def data(self):
+        """Get :attr:`_data`."""
+
+        return self._data
+
+    @data.setter
+    def data(self, img_data):
+        """
+        Set :attr:`_data` and mark it as changed.
+
+        :param img_data: The new image data
+        :type img_data: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
+        """
+
+        self._data = img_data
         self.__calc_color_depth()
+        self.mark_data_changed()
 
     def __calc_color_depth(self):
         """Calculate color depth of image pixel."""
 
         self.color_depth = 2**(8 * self.data.dtype.itemsize)
 
-    def __update_image_name(self, img_name):
+    def __make_data_writable(self):
         """
-        Update an image name.
+        Copy the image data on the first write.
 
-        :param img_name: The new image name
-        :type img_name: str
+        The image data may be read-only, e.g. a view of a memory-mapped file
+        or the data shared by :meth:`share_data`.
+        Such data is copied only before it's edited in place.
         """
 
-        self.name = img_name
-        self.histogram_graphical.set_title(img_name)
-        self.subwindow.set_title(img_name)
+        if not self._data.flags.writeable:
+            self._data = self._data.copy()
 
-    def __calc_single_histogram(self):
+    def share_data(self):
         """
-        Calculate the image histogram data for one channel.
+        Share the image data copy-on-write, e.g. with a dialog, a duplicate or :attr:`history`.
 
-        Count the number of pixels for each tonal value,
-        iterating through one channel of the image.
+        The image data becomes read-only and the same memory is referenced by the image and the receivers,
+        so sharing doesn't allocate the image data again.
+        Whoever edits the shared data in place must copy it first, the image does it in :meth:`__make_data_writable`.
 
-        :return: The image histogram data: {channel_char: [number_of_pixels]}
-        :rtype: dict[str, list[int]]
+        :return: The read-only image data
+        :rtype: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
         """
 
-        histogram = [0] * self.color_depth
+        if self._data.flags.writeable:
+            # The array passed to the image may be referenced elsewhere, so a read-only view of it is shared
+            if not self.is_out_of_core():
+                self._data = self._data.view()
 
-        for w in range(self.data.shape[0]):
-            for h in range(self.data.shape[1]):
-                pixel = self.data[w][h]
-                histogram[pixel] += 1
+            self._data.flags.writeable = False
 
-        return {'b': histogram}
+        return self._data
 
-    def __calc_triple_histogram(self):
+    def __get_cached(self, key, calc):
         """
-        Calculate the image histogram data for three channels.
+        Return the cached value calculated from the current image data.
 
-        Count the number of pixels for each tonal value,
-        iterating through three channels of the image.
+        The cache is tied to :attr:`data_version` and
+        is dropped as soon as the image data changes.
 
-        :return: The image histogram data: {channel_char: [number_of_pixels]}
-        :rtype: dict[str, list[int]]
+        :param key: The name of the cached value
+        :type key: str
+        :param calc: The function to calculate the value on cache miss
+        :type calc: callable
+        :return: The cached value
         """
 
-        histogram_rgb = [[0] * self.color_depth, [0] * self.color_depth, [0] * self.color_depth]
+        if self.__cache_version != self.data_version:
+            self.__cache.clear()
+            self.__cache_version = self.data_version
+
+        if key not in self.__cache:
+            self.__cache[key] = calc()
 
-        for w in range(self.data.shape[0]):
-            for h in range(self.data.shape[1]):
-                for i in range(self.data.shape[2]):
-                    pixel = self.data[w][h][i]
-                    histogram_rgb[i][pixel] += 1
+        return self.__cache[key]
 
-        return {'b': histogram_rgb[0], 'g': histogram_rgb[1], 'r': histogram_rgb[2]}
+    def __update_image_name(self, img_name):
+        """
+        Update an image name.
+
+        :param img_name: The new image name
+        :type img_name: str
+        """
+
+        self.name = img_name
+        self.histogram_graphical.set_title(img_name)
+        self.subwindow.set_title(img_name)
 
     def __apply_lut(self, lut):
         """
-        Apply LUT to the image.
+        Apply LUT to the image in place.
 
         :param lut: The Lookup Table
-        :type lut: list[int]
+        :type lut: list[int] or :class:`numpy.ndarray`
         """
 
-        if self.is_grayscale():
-            for w in range(self.data.shape[0]):
-                for h in range(self.data.shape[1]):
-                    self.data[w][h] = lut[self.data[w][h]]
+        self.__make_data_writable()
+
+        if self.is_out_of_core():
+            self.data.apply_lut(lut)
         else:
-            for w in range(self.data.shape[0]):
-                for h in range(self.data.shape[1]):
-                    for i in range(self.data.shape[2]):
-                        self.data[w][h][i] = lut[self.data[w][h][i]]
+            self._data = apply_lut(self.data, lut, inplace=True)
+
+        self.mark_data_changed()
+
+    def mark_data_changed(self):
+        """
+        Increase :attr:`data_version` to drop the data-dependent cache.
+
+        Must be called after every in-place edit of :attr:`data`,
+        reassignment of :attr:`data` calls it automatically.
+        """
+
+        self.data_version += 1
+
+    def begin_change(self):
+        """Start recording the change of the image data to :attr:`history`."""
+
+        self.history.begin(self.share_data())
+
+    def end_change(self):
+        """Finish recording the change of the image data, storing it as an undo level if the data has changed."""
+
+        self.history.commit(self.data)
+
+    def undo(self):
+        """Restore the image data before the last change."""
+
+        self.data = self.history.undo(self.data)
+
+    def redo(self):
+        """Restore the image data after the last undone change."""
+
+        self.data = self.history.redo(self.data)
 
     def update(self):
         """Update image graphical elements such as image window, histogram, etc."""
 
-        self.__calc_color_depth()
         self.subwindow.set_img_data(self.data)
 
         if self.histogram_graphical.window_is_opened:
@@ -156,6 +231,17 @@ class Image:
 
         return len(self.data.shape) == 2
 
+    def is_out_of_core(self):
+        """
+        Check if the image data is stored out of core.
+
+        ``True`` if the image data is :class:`image_store.ImageStore`, otherwise ``False``.
+
+        :rtype: bool
+        """
+
+        return isinstance(self.data, ImageStore)
+
     def change_type(self, img_type):
         """
         Change image data type.
@@ -165,53 +251,86 @@ class Image:
         """
 
         self.change_color_depth_2_uint8()
-        self.data = cvtColor(self.data, COLOR_CONVERSION_CODES[img_type])
+
+        if self.is_out_of_core():
+            self.data = self.data.map_tiles(lambda tile: cvtColor(tile, COLOR_CONVERSION_CODES[img_type]))
+        else:
+            self.data = cvtColor(self.data, COLOR_CONVERSION_CODES[img_type])
 
     def change_color_depth_2_uint8(self):
         """Convert image data type to CV_U8 in case it isn't CV_8U."""
 
-        if self.data.dtype.itemsize > 1:
+        if self.data.dtype.itemsize == 1:
+            return
+
+        if not self.is_out_of_core():
             self.data = normalize(abs(self.data), None, 0, 255, NORM_MINMAX, dtype=0)
+            return
+
+        # Stretch tiles by the global range of absolute values, as NORM_MINMAX does for the whole image
+        abs_data = self.data if self.data.dtype.kind == 'u' else self.data.map_tiles(abs)
+        abs_min, abs_max = float(abs_data.min()), float(abs_data.max())
+        alpha = 255 / (abs_max - abs_min) if abs_max > abs_min else 0
+
+        self.data = abs_data.map_tiles(lambda tile: convertScaleAbs(tile, alpha=alpha, beta=-abs_min * alpha))
 
     def calc_histogram(self):
         """
         Calculate image histogram data.
 
-        Depending on the number of channels, calculate histogram:
-
-        - for grayscale image using :meth:`__calc_single_histogram`;
-        - for color iamge using :meth:`__calc_triple_histogram`.
+        Count the number of pixels for each tonal value of every channel
+        using :func:`analyze.histogram_calc.calc_histogram`.
+        The result is cached until the image data changes and must not be modified.
 
         :return: The image histogram data for every channel: {channel_char: [number_of_pixels]}
-        :rtype: dict[str, list[int]]
+        :rtype: dict[str, :class:`numpy.ndarray`]
         """
 
-        if self.is_grayscale():
-            return self.__calc_single_histogram()
-        else:
-            return self.__calc_triple_histogram()
+        def calc():
+            if self.is_out_of_core():
+                histogram = self.data.calc_histogram(self.color_depth)
+            else:
+                histogram = calc_histogram(self.data, self.color_depth)
+
+            for channel_hist in histogram.values():
+                channel_hist.setflags(write=False)
+            return histogram
+
+        return self.__get_cached("histogram", calc)
 
     def calc_cumulative_histogram(self):
         """
         Calculate cumulative histogram.
 
+        The result is cached until the image data changes and must not be modified.
+
         :return: The cumulative histogram (empirical distribution)
-        :rtype: list[int]
+        :rtype: :class:`numpy.ndarray`
         """
 
-        hist = self.calc_histogram()['b']
+        def calc():
+            cumulative_hist = calc_cumulative_histogram(self.calc_histogram()['b'])
+            cumulative_hist.setflags(write=False)
+            return cumulative_hist
 
-        cumulative_hist = [hist[0]]
-        for i in hist[1:]:
-            cumulative_hist.append(cumulative_hist[-1] + i)
-
-        return cumulative_hist
+        return self.__get_cached("cumulative_histogram", calc)
 
     def create_hist_window(self):
         """Create a histogram plot window of the image."""
 
         self.histogram_graphical.create_histogram_plot(self.calc_histogram())
 
+    def apply_point_pipeline(self, pipeline):
+        """
+        Apply fused point operations to the image in a single pass.
+
+        :param pipeline: The pipeline of point operations
+        :type pipeline: :class:`operations.point.PointPipeline`
+        """
+
+        if not pipeline.is_identity():
+            self.__apply_lut(pipeline.lut)
+
     def equalize_histogram(self):
         """
         Perform histogram equalization:
@@ -221,29 +340,14 @@ class Image:
         - Apply LUT to the picture.
         """
 
-        lut = []
-        cumulative_hist = self.calc_cumulative_histogram()
-
-        # Find min/max values in the cumulative histogram, excluding zero as a minimum
-        ord_hist_values = sorted(set(cumulative_hist))
-        hist_min = ord_hist_values[1]
-        hist_max = ord_hist_values[-1]
-
-        for i in cumulative_hist:
-            # Normalize cumulative sum to 0-255 range
-            try:
-                equalized_val = abs(int(((i - hist_min) * 255) / (hist_max - hist_min)))
-            except ZeroDivisionError:
-                return
-            lut.append(equalized_val)
-
-        self.__apply_lut(lut)
+        pipeline = PointPipeline(self.color_depth, self.calc_histogram()['b'])
+        self.apply_point_pipeline(pipeline.equalization())
 
     def calc_negation(self):
         """Perform image negation."""
 
-        lut = [self.color_depth - i - 1 for i in range(self.color_depth)]
-        self.__apply_lut(lut)
+        pipeline = PointPipeline(self.color_depth)
+        self.apply_point_pipeline(pipeline.negation())
 
     def rename(self):
         """Open rename dialog window to change the image name."""
@@ -287,7 +391,7 @@ class Image:
         :rtype: tuple or None
         """
 
-        images = {img.name: img.data for img in images}
+        images = {img.name: img.share_data() for img in images}
         calculator = ImageCalculator(images)
 
         if calculator.exec():
@@ -304,8 +408,8 @@ class Image:
         :rtype: tuple or None
         """
 
-        images = {img.name: img.data for img in images}
-        panorama = ImagePanorama(images.copy())
+        images = {img.name: img.share_data() for img in images}
+        panorama = ImagePanorama(images)
 
         if panorama.exec():
             return panorama.pano_data, panorama.pano_name
@@ -316,15 +420,18 @@ class ImageWindow(QMdiSubWindow):
 
     closed = pyqtSignal()
 
+    # The maximum size of the visible part of the image, larger images are scrolled
+    MAX_VIEWPORT_SIZE = QSize(1600, 900)
+
     def __init__(self, img_data, img_name, parent=None):
         """
         Create a new image sub-window.
 
         Create an empty :class:`intensity_profile.IntensityProfile` object.
-        Load image to window. Set icon and window size.
+        Load image to :class:`image_viewer.ImageViewer` within a scroll area. Set icon and window size.
 
         :param img_data: The image data.
-        :type img_data: :class:`numpy.ndarray`
+        :type img_data: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
         :param img_name: The name of an image
         :type img_name: str
         """
@@ -335,14 +442,19 @@ class ImageWindow(QMdiSubWindow):
         self.intensity_profile = IntensityProfile(img_name)
         self._title = img_name
 
-        self.image_label = QLabel()
-        self.pixmap = None
         self.scale = 1
+        self.viewer = ImageViewer(img_data)
+        self.viewer.installEventFilter(self)
+
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setFrameShape(QFrame.NoFrame)
+        self.scroll_area.setWidget(self.viewer)
+
         self.update_window()
         self.update_icon()
 
         self.setWindowFlags(Qt.WindowMinimizeButtonHint)
-        self.setWidget(self.image_label)
+        self.setWidget(self.scroll_area)
         self.setWindowTitle(self._title)
 
         self.points = [QPoint(0, 0), QPoint(0, 0)]
@@ -392,10 +504,11 @@ class ImageWindow(QMdiSubWindow):
         Set an image data and update the image window
 
         :param img_data: The image data to set
-        :type img_data: :class:`numpy.ndarray`
+        :type img_data: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
         """
 
         self._data = img_data
+        self.viewer.set_img_data(img_data)
         self.update_window()
         self.update_icon()
 
@@ -437,23 +550,24 @@ class ImageWindow(QMdiSubWindow):
         """
         Update image sub-window.
 
-        Convert image data to :class:`PyQt5.QtGui.QImage`.
-        Scale the image based on :attr:`scale`
-        Load the image to the sub-window.
+        Scale the image in :attr:`viewer` based on :attr:`scale`, it renders only the visible tiles.
+        Fit the sub-window to the scaled image, but not larger than :attr:`MAX_VIEWPORT_SIZE`,
+        the rest of the image is scrolled.
         """
 
-        height, width = self._data.shape[:2]
+        self.viewer.set_scale(self.scale)
 
-        if self._is_grayscale():
-            pixel_bytes = self._data.dtype.itemsize
-            image = QImage(self._data, width, height, width, BYTES_PER_PIXEL_2_BW_FORMAT[pixel_bytes])
-        else:
-            image = QImage(self._data, width, height, 3 * width, QImage.Format_BGR888)
+        image_size = self.viewer.get_scaled_size()
+        viewport_size = image_size.boundedTo(self.MAX_VIEWPORT_SIZE)
+
+        # Leave room for the scroll bars, if the image doesn't fit
+        scroll_bar_extent = self.style().pixelMetric(QStyle.PM_ScrollBarExtent)
+        if viewport_size.width() < image_size.width():
+            viewport_size += QSize(0, scroll_bar_extent)
+        if viewport_size.height() < image_size.height():
+            viewport_size += QSize(scroll_bar_extent, 0)
 
-        self.pixmap = QPixmap(image)
-        self.pixmap = self.pixmap.scaled(self.scale * self.pixmap.size())
-        self.setFixedSize(self.pixmap.width() + 15, self.pixmap.height() + 35)
-        self.image_label.setPixmap(self.pixmap.copy())
+        self.setFixedSize(viewport_size.width() + 15, viewport_size.height() + 35)
 
     def update_icon(self):
         """
@@ -492,25 +606,19 @@ class ImageWindow(QMdiSubWindow):
         event_type = event.type()
 
         # Draw a line only for not scaled image
-        if self.scale == 1:
+        if obj is self.viewer and self.scale == 1:
 
             if event_type == QEvent.MouseButtonPress:
                 point = event.pos()
 
                 if event.button() == Qt.LeftButton and point.y() > -1:
                     self.points[0] = point
-                    self.image_label.setPixmap(self.pixmap.copy())
+                    self.viewer.set_line(None)
                     self.drawing = True
 
             elif event_type == QEvent.MouseMove and self.drawing:
                 self.points[1] = self.__validate_point(event.pos())
-                self.image_label.setPixmap(self.pixmap.copy())
-
-                painter = QPainter(self.image_label.pixmap())
-                painter.setPen(QPen(Qt.yellow, 1, Qt.SolidLine))
-                painter.drawLine(self.points[0], self.points[1])
-
-                self.update()
+                self.viewer.set_line(self.points)
 
             elif event_type == QEvent.MouseButtonRelease:
                 if event.button() == Qt.LeftButton and self.drawing:
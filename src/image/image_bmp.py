@@ -1,14 +1,185 @@
-from numpy import array, flip
+from os import path, remove, replace
+from struct import pack
+
+from cv2 import LUT, merge, imread, IMREAD_UNCHANGED
+from numpy import (frombuffer, ascontiguousarray, asarray, memmap, zeros, empty, arange, stack, repeat, cumsum, delete,
+                   concatenate, pad, rint, unpackbits, flatnonzero, searchsorted, uint8, uint16, uint32, int64,
+                   all as np_all)
 
 
 class ImageBmp:
     """The ImageBmp class implements manual reading of image data for .bmp images."""
 
-    def __init__(self, raw):
-        """Create a new BMP image."""
+    # Compression methods supported by the reader
+    BI_RGB = 0
+    BI_RLE8 = 1
+    BI_RLE4 = 2
+    BI_BITFIELDS = 3
+    BI_ALPHABITFIELDS = 6
+
+    # The size of the OS/2 BITMAPCOREHEADER, which has 16-bit dimensions and 3-byte color table entries
+    CORE_HEADER_SIZE = 12
+
+    # The sizes of the file header and the BITMAPINFOHEADER written by :meth:`save`
+    FILE_HEADER_SIZE = 14
+    INFO_HEADER_SIZE = 40
+
+    # The approximate size of the pixel data written to the file at once, in bytes
+    SAVE_CHUNK_SIZE = 2**22
+
+    # Map bits per pixel of uncompressed images to default bit masks: (red, green, blue, alpha)
+    DEFAULT_BIT_MASKS = {
+        16: (0x7C00, 0x03E0, 0x001F, 0),
+        32: (0x00FF0000, 0x0000FF00, 0x000000FF, 0),
+    }
+
+    def __init__(self, raw, copy=True):
+        """
+        Create a new BMP image.
+
+        :param raw: The raw content of the file
+        :type raw: bytes or :class:`numpy.memmap`
+        :param copy: The flag to copy pixel data to a new contiguous array,
+                     otherwise :attr:`pixels` is a read-only view of :attr:`raw` whenever possible
+        :type copy: bool
+        """
 
         self._raw = raw
-        self._pixels = self.get_pixels()
+        self._copy = copy
+        self._pixels = None
+
+    @classmethod
+    def open(cls, file_path):
+        """
+        Open the BMP file memory-mapped.
+
+        The file isn't read into memory, the pixel data is a read-only view
+        of the mapped file, so only the accessed pages become resident.
+
+        :param file_path: The path to the BMP file
+        :type file_path: str
+        :return: The BMP image
+        :rtype: :class:`ImageBmp`
+        """
+
+        return cls(memmap(file_path, uint8, mode="r"), copy=False)
+
+    @classmethod
+    def read(cls, file_path):
+        """
+        Read the pixel data of the BMP file the fastest way.
+
+        The image is opened memory-mapped by :meth:`open`, the formats OpenCV decodes faster
+        (see :meth:`is_decoded_faster_by_opencv`) are read with :func:`cv2.imread`,
+        the own decoders are used for the rest and for the files OpenCV can't read.
+
+        :param file_path: The path to the BMP file
+        :type file_path: str
+        :return: The image pixel data
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        bmp_image = cls.open(file_path)
+
+        if bmp_image.is_decoded_faster_by_opencv():
+            img_data = imread(file_path, IMREAD_UNCHANGED)
+            if img_data is not None:
+                return img_data
+
+        return bmp_image.pixels
+
+    @classmethod
+    def save(cls, file_path, img_data, progress=None):
+        """
+        Save the image to the BMP file, streaming the pixel data in chunks of rows.
+
+        Only one chunk of rows is converted and padded in memory at a time,
+        so :attr:`img_data` may be a :class:`numpy.memmap` or any other array-like object
+        supporting row slicing, without loading it entirely.
+        The image is written to a temporary file next to :attr:`file_path`, which replaces the file once it's written,
+        so the image data may be mapped from the file being overwritten,
+        and the file is kept intact if saving fails or is canceled.
+        Grayscale images are saved as 8-bit with a grayscale color table,
+        3 and 4-channel images as 24-bit and 32-bit.
+        Images with higher color depth are scaled to the 0-255 range by the global minimum and maximum
+        of their absolute values, the same way as :meth:`image.Image.change_color_depth_2_uint8` does.
+
+        :param file_path: The path to the BMP file
+        :type file_path: str
+        :param img_data: The image data
+        :type img_data: :class:`numpy.ndarray`
+        :param progress: The function called after every chunk with the number of written rows and all rows,
+                         saving is canceled if it returns ``False``
+        :type progress: callable or None
+        :return: ``True`` if the image is saved, ``False`` if saving is canceled
+        :rtype: bool
+        """
+
+        height, width = img_data.shape[:2]
+        channels_num = img_data.shape[2] if len(img_data.shape) == 3 else 1
+        assert channels_num in (1, 3, 4), AssertionError("Can't save image with such number of channels")
+
+        color_table = b""
+        if channels_num == 1:
+            color_table = arange(256, dtype=uint8).repeat(4).reshape(256, 4)
+            color_table[:, 3] = 0
+            color_table = color_table.tobytes()
+
+        row_size = (8 * channels_num * width + 31) // 32 * 4
+        data_offset = cls.FILE_HEADER_SIZE + cls.INFO_HEADER_SIZE + len(color_table)
+        file_size = data_offset + row_size * height
+        assert file_size < 2**32, AssertionError("The image is too large for BMP format")
+
+        file_header = pack("<2sIHHI", b"BM", file_size, 0, 0, data_offset)
+        info_header = pack("<IiiHHIIiiII", cls.INFO_HEADER_SIZE, width, height, 1, 8 * channels_num,
+                           cls.BI_RGB, row_size * height, 0, 0, 0, 0)
+
+        chunk_rows = max(1, cls.SAVE_CHUNK_SIZE // row_size)
+        buffer = zeros((min(chunk_rows, height), row_size), uint8)
+
+        # Scale absolute values to 8 bits with their global range, as every chunk must be scaled the same way
+        is_signed = img_data.dtype.kind != "u"
+        alpha, beta = 1, 0
+        if img_data.dtype != uint8:
+            chunks = [img_data[row:row + chunk_rows] for row in range(0, height, chunk_rows)]
+            ranges = [(float(chunk.min()), float(chunk.max())) for chunk in
+                      (abs(chunk) if is_signed else chunk for chunk in chunks)]
+            img_min, img_max = min(low for low, _ in ranges), max(high for _, high in ranges)
+            alpha = 255 / (img_max - img_min) if img_max > img_min else 0
+            beta = -img_min * alpha
+
+        # The existing file is replaced only once the whole image is written
+        temp_file_path = file_path + ".tmp"
+        is_canceled = False
+
+        try:
+            with open(temp_file_path, "wb") as file:
+                file.write(file_header + info_header + color_table)
+
+                # BMP rows are stored bottom-up, so chunks are written from the last one
+                for chunk_end in range(height, 0, -chunk_rows):
+                    chunk_start = max(0, chunk_end - chunk_rows)
+                    chunk = img_data[chunk_start:chunk_end][::-1]
+
+                    if chunk.dtype != uint8:
+                        chunk = rint((abs(chunk) if is_signed else chunk) * alpha + beta)
+
+                    rows = buffer[:chunk_end - chunk_start]
+                    rows[:, :width * channels_num] = chunk.reshape(len(chunk), -1)
+                    file.write(rows.data)
+
+                    if progress is not None and progress(height - chunk_start, height) is False:
+                        is_canceled = True
+                        break
+
+            if not is_canceled:
+                replace(temp_file_path, file_path)
+                return True
+        finally:
+            if path.exists(temp_file_path):
+                remove(temp_file_path)
+
+        return False
 
     @staticmethod
     def get_type(max_pixel_value):
@@ -43,83 +214,482 @@ class ImageBmp:
             return 1
         return bits_per_pixel // 8
 
+    @staticmethod
+    def is_grayscale_table(color_table):
+        """
+        Check if all entries of the color table are shades of gray.
+
+        :param color_table: The color table entries in BGR order
+        :type color_table: :class:`numpy.ndarray`
+        :rtype: bool
+        """
+
+        return bool(np_all(color_table[:, 0] == color_table[:, 1]) and np_all(color_table[:, 1] == color_table[:, 2]))
+
     @property
     def pixels(self):
-        """Get :attr:`_pixels`."""
+        """Get :attr:`_pixels`, the pixel data is extracted by :meth:`get_pixels` on the first access."""
+
+        if self._pixels is None:
+            self._pixels = self.get_pixels()
 
         return self._pixels
 
+    def __read_int(self, start, size, signed=False):
+        """
+        Read a little-endian integer from the raw content.
+
+        :param start: The offset of the first byte
+        :type start: int
+        :param size: The number of bytes
+        :type size: int
+        :param signed: The flag to read a signed integer
+        :type signed: bool
+        :rtype: int
+        """
+
+        return int.from_bytes(bytes(self._raw[start:start + size]), byteorder="little", signed=signed)
+
     def get_data_offset(self):
         """Return the starting address of the byte where is the pixel array (image data)."""
 
-        return int.from_bytes(self._raw[10:14], byteorder="little")
+        return self.__read_int(10, 4)
+
+    def get_header_size(self):
+        """Return the size of the DIB header, which defines its version."""
+
+        return self.__read_int(14, 4)
+
+    def is_core_header(self):
+        """Check if the image has the OS/2 BITMAPCOREHEADER."""
+
+        return self.get_header_size() == self.CORE_HEADER_SIZE
 
     def get_bits_per_pixel(self):
         """Return the number of bits per pixel (color depth)."""
 
-        return int.from_bytes(self._raw[28:30], byteorder="little")
+        if self.is_core_header():
+            return self.__read_int(24, 2)
+
+        return self.__read_int(28, 2)
 
     def get_width(self):
         """Return the bitmap image width in pixels."""
 
-        return int.from_bytes(self._raw[18:22], byteorder="little")
+        if self.is_core_header():
+            return self.__read_int(18, 2)
+
+        return self.__read_int(18, 4, signed=True)
 
     def get_height(self):
-        """Return the bitmap image height in pixels."""
+        """Return the bitmap image height in pixels. Negative height means top-down row order."""
+
+        if self.is_core_header():
+            return self.__read_int(20, 2)
+
+        return self.__read_int(22, 4, signed=True)
+
+    def is_top_down(self):
+        """Check if the pixel rows are stored from top to bottom."""
 
-        return int.from_bytes(self._raw[22:26], byteorder="little")
+        return self.get_height() < 0
 
     def get_image_compression(self):
         """Return the used compression method. 0 - most common BI_RGB."""
 
-        return int.from_bytes(self._raw[30:34], byteorder="little")
+        if self.is_core_header():
+            return self.BI_RGB
+
+        return self.__read_int(30, 4)
 
     def get_image_size(self):
         """Return the size of the raw bitmap data."""
 
-        return int.from_bytes(self._raw[34:38], byteorder="little")
+        if self.is_core_header():
+            return 0
+
+        return self.__read_int(34, 4)
+
+    def get_colors_used(self):
+        """Return the number of colors in the color table, 0 means the default 2^n."""
+
+        if self.is_core_header():
+            return 0
+
+        return self.__read_int(46, 4)
 
     def get_color_table(self):
-        """Get the color table for the 8-bit and lower image."""
+        """
+        Get the color table for the 8-bit and lower image.
+
+        :return: The color table entries in BGR order, ``None`` if there is no color table
+        :rtype: :class:`numpy.ndarray` or None
+        """
 
         bits_per_pixel = self.get_bits_per_pixel()
-        if bits_per_pixel <= 8:
-            return self._raw[54:self.get_data_offset()]
-        else:
-            return 0
+        if bits_per_pixel > 8:
+            return None
+
+        entry_size = 3 if self.is_core_header() else 4
+        table_start = 14 + self.get_header_size()
+        colors_num = self.get_colors_used() or 2**bits_per_pixel
+
+        # Some files declare more colors than fit in front of the pixel array
+        colors_num = min(colors_num, (self.get_data_offset() - table_start) // entry_size)
+        if colors_num <= 0:
+            return None
+
+        table = frombuffer(self._raw, uint8, count=colors_num * entry_size, offset=table_start)
+
+        return table.reshape(colors_num, entry_size)[:, :3]
+
+    def get_bit_masks(self):
+        """
+        Return the bit masks of color channels for 16-bit and 32-bit images.
+
+        :return: The bit masks: (red, green, blue, alpha)
+        :rtype: tuple[int]
+        """
+
+        compression = self.get_image_compression()
+
+        if compression == self.BI_BITFIELDS:
+            return self.__read_int(54, 4), self.__read_int(58, 4), self.__read_int(62, 4), 0
+        elif compression == self.BI_ALPHABITFIELDS or self.get_header_size() >= 56:
+            masks = self.__read_int(54, 4), self.__read_int(58, 4), self.__read_int(62, 4), self.__read_int(66, 4)
+            if compression == self.BI_ALPHABITFIELDS:
+                return masks
+
+            # The uncompressed V3+ header keeps only the alpha mask meaningful
+            return self.DEFAULT_BIT_MASKS[self.get_bits_per_pixel()][:3] + masks[3:]
+
+        return self.DEFAULT_BIT_MASKS[self.get_bits_per_pixel()]
+
+    def is_decoded_faster_by_opencv(self):
+        """
+        Check if :func:`cv2.imread` decodes the image faster than :meth:`get_pixels`.
+
+        OpenCV expands RLE runs, color tables and 16-bit pixels in a single native pass,
+        while uncompressed 24 and 32-bit pixel arrays are viewed without decoding,
+        grayscale color tables are mapped to a single channel with the only LUT
+        and 1-bit indices are unpacked by NumPy faster than OpenCV does.
+        Both give the same pixel data.
+        """
+
+        bits_per_pixel = self.get_bits_per_pixel()
+
+        if self.get_image_compression() in (self.BI_RLE8, self.BI_RLE4) or bits_per_pixel == 16:
+            return True
+
+        color_table = self.get_color_table()
+
+        return bits_per_pixel > 1 and color_table is not None and not self.is_grayscale_table(color_table)
+
+    def get_row_size(self):
+        """Return the size of a single row of the pixel array in bytes, including padding to 4 bytes."""
+
+        return (self.get_bits_per_pixel() * self.get_width() + 31) // 32 * 4
 
     def get_raw_pixel_data(self):
         """Return the raw pixel data of the image."""
 
         return self._raw[self.get_data_offset():]
 
+    def __get_lines(self, dtype=uint8):
+        """
+        View the uncompressed pixel array straight from the raw buffer.
+
+        :param dtype: The data type of the array items, little-endian
+        :return: The pixel array rows in file order, including padding
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        height = abs(self.get_height())
+        data_start = self.get_data_offset()
+        row_size = self.get_row_size()
+
+        assert len(self._raw) >= data_start + row_size * height, AssertionError("The pixel data is truncated")
+
+        items_per_row = row_size // dtype().itemsize
+        lines = frombuffer(self._raw, dtype, count=items_per_row * height, offset=data_start)
+
+        return lines.reshape(height, items_per_row)
+
+    def __decode_indices(self):
+        """
+        Unpack the color table indices of the uncompressed 1, 2, 4 or 8-bit image.
+
+        Every byte holds 8/n indices of n bits, the leftmost pixel in the high-order bits.
+
+        :return: The color table indices in file row order
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        bits_per_pixel = self.get_bits_per_pixel()
+        width = self.get_width()
+        lines = self.__get_lines()
+
+        if bits_per_pixel == 8:
+            return lines[:, :width]
+
+        lines = lines[:, :(width * bits_per_pixel + 7) // 8]
+
+        if bits_per_pixel == 1:
+            return unpackbits(lines, axis=1, count=width)
+
+        # Extract the indices of the same position within all bytes at once
+        pixels_per_byte = 8 // bits_per_pixel
+        indices = empty(lines.shape + (pixels_per_byte,), uint8)
+        for i in range(pixels_per_byte):
+            indices[:, :, i] = (lines >> (8 - bits_per_pixel * (i + 1))) & (2**bits_per_pixel - 1)
+
+        return indices.reshape(len(lines), -1)[:, :width]
+
+    def __decode_rle(self):
+        """
+        Decode the color table indices of the RLE8 or RLE4 compressed image.
+
+        The stream consists of 2-byte tokens: encoded runs (count, value) and escapes (0, code).
+        Only escapes (end of line, end of bitmap, delta, absolute mode) change the position sequentially,
+        so they are walked in Python, while all encoded runs between them are expanded at once.
+        Skipped pixels (delta and end-of-line escapes) are left as index 0.
+
+        :return: The color table indices in file row order
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        is_rle4 = self.get_image_compression() == self.BI_RLE4
+        width = self.get_width()
+        height = abs(self.get_height())
+        data = self.get_raw_pixel_data()
+        tokens = frombuffer(data, uint8, count=len(data) // 2 * 2).reshape(-1, 2)
+
+        run_lengths = tokens[:, 0].astype(int64)
+        run_ends = cumsum(run_lengths)
+        escapes = flatnonzero(run_lengths == 0)
+
+        indices = zeros(height * width, uint8)
+
+        # Segments of successive encoded runs: (first token, last token + 1, row number, x of the first run)
+        segments = []
+        x = y = token = 0
+
+        while token < len(tokens) and y < height:
+            next_escape = searchsorted(escapes, token)
+            escape = int(escapes[next_escape]) if next_escape < len(escapes) else len(tokens)
+
+            if escape > token:
+                segments.append((token, escape, y, x))
+                x += int(run_ends[escape - 1] - run_ends[token] + run_lengths[token])
+
+            if escape >= len(tokens):
+                break
+
+            code = int(tokens[escape, 1])
+            token = escape + 1
+
+            if code == 0:
+                x, y = 0, y + 1
+            elif code == 1:
+                break
+            elif code == 2:
+                assert token < len(tokens), AssertionError("The delta escape is truncated")
+                x, y = x + int(tokens[token, 0]), y + int(tokens[token, 1])
+                token += 1
+
+            # Absolute mode: 'code' literal pixels padded to a word boundary
+            else:
+                bytes_num = (code + 1) // 2 if is_rle4 else code
+                assert token + (bytes_num + 1) // 2 <= len(tokens), AssertionError("The absolute run is truncated")
+
+                literal = tokens[token:token + (bytes_num + 1) // 2].ravel()[:bytes_num]
+                token += (bytes_num + 1) // 2
+
+                if is_rle4:
+                    literal = stack((literal >> 4, literal & 0x0F), axis=1).ravel()
+
+                literal = literal[:max(0, min(code, width - x))]
+                indices[y * width + x:y * width + x + len(literal)] = literal
+                x += code
+
+        if segments:
+            self.__expand_runs(indices, width, tokens, segments, is_rle4)
+
+        return indices.reshape(height, width)
+
+    @staticmethod
+    def __expand_runs(indices, width, tokens, segments, is_rle4):
+        """
+        Write all encoded runs of the RLE image.
+
+        The values of all runs are repeated by their lengths at once,
+        then every segment is copied to its row as a single slice clipped at the end of the row.
+
+        :param indices: The flat color table indices to write to
+        :type indices: :class:`numpy.ndarray`
+        :param width: The image width
+        :type width: int
+        :param tokens: The 2-byte tokens of the stream
+        :type tokens: :class:`numpy.ndarray`
+        :param segments: The segments of successive encoded runs: (first token, last token + 1, row number, x)
+        :type segments: list[tuple[int]]
+        :param is_rle4: The flag of RLE4 compression
+        :type is_rle4: bool
+        """
+
+        first, last = (asarray(column, int64) for column in list(zip(*segments))[:2])
+
+        # Segments are separated by escapes, so the run tokens are marked by the difference of their bounds
+        marks = zeros(len(tokens) + 1, int64)
+        marks[first] = 1
+        marks[last] = -1
+        runs = tokens[cumsum(marks[:-1]) > 0]
+        run_lengths = runs[:, 0].astype(int64)
+
+        if is_rle4:
+            # RLE4 runs alternate the high-order and low-order index of the value,
+            # odd runs expand to an extra index, which is deleted
+            pairs_nums = (run_lengths + 1) // 2
+            pairs = repeat(runs[:, 1], pairs_nums)
+            values = stack((pairs >> 4, pairs & 0x0F), axis=1).ravel()
+            values = delete(values, (2 * cumsum(pairs_nums) - 1)[run_lengths % 2 == 1])
+        else:
+            values = repeat(runs[:, 1], run_lengths)
+
+        segment_ends = cumsum(run_lengths)[cumsum(last - first) - 1]
+        segment_starts = concatenate(([0], segment_ends[:-1]))
+
+        for (_, _, row, x), start, end in zip(segments, segment_starts.tolist(), segment_ends.tolist()):
+            length = min(end - start, width - x)
+            if length > 0:
+                indices[row * width + x:row * width + x + length] = values[start:start + length]
+
+    def __decode_bitfields(self):
+        """
+        Decode the 16-bit or 32-bit image with channels defined by bit masks.
+
+        Every channel is extracted with its mask and its bits are aligned to 8-bit values,
+        the same way as OpenCV does, e.g. 5-bit 31 becomes 248.
+
+        :return: The image data in file row order with 3 channels, or 4 if the alpha mask is set
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        bits_per_pixel = self.get_bits_per_pixel()
+        assert bits_per_pixel in (16, 32), AssertionError("Bit fields are defined only for 16 and 32-bit images")
+
+        values = self.__get_lines(uint16 if bits_per_pixel == 16 else uint32)[:, :self.get_width()]
+        red_mask, green_mask, blue_mask, alpha_mask = self.get_bit_masks()
+        masks = [blue_mask, green_mask, red_mask] + ([alpha_mask] if alpha_mask else [])
+
+        pixels = zeros(values.shape + (len(masks),), uint8)
+
+        for channel, mask in enumerate(masks):
+            if not mask:
+                continue
+
+            # Align the highest bit of the channel with the highest bit of a byte
+            shift = mask.bit_length() - 8
+            channel_data = values & mask
+
+            if shift >= 0:
+                pixels[:, :, channel] = channel_data >> shift
+            else:
+                pixels[:, :, channel] = channel_data << -shift
+
+        return pixels
+
+    def __expand_palette(self, indices):
+        """
+        Map the color table indices to pixel values through the color table.
+
+        The indices are mapped with OpenCV LUT, every channel with its own column of the color table.
+        A grayscale color table gives a one-channel image,
+        the identity grayscale table keeps the indices as they are.
+
+        :param indices: The color table indices
+        :type indices: :class:`numpy.ndarray`
+        :return: The image data
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        color_table = self.get_color_table()
+
+        if color_table is None:
+            return indices
+
+        if self.is_grayscale_table(color_table):
+            gray_lut = color_table[:, 0]
+            if len(gray_lut) == 256 and np_all(gray_lut == arange(256)):
+                return indices
+
+            return LUT(indices, self.__pad_color_table(gray_lut))
+
+        # Map every channel with its own column of the color table
+        return LUT(merge([indices] * 3), self.__pad_color_table(color_table).reshape(256, 1, 3))
+
+    @staticmethod
+    def __pad_color_table(color_table):
+        """
+        Pad the color table to 256 entries, repeating the last one for indices outside the table.
+
+        :param color_table: The color table entries
+        :type color_table: :class:`numpy.ndarray`
+        :return: The color table suitable for OpenCV LUT
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        pad_width = [(0, 256 - len(color_table))] + [(0, 0)] * (color_table.ndim - 1)
+
+        return ascontiguousarray(pad(color_table, pad_width, mode="edge"))
+
     def get_pixels(self):
         """
         Extract pixel data from the image and shape it.
 
+        Supported formats:
+
+        - uncompressed 1, 2, 4, 8-bit images with color table, 16, 24, 32-bit images;
+        - RLE8 and RLE4 compressed images;
+        - BI_BITFIELDS and BI_ALPHABITFIELDS 16 and 32-bit images;
+        - bottom-up and top-down row order.
+
+        Uncompressed 8, 24, 32-bit pixel arrays are viewed straight from the raw buffer,
+        the row padding and the bottom-up row order are handled with strided views,
+        so the only copy made is the final contiguous image data, if :attr:`_copy` is set.
+        Other formats are decoded with vectorized operations on the whole pixel array.
+
         :return: The image pixel data
         """
 
-        assert self.get_image_compression() == 0, AssertionError("Can't read compressed image")
-
+        compression = self.get_image_compression()
+        bits_per_pixel = self.get_bits_per_pixel()
         width = self.get_width()
-        height = self.get_height()
-        data_start = self.get_data_offset()
-        channels_num = self.get_channels_num(self.get_bits_per_pixel())
 
-        padding = width & 3
-        data_end = data_start + (width * height * 3) + (height * padding)
+        assert width > 0 and self.get_height() != 0, AssertionError("The image has no pixels")
 
-        data = array(list(self._raw[data_start:data_end]))
-        lines = data.reshape(height, -1)
-        img_data_type = self.get_type(data.max())
+        if compression in (self.BI_RLE8, self.BI_RLE4):
+            assert bits_per_pixel == (8 if compression == self.BI_RLE8 else 4), \
+                AssertionError("The RLE compression doesn't match the color depth")
+            pixels = self.__expand_palette(self.__decode_rle())
+
+        elif compression in (self.BI_BITFIELDS, self.BI_ALPHABITFIELDS) or bits_per_pixel == 16:
+            pixels = self.__decode_bitfields()
 
-        if channels_num == 1:
-            # BMP pixel data stores in reversed order
-            pixels = flip(lines, 0)
         else:
-            # Reshape multi-channel image to a 2D array,
-            # where each element has an array of pixel value for each channel
-            pixels = array([line[:width * channels_num].reshape(width, channels_num) for line in reversed(lines)])
+            assert compression == self.BI_RGB, AssertionError("Can't read compressed image")
+            assert bits_per_pixel in (1, 2, 4, 8, 24, 32), AssertionError("Can't read image with such color depth")
+
+            if bits_per_pixel <= 8:
+                pixels = self.__expand_palette(self.__decode_indices())
+            else:
+                channels_num = self.get_channels_num(bits_per_pixel)
+
+                # Skip the row padding and split every row into pixels of several channels
+                pixels = self.__get_lines()[:, :width * channels_num].reshape(-1, width, channels_num)
+
+        # BMP pixel data stores in reversed order, unless the height is negative
+        if not self.is_top_down():
+            pixels = pixels[::-1]
 
-        return pixels.astype(img_data_type)
+        return ascontiguousarray(pixels) if self._copy else pixels
@@ -0,0 +1,94 @@
+from json import load
+
+from numpy import memmap, dtype
+
+
+class ImageRaw:
+    """
+    The ImageRaw class implements memory-mapped reading of headerless raw images.
+
+    The image layout is described by a sidecar JSON descriptor
+    stored next to the image file with an additional '.json' extension, e.g.:
+    ``{"width": 4096, "height": 3072, "channels": 1, "dtype": "uint16", "offset": 0}``
+    """
+
+    # Map descriptor keys to their default values, None marks a required key
+    DESCRIPTOR_KEYS = {
+        "width": None,
+        "height": None,
+        "channels": 1,
+        "dtype": "uint8",
+        "offset": 0,
+    }
+
+    def __init__(self, file_path):
+        """
+        Create a new raw image.
+
+        :param file_path: The path to the raw image file
+        :type file_path: str
+        """
+
+        self._file_path = file_path
+        self._descriptor = self.read_descriptor(self.get_descriptor_path(file_path))
+        self._pixels = self.get_pixels()
+
+    @staticmethod
+    def get_descriptor_path(file_path):
+        """Return the path to the sidecar descriptor of the raw image."""
+
+        return file_path + ".json"
+
+    @classmethod
+    def read_descriptor(cls, descriptor_path):
+        """
+        Read and validate the sidecar descriptor.
+
+        :param descriptor_path: The path to the descriptor file
+        :type descriptor_path: str
+        :return: The image layout with defaults for the missing optional keys
+        :rtype: dict
+        """
+
+        with open(descriptor_path) as file:
+            descriptor = load(file)
+
+        layout = dict()
+        for key, default in cls.DESCRIPTOR_KEYS.items():
+            assert key in descriptor or default is not None, AssertionError(f"The descriptor has no '{key}'")
+            layout[key] = descriptor.get(key, default)
+
+        assert layout["channels"] in (1, 3, 4), AssertionError("The number of channels must be 1, 3 or 4")
+        assert dtype(layout["dtype"]).kind == 'u', AssertionError("The data type must be unsigned integer")
+
+        return layout
+
+    @property
+    def pixels(self):
+        """Get :attr:`_pixels`."""
+
+        return self._pixels
+
+    def get_pixels(self):
+        """
+        Map the pixel data of the file.
+
+        The pixel data is a read-only :class:`numpy.memmap` view of the file.
+        Data stored in non-native byte order is converted into memory.
+
+        :return: The image pixel data
+        """
+
+        layout = self._descriptor
+        shape = (layout["height"], layout["width"])
+
+        if layout["channels"] > 1:
+            shape += (layout["channels"],)
+
+        data_type = dtype(layout["dtype"])
+        pixels = memmap(self._file_path, data_type, mode="r", offset=layout["offset"], shape=shape)
+
+        if not data_type.isnative:
+            pixels = pixels.astype(data_type.newbyteorder("="))
+
+        return pixels
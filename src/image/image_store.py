@@ -0,0 +1,390 @@
+from atexit import register
+from collections import deque
+from gc import collect
+from os import close, remove
+from tempfile import mkstemp
+
+from cv2 import resize, INTER_AREA
+from numpy import memmap, ndarray, array, concatenate, dtype as data_type
+
+from operations.point import apply_lut
+from operations.local.tiling import Tiling
+from .analyze import calc_histogram
+
+
+class ImageStore:
+    """
+    The ImageStore class implements an out-of-core image, which doesn't have to fit into memory.
+
+    The pixel data is kept in a temporary file mapped to memory, or in the opened file mapped read-only,
+    and it's processed in tiles of full rows, so only a few tiles are resident at a time.
+    The tile height is either given or derived from the memory budget,
+    which limits the size of tiles processed at once, input and output together.
+
+    The store provides the part of the :class:`numpy.ndarray` interface used by the program,
+    e.g. :attr:`shape`, :attr:`dtype`, :attr:`flags`, slicing, :meth:`min` and :meth:`max`.
+    Local operations are streamed over the store by :class:`operations.local.tiling.Tiling`.
+    """
+
+    # The default number of bytes of tiles processed at once
+    MEMORY_BUDGET = 2**28
+
+    # The maximum number of bytes of opened image data kept in memory, larger images are stored on disk
+    RESIDENT_LIMIT = 2**30
+
+    # The temporary files, which were still mapped when their stores were closed, they are removed at exit
+    _pending_removals = set()
+
+    def __init__(self, shape, dtype, tile_rows=None, memory_budget=None, directory=None):
+        """
+        Create a new store filled with zeros.
+
+        :param shape: The image shape: (height, width) or (height, width, channels)
+        :type shape: tuple[int]
+        :param dtype: The image data type
+        :type dtype: :class:`numpy.dtype` or str
+        :param tile_rows: The number of rows of a tile, by default it's derived from :attr:`memory_budget`
+        :type tile_rows: int or None
+        :param memory_budget: The number of bytes of tiles processed at once, by default it's :attr:`MEMORY_BUDGET`
+        :type memory_budget: int or None
+        :param directory: The directory of the temporary file, by default it's the system temporary directory
+        :type directory: str or None
+        """
+
+        assert len(shape) in (2, 3), AssertionError("The image must have 2 or 3 dimensions")
+
+        file_descriptor, self._file_path = mkstemp(suffix=".store", dir=directory)
+        close(file_descriptor)
+
+        self._data = memmap(self._file_path, data_type(dtype), mode="w+", shape=tuple(shape))
+        self._directory = directory
+        self.memory_budget = memory_budget or self.MEMORY_BUDGET
+        self.tile_rows = tile_rows or self.calc_tile_rows()
+
+    def __del__(self):
+        """Remove the temporary file once the store isn't referenced anymore."""
+
+        self.close()
+
+    @classmethod
+    def from_array(cls, img_data, tile_rows=None, memory_budget=None, directory=None):
+        """
+        Create a new store with a copy of the image data, copied tile by tile.
+
+        :param img_data: The image data, e.g. :class:`numpy.memmap` of the opened file
+        :type img_data: :class:`numpy.ndarray` or :class:`ImageStore`
+        :return: The new store
+        :rtype: :class:`ImageStore`
+
+        Other parameters are the same as for :class:`ImageStore`.
+        """
+
+        store = cls(img_data.shape, img_data.dtype, tile_rows, memory_budget, directory)
+
+        for _, _, target in store.split():
+            store._data[target] = img_data[target]
+
+        return store
+
+    @classmethod
+    def from_memmap(cls, img_data, tile_rows=None, memory_budget=None, directory=None):
+        """
+        Create a new read-only store backed by the memory-mapped file, without copying it.
+
+        The file isn't modified or removed by the store. The store is read-only,
+        so the image copies it into a temporary file by :meth:`copy` only before it's edited in place.
+
+        :param img_data: The memory-mapped image data, e.g. :class:`numpy.memmap` of the opened file or its view
+        :type img_data: :class:`numpy.ndarray`
+        :return: The new store
+        :rtype: :class:`ImageStore`
+
+        Other parameters are the same as for :class:`ImageStore`.
+        """
+
+        assert len(img_data.shape) in (2, 3), AssertionError("The image must have 2 or 3 dimensions")
+
+        store = cls.__new__(cls)
+        store._file_path = None
+        store._data = img_data.view()
+        store._data.flags.writeable = False
+        store._directory = directory
+        store.memory_budget = memory_budget or cls.MEMORY_BUDGET
+        store.tile_rows = tile_rows or store.calc_tile_rows()
+
+        return store
+
+    @staticmethod
+    def is_memory_mapped(img_data):
+        """
+        Check if the image data is a memory-mapped file or a view of it, e.g. pixels of the opened BMP image.
+
+        :param img_data: The image data
+        :type img_data: :class:`numpy.ndarray`
+        :rtype: bool
+        """
+
+        while isinstance(img_data, ndarray):
+            if isinstance(img_data, memmap):
+                return True
+
+            img_data = img_data.base
+
+        return False
+
+    @property
+    def shape(self):
+        """Get the image shape."""
+
+        return self._data.shape
+
+    @property
+    def dtype(self):
+        """Get the image data type."""
+
+        return self._data.dtype
+
+    @property
+    def nbytes(self):
+        """Get the number of bytes of the image data."""
+
+        return self._data.nbytes
+
+    @property
+    def flags(self):
+        """Get the flags of the mapped image data, the store is read-only if ``flags.writeable`` is ``False``."""
+
+        return self._data.flags
+
+    @property
+    def file_path(self):
+        """Get :attr:`_file_path`, the path to the temporary file of the store, ``None`` if it's backed by a memmap."""
+
+        return self._file_path
+
+    def __getitem__(self, key):
+        """Get the part of the image data, e.g. ``store[top:bottom]``, as a view of the file."""
+
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        """Set the part of the image data, e.g. ``store[top:bottom] = tile``."""
+
+        self._data[key] = value
+
+    def calc_tile_rows(self):
+        """
+        Calculate the number of rows of a tile fitting into :attr:`memory_budget`.
+
+        A tile is processed by every worker at once, a tile and its result are resident together.
+
+        :rtype: int
+        """
+
+        row_bytes = max(1, self.nbytes // max(1, self.shape[0]))
+
+        return max(1, self.memory_budget // (2 * Tiling.get_workers_num() * row_bytes))
+
+    def split(self, halo=0):
+        """
+        Split the image into tiles of :attr:`tile_rows` full rows.
+
+        :param halo: The number of neighbouring rows to extend every tile with
+        :type halo: int
+        :return: The tiles as triples of row slices: the tile with the halo in the image,
+                 the tile without the halo within the former, and the tile without the halo in the image
+        :rtype: list[tuple[slice, slice, slice]]
+        """
+
+        height = self.shape[0]
+
+        tiles = []
+        for row in range(0, height, self.tile_rows):
+            row_end = min(row + self.tile_rows, height)
+            top = max(0, row - halo)
+            bottom = min(height, row_end + halo)
+
+            tiles.append((slice(top, bottom), slice(row - top, row_end - top), slice(row, row_end)))
+
+        return tiles
+
+    def map_tiles(self, func, halo=0):
+        """
+        Apply the operation to the image tile by tile, streaming the result into a new store.
+
+        Tiles are processed on the thread pool of :class:`operations.local.tiling.Tiling`,
+        at most one tile per worker is in flight to keep memory bounded.
+
+        :param func: The operation, takes the image data and returns the result of the same height and width
+        :type func: callable
+        :param halo: The number of neighbouring rows the operation reads around a row
+        :type halo: int
+        :return: The new store with the result of the operation
+        :rtype: :class:`ImageStore`
+        """
+
+        executor = Tiling.get_executor()
+        workers_num = Tiling.get_workers_num()
+
+        def process(tile):
+            source, inner, _ = tile
+            return func(self._data[source])[inner]
+
+        out_store = None
+        pending = deque()
+
+        def write_next():
+            nonlocal out_store
+            (_, _, target), future = pending.popleft()
+            result = future.result()
+
+            if out_store is None:
+                out_store = ImageStore(self.shape[:2] + result.shape[2:], result.dtype,
+                                       memory_budget=self.memory_budget, directory=self._directory)
+
+            out_store._data[target] = result
+
+        for tile in self.split(halo):
+            pending.append((tile, executor.submit(process, tile)))
+
+            if len(pending) >= workers_num:
+                write_next()
+
+        while pending:
+            write_next()
+
+        return out_store
+
+    def apply_lut(self, lut):
+        """
+        Apply LUT to the image in place, tile by tile.
+
+        :param lut: The Lookup Table
+        :type lut: list[int] or :class:`numpy.ndarray`
+        """
+
+        for _, _, target in self.split():
+            apply_lut(self._data[target], lut, inplace=True)
+
+    def calc_histogram(self, color_depth=None):
+        """
+        Calculate the image histogram data, summing the histograms of tiles.
+
+        :param color_depth: The number of possible tonal values, by default it's defined by the data type
+        :type color_depth: int or None
+        :return: The image histogram data for every channel: {channel_char: [number_of_pixels]}
+        :rtype: dict[str, :class:`numpy.ndarray`]
+        """
+
+        histogram = None
+        for _, _, target in self.split():
+            tile_histogram = calc_histogram(self._data[target], color_depth)
+
+            if histogram is None:
+                histogram = tile_histogram
+            else:
+                for channel, channel_hist in tile_histogram.items():
+                    histogram[channel] += channel_hist
+
+        return histogram
+
+    def min(self):
+        """Get the minimum pixel value."""
+
+        return min(self._data[target].min() for _, _, target in self.split())
+
+    def max(self):
+        """Get the maximum pixel value."""
+
+        return max(self._data[target].max() for _, _, target in self.split())
+
+    def copy(self):
+        """
+        Copy the store tile by tile.
+
+        :rtype: :class:`ImageStore`
+        """
+
+        return self.from_array(self, self.tile_rows, self.memory_budget, self._directory)
+
+    def to_array(self):
+        """
+        Load the whole image data into memory.
+
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        return array(self._data)
+
+    def downscale(self, size):
+        """
+        Downscale the image into memory, e.g. to show it, resizing tile by tile.
+
+        :param size: The width and the height of the downscaled image
+        :type size: tuple[int, int]
+        :return: The downscaled image data
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        width, height = size
+        rows_num = self.shape[0]
+        out_tile_rows = max(1, self.tile_rows * height // rows_num)
+
+        tiles = []
+        for out_row in range(0, height, out_tile_rows):
+            out_row_end = min(out_row + out_tile_rows, height)
+            rows = slice(out_row * rows_num // height, out_row_end * rows_num // height)
+
+            tiles.append(resize(self._data[rows], (width, out_row_end - out_row), interpolation=INTER_AREA))
+
+        return concatenate(tiles)
+
+    def flush(self):
+        """Write the changes of the image data to the file."""
+
+        self._data.flush()
+
+    def close(self):
+        """
+        Remove the temporary file of the store.
+
+        The file is unmapped once views of it, e.g. tiles, aren't referenced anymore.
+        """
+
+        if getattr(self, "_data", None) is None:
+            return
+
+        self._data = None
+
+        if self._file_path is None:
+            return
+
+        # The file mapped by remaining views can't be removed on Windows, so it's removed at exit
+        try:
+            remove(self._file_path)
+        except OSError:
+            if not ImageStore._pending_removals:
+                register(ImageStore.remove_pending_files)
+
+            ImageStore._pending_removals.add(self._file_path)
+
+    @classmethod
+    def remove_pending_files(cls):
+        """
+        Remove the temporary files, which couldn't be removed when their stores were closed.
+
+        It's called at exit, once unreferenced views of the files are collected.
+        The files, which are still mapped, are kept pending.
+        """
+
+        collect()
+
+        for file_path in list(cls._pending_removals):
+            try:
+                remove(file_path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+
+            cls._pending_removals.discard(file_path)
@@ -0,0 +1,270 @@
+from collections import OrderedDict
+from math import floor, log2
+
+from cv2 import resize, INTER_AREA
+from numpy import ascontiguousarray, empty
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import Qt, QRect, QRectF, QSize
+from PyQt5.QtGui import QPainter, QPen, QPixmap, QImage
+
+from src.constants import BYTES_PER_PIXEL_2_BW_FORMAT
+
+
+class ImagePyramid:
+    """
+    The ImagePyramid class implements a multi-resolution tile pyramid of the image.
+
+    Level 0 is the image itself, stored in memory or out of core, every next level is downscaled twice.
+    The pyramid is built tile by tile on the first access: tiles of level 0 are read from the image data,
+    a tile of a coarser level is downscaled from its four child tiles of the previous level,
+    so only the tiles around the shown part of the image are built, whatever the image size.
+    The data of downscaled tiles and the tile pixmaps are kept in caches,
+    the least recently used ones are dropped once the caches are full.
+    """
+
+    # The width and height of a tile
+    TILE_SIZE = 256
+
+    # The maximum number of cached tile pixmaps
+    TILE_CACHE_SIZE = 512
+
+    # The maximum number of cached downscaled tiles, the children of shown tiles are reused on zooming out
+    TILE_DATA_CACHE_SIZE = 1024
+
+    def __init__(self, img_data):
+        """
+        Create a new pyramid.
+
+        :param img_data: The image data
+        :type img_data: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
+        """
+
+        self._img_data = img_data
+        self._tiles = OrderedDict()
+        self._tiles_data = OrderedDict()
+
+        # Levels are downscaled until the whole level fits into a single tile
+        self._level_shapes = [img_data.shape[:2]]
+        while max(self._level_shapes[-1]) > self.TILE_SIZE:
+            height, width = self._level_shapes[-1]
+            self._level_shapes.append((max(1, height // 2), max(1, width // 2)))
+
+        self.levels_num = len(self._level_shapes)
+
+    def get_level_shape(self, level):
+        """
+        Get the height and the width of the pyramid level.
+
+        :param level: The level number, 0 for the image itself
+        :type level: int
+        :rtype: tuple[int, int]
+        """
+
+        return self._level_shapes[level]
+
+    def get_tile_data(self, level, row, col):
+        """
+        Get the image data of the tile, downscaling it from the child tiles on a cache miss.
+
+        :param level: The level number
+        :type level: int
+        :param row: The tile row
+        :type row: int
+        :param col: The tile column
+        :type col: int
+        :return: The tile data, a view of the image data for level 0
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        tile_size = self.TILE_SIZE
+        top, left = row * tile_size, col * tile_size
+
+        if level == 0:
+            return self._img_data[top:top + tile_size, left:left + tile_size]
+
+        key = level, row, col
+        if key in self._tiles_data:
+            self._tiles_data.move_to_end(key)
+            return self._tiles_data[key]
+
+        height, width = self.get_level_shape(level)
+        child_height, child_width = self.get_level_shape(level - 1)
+        tile_height, tile_width = min(tile_size, height - top), min(tile_size, width - left)
+
+        # The part of the previous level covered by the tile, assembled from up to four child tiles
+        block = empty((min(2 * tile_height, child_height - 2 * top), min(2 * tile_width, child_width - 2 * left))
+                      + self._img_data.shape[2:], self._img_data.dtype)
+        for i in range(0, len(block), tile_size):
+            for j in range(0, block.shape[1], tile_size):
+                child = self.get_tile_data(level - 1, 2 * row + i // tile_size, 2 * col + j // tile_size)
+                block[i:i + tile_size, j:j + tile_size] = child[:len(block) - i, :block.shape[1] - j]
+
+        self._tiles_data[key] = resize(block, (tile_width, tile_height), interpolation=INTER_AREA)
+        if len(self._tiles_data) > self.TILE_DATA_CACHE_SIZE:
+            self._tiles_data.popitem(last=False)
+
+        return self._tiles_data[key]
+
+    def choose_level(self, scale):
+        """
+        Choose the coarsest level, which still has at least as many pixels as displayed with the scale.
+
+        :param scale: The display scale of the image
+        :type scale: float
+        :rtype: int
+        """
+
+        if scale >= 1:
+            return 0
+
+        return min(self.levels_num - 1, floor(log2(1 / scale)))
+
+    def get_tile(self, level, row, col):
+        """
+        Get the pixmap of the tile, converting it on a cache miss.
+
+        :param level: The level number
+        :type level: int
+        :param row: The tile row
+        :type row: int
+        :param col: The tile column
+        :type col: int
+        :rtype: :class:`PyQt5.QtGui.QPixmap`
+        """
+
+        key = level, row, col
+
+        if key in self._tiles:
+            self._tiles.move_to_end(key)
+            return self._tiles[key]
+
+        tile = ascontiguousarray(self.get_tile_data(level, row, col))
+        height, width = tile.shape[:2]
+
+        if len(tile.shape) == 2:
+            pixel_bytes = tile.dtype.itemsize
+            image = QImage(tile, width, height, pixel_bytes * width, BYTES_PER_PIXEL_2_BW_FORMAT[pixel_bytes])
+        else:
+            image = QImage(tile, width, height, 3 * width, QImage.Format_BGR888)
+
+        self._tiles[key] = QPixmap.fromImage(image)
+        if len(self._tiles) > self.TILE_CACHE_SIZE:
+            self._tiles.popitem(last=False)
+
+        return self._tiles[key]
+
+
+class ImageViewer(QWidget):
+    """
+    The ImageViewer class implements rendering of the scaled image from :class:`ImagePyramid`.
+
+    The widget has the size of the scaled image and it's meant to be placed into a scroll area,
+    which repaints only its visible part.
+    Only the tiles of the nearest pyramid level intersecting the visible part are drawn,
+    so the cost of zooming and panning depends on the viewport size, not on the image size.
+    """
+
+    def __init__(self, img_data, parent=None):
+        """
+        Create a new image viewer.
+
+        :param img_data: The image data
+        :type img_data: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
+        """
+
+        super().__init__(parent)
+
+        self.scale = 1
+        self.line = None
+        self.set_img_data(img_data)
+
+    def set_img_data(self, img_data):
+        """
+        Set the image data, dropping the pyramid of the previous one.
+
+        :param img_data: The image data
+        :type img_data: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
+        """
+
+        self._img_size = QSize(img_data.shape[1], img_data.shape[0])
+        self.pyramid = ImagePyramid(img_data)
+        self.set_scale(self.scale)
+
+    def set_scale(self, scale):
+        """
+        Set the display scale of the image and resize the widget to the scaled image.
+
+        :param scale: The display scale
+        :type scale: float
+        """
+
+        self.scale = scale
+        self.setFixedSize(self.get_scaled_size())
+        self.update()
+
+    def get_scaled_size(self):
+        """Get the size of the image shown with :attr:`scale`."""
+
+        return QSize(max(1, round(self._img_size.width() * self.scale)),
+                     max(1, round(self._img_size.height() * self.scale)))
+
+    def set_line(self, line):
+        """
+        Set the line drawn over the image, e.g. of the intensity profile.
+
+        :param line: The begin-end points in the widget coordinates, ``None`` to hide the line
+        :type line: list[:class:`.PyQt5.QtCore.QPoint`] or None
+        """
+
+        # Repaint only the area around the previous and the new line, the tiles below are cached pixmaps
+        dirty_area = self.__get_line_area(self.line).united(self.__get_line_area(line))
+
+        self.line = line and list(line)
+        self.update(dirty_area)
+
+    @staticmethod
+    def __get_line_area(line):
+        """
+        Get the area covered by the line with its pen.
+
+        :param line: The begin-end points, or ``None``
+        :type line: list[:class:`.PyQt5.QtCore.QPoint`] or None
+        :rtype: :class:`PyQt5.QtCore.QRect`
+        """
+
+        if not line:
+            return QRect()
+
+        return QRect(line[0], line[1]).normalized().adjusted(-2, -2, 2, 2)
+
+    def paintEvent(self, event):
+        """Draw the tiles of the nearest pyramid level intersecting the repainted area."""
+
+        level = self.pyramid.choose_level(self.scale)
+        tile_size = ImagePyramid.TILE_SIZE
+        level_height, level_width = self.pyramid.get_level_shape(level)
+
+        # The level may be slightly smaller than the scaled image after rounding down, so it's stretched to the widget
+        scale_x = self.width() / level_width
+        scale_y = self.height() / level_height
+
+        # The tiles intersecting the repainted area
+        area = event.rect()
+        first_row = max(0, int(area.top() / scale_y) // tile_size)
+        last_row = min((level_height - 1) // tile_size, int(area.bottom() / scale_y) // tile_size)
+        first_col = max(0, int(area.left() / scale_x) // tile_size)
+        last_col = min((level_width - 1) // tile_size, int(area.right() / scale_x) // tile_size)
+
+        painter = QPainter(self)
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                pixmap = self.pyramid.get_tile(level, row, col)
+                target = QRectF(col * tile_size * scale_x, row * tile_size * scale_y,
+                                pixmap.width() * scale_x, pixmap.height() * scale_y)
+                painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+
+        if self.line:
+            painter.setPen(QPen(Qt.yellow, 1, Qt.SolidLine))
+            painter.drawLine(*self.line)
+
+        painter.end()
@@ -0,0 +1,361 @@
+from os import close, remove
+from tempfile import mkstemp
+from zlib import compress, decompress
+
+from numpy import frombuffer, array_equal
+
+from .image_store import ImageStore
+
+
+class ImageDelta:
+    """
+    The ImageDelta class stores the difference between two states of the image data.
+
+    The image is split into square tiles and only the tiles, which differ from the other state, are stored,
+    compressed with zlib. The whole image data is stored, if the shape or the data type differs,
+    the image data stored out of core is referenced then instead, as it's on disk already.
+    Compressed tiles can be spilled to a temporary file to release memory.
+    """
+
+    # The width and height of a tile
+    TILE_SIZE = 256
+
+    # The zlib compression level, the fastest one
+    COMPRESSION_LEVEL = 1
+
+    def __init__(self, shape, dtype, tiles, store=None):
+        """
+        Create a new delta.
+
+        :param shape: The shape of the stored state
+        :type shape: tuple[int]
+        :param dtype: The data type of the stored state
+        :type dtype: :class:`numpy.dtype`
+        :param tiles: The compressed tiles of the stored state by their (rows, cols) slices,
+                      the only tile covers the whole image data if it's stored entirely
+        :type tiles: list[tuple[tuple[slice, slice], bytes]]
+        :param store: The read-only stored state, if it's stored out of core entirely, instead of the tiles
+        :type store: :class:`image_store.ImageStore` or None
+        """
+
+        self.shape = shape
+        self.dtype = dtype
+        self._tiles = tiles
+        self._store = store
+        self._file_path = None
+        self._sizes = None
+
+    def __del__(self):
+        """Remove the spilled file once the delta isn't referenced anymore."""
+
+        self.drop()
+
+    @classmethod
+    def calc(cls, state, other_state):
+        """
+        Calculate the delta restoring :attr:`state` from :attr:`other_state`.
+
+        :param state: The image data to store
+        :type state: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
+        :param other_state: The image data the delta is applied to
+        :type other_state: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
+        :return: The delta, ``None`` if the states are equal
+        :rtype: :class:`ImageDelta` or None
+        """
+
+        if state.shape != other_state.shape or state.dtype != other_state.dtype:
+            # The store isn't loaded into memory, it's kept read-only, so the image copies it before editing
+            if isinstance(state, ImageStore):
+                state.flags.writeable = False
+                return cls(state.shape, state.dtype, [], state)
+
+            whole = slice(None), slice(None)
+            return cls(state.shape, state.dtype, [(whole, cls.compress(state[:]))])
+
+        height, width = state.shape[:2]
+
+        tiles = []
+        for row in range(0, height, cls.TILE_SIZE):
+            for col in range(0, width, cls.TILE_SIZE):
+                key = slice(row, row + cls.TILE_SIZE), slice(col, col + cls.TILE_SIZE)
+                tile = state[key]
+
+                if not array_equal(tile, other_state[key]):
+                    tiles.append((key, cls.compress(tile)))
+
+        if not tiles:
+            return None
+
+        return cls(state.shape, state.dtype, tiles)
+
+    @classmethod
+    def compress(cls, tile):
+        """Compress the tile of the image data."""
+
+        return compress(tile.tobytes(), cls.COMPRESSION_LEVEL)
+
+    @property
+    def nbytes(self):
+        """Get the number of bytes of the compressed tiles kept in memory, 0 once spilled."""
+
+        if self._tiles is None:
+            return 0
+
+        return sum(len(data) for _, data in self._tiles)
+
+    def is_spilled(self):
+        """
+        Check if the compressed tiles are spilled to the file, the referenced store is on disk as well.
+
+        :rtype: bool
+        """
+
+        return self._tiles is None or self._store is not None
+
+    def spill(self, directory=None):
+        """
+        Move the compressed tiles to a temporary file.
+
+        :param directory: The directory of the file, by default it's the system temporary directory
+        :type directory: str or None
+        """
+
+        if self.is_spilled():
+            return
+
+        file_descriptor, self._file_path = mkstemp(suffix=".delta", dir=directory)
+        close(file_descriptor)
+
+        with open(self._file_path, "wb") as file:
+            for _, data in self._tiles:
+                file.write(data)
+
+        self._sizes = [(key, len(data)) for key, data in self._tiles]
+        self._tiles = None
+
+    def get_tiles(self):
+        """
+        Get the compressed tiles, reading them from the file if they're spilled.
+
+        :rtype: list[tuple[tuple[slice, slice], bytes]]
+        """
+
+        if not self.is_spilled():
+            return self._tiles
+
+        tiles = []
+        with open(self._file_path, "rb") as file:
+            for key, size in self._sizes:
+                tiles.append((key, file.read(size)))
+
+        return tiles
+
+    def apply(self, other_state):
+        """
+        Restore the stored state from the other one.
+
+        :param other_state: The image data the delta was calculated against, it isn't modified
+        :type other_state: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
+        :return: The restored image data
+        :rtype: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
+        """
+
+        if self._store is not None:
+            return self._store
+
+        tiles = self.get_tiles()
+
+        if other_state.shape != self.shape or other_state.dtype != self.dtype:
+            (_, data), = tiles
+            return frombuffer(decompress(data), self.dtype).reshape(self.shape).copy()
+
+        state = other_state.copy()
+        for key, data in tiles:
+            tile_shape = state[key].shape
+            state[key] = frombuffer(decompress(data), self.dtype).reshape(tile_shape)
+
+        return state
+
+    def drop(self):
+        """Release the compressed tiles or the referenced store and remove the spilled file."""
+
+        self._tiles = None
+        self._store = None
+
+        if getattr(self, "_file_path", None) is not None:
+            remove(self._file_path)
+            self._file_path = None
+
+
+class UndoHistory:
+    """
+    The UndoHistory class implements multi-level undo and redo of the image data changes.
+
+    A change is recorded between :meth:`begin` and :meth:`commit` as :class:`ImageDelta`,
+    so a level costs only the changed tiles of the image, compressed, and a rejected change costs nothing.
+    Levels over :attr:`memory_cap` are spilled to disk starting from the oldest one,
+    levels over :attr:`max_levels` are dropped.
+    """
+
+    # The default number of bytes of levels kept in memory
+    MEMORY_CAP = 2**28
+
+    # The default maximum number of undo levels
+    MAX_LEVELS = 20
+
+    def __init__(self, memory_cap=None, max_levels=None, directory=None):
+        """
+        Create a new empty history.
+
+        :param memory_cap: The number of bytes of levels kept in memory, by default it's :attr:`MEMORY_CAP`
+        :type memory_cap: int or None
+        :param max_levels: The maximum number of undo levels, by default it's :attr:`MAX_LEVELS`
+        :type max_levels: int or None
+        :param directory: The directory of spilled levels, by default it's the system temporary directory
+        :type directory: str or None
+        """
+
+        self.memory_cap = memory_cap or self.MEMORY_CAP
+        self.max_levels = max_levels or self.MAX_LEVELS
+        self._directory = directory
+
+        self._undo_deltas = []
+        self._redo_deltas = []
+        self._pending = None
+
+    @property
+    def nbytes(self):
+        """Get the number of bytes of levels kept in memory."""
+
+        return sum(delta.nbytes for delta in self._undo_deltas + self._redo_deltas)
+
+    def begin(self, img_data):
+        """
+        Start recording the change of the image data.
+
+        The image data is referenced, not copied, so it must be read-only,
+        e.g. shared by :meth:`image.Image.share_data`.
+
+        :param img_data: The image data before the change
+        :type img_data: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
+        """
+
+        assert not img_data.flags.writeable, AssertionError("The image data must be read-only")
+
+        self._pending = img_data
+
+    def commit(self, img_data):
+        """
+        Finish recording the change, storing the delta between the states as a new undo level.
+
+        The redo levels are dropped. Nothing is stored if the image data hasn't changed.
+
+        :param img_data: The image data after the change
+        :type img_data: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
+        """
+
+        pending, self._pending = self._pending, None
+
+        if pending is None or pending is img_data:
+            return
+
+        delta = ImageDelta.calc(pending, img_data)
+        if delta is None:
+            return
+
+        self._undo_deltas.append(delta)
+        self.__drop(self._redo_deltas)
+        self.__limit()
+
+    def cancel(self):
+        """Stop recording the change without storing it."""
+
+        self._pending = None
+
+    def can_undo(self):
+        """
+        Check if there is a level to undo.
+
+        :rtype: bool
+        """
+
+        return bool(self._undo_deltas)
+
+    def can_redo(self):
+        """
+        Check if there is a level to redo.
+
+        :rtype: bool
+        """
+
+        return bool(self._redo_deltas)
+
+    def undo(self, img_data):
+        """
+        Restore the image data before the last change, moving the change to the redo levels.
+
+        :param img_data: The current image data
+        :type img_data: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
+        :return: The restored image data
+        :rtype: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
+        """
+
+        return self.__move(self._undo_deltas, self._redo_deltas, img_data)
+
+    def redo(self, img_data):
+        """
+        Restore the image data after the last undone change, moving the change back to the undo levels.
+
+        :param img_data: The current image data
+        :type img_data: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
+        :return: The restored image data
+        :rtype: :class:`numpy.ndarray` or :class:`image_store.ImageStore`
+        """
+
+        return self.__move(self._redo_deltas, self._undo_deltas, img_data)
+
+    def clear(self):
+        """Drop all levels."""
+
+        self._pending = None
+        self.__drop(self._undo_deltas)
+        self.__drop(self._redo_deltas)
+
+    def __move(self, source_deltas, target_deltas, img_data):
+        """Apply the last delta of :attr:`source_deltas` and store the reverse one in :attr:`target_deltas`."""
+
+        assert source_deltas, AssertionError("The history has no level to restore")
+
+        delta = source_deltas.pop()
+        restored = delta.apply(img_data)
+        delta.drop()
+
+        reverse_delta = ImageDelta.calc(img_data, restored)
+        if reverse_delta is not None:
+            target_deltas.append(reverse_delta)
+            self.__limit()
+
+        return restored
+
+    def __limit(self):
+        """Drop the oldest undo levels over :attr:`max_levels`, spill the oldest levels over :attr:`memory_cap`."""
+
+        while len(self._undo_deltas) > self.max_levels:
+            self._undo_deltas.pop(0).drop()
+
+        nbytes = self.nbytes
+        for delta in self._undo_deltas + self._redo_deltas:
+            if nbytes <= self.memory_cap:
+                break
+
+            nbytes -= delta.nbytes
+            delta.spill(self._directory)
+
+    @staticmethod
+    def __drop(deltas):
+        """Drop the levels and clear the list."""
+
+        for delta in deltas:
+            delta.drop()
+
+        deltas.clear()
@@ -2,12 +2,12 @@ from os import path
 from functools import wraps
 
 from cv2 import imread, imwrite
-from PyQt5.QtWidgets import QMainWindow, QApplication, QFileDialog, QMessageBox
+from PyQt5.QtWidgets import QMainWindow, QApplication, QFileDialog, QMessageBox, QProgressDialog
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 
 from main_ui import MainWindowUI
-from image import Image, ImageWindow, ImageBmp
+from image import Image, ImageWindow, ImageBmp, ImageRaw, ImageStore
 from style_sheet import load_style_sheet
 
 
@@ -27,7 +27,7 @@ def validate_active_image(method):
 class MainWindow(QMainWindow, MainWindowUI):
     """The MainWindow class represents the main window and its behavior."""
 
-    SUPPORTED_FILE_EXTENSIONS = ["bmp", "jpeg", "jpg", "png", "tiff", "tif"]
+    SUPPORTED_FILE_EXTENSIONS = ["bmp", "jpeg", "jpg", "png", "tiff", "tif", "raw"]
 
     def __init__(self, parent=None):
         """Create a new main window."""
@@ -39,7 +39,8 @@ class MainWindow(QMainWindow, MainWindowUI):
         # File menu actions
         self.action_open.triggered.connect(self.open_images)
         self.action_save.triggered.connect(self.save_image)
-        self.action_undo.triggered.connect(self.restore_backup)
+        self.action_undo.triggered.connect(self.undo)
+        self.action_redo.triggered.connect(self.redo)
         self.action_cascade.triggered.connect(self.central_mdi_area.cascadeSubWindows)
         self.action_exit.triggered.connect(self.close)
 
@@ -84,7 +85,6 @@ class MainWindow(QMainWindow, MainWindowUI):
 
         self.images = dict()
         self.active_image = None
-        self.image_backup = None
 
     def __browse_files(self):
         """
@@ -99,8 +99,9 @@ class MainWindow(QMainWindow, MainWindowUI):
                                                                              "JPEG files (*.jpeg *.jpg);;"
                                                                              "Portable Network Graphics (*.png);;"
                                                                              "TIFF files (*.tiff *.tif);;"
+                                                                             "Raw files (*.raw);;"
                                                                              "Supported files (*.bmp *.jpeg *.jpg "
-                                                                             "*.png *.tiff *.tif);;")
+                                                                             "*.png *.tiff *.tif *.raw);;")
         return files_paths
 
     def __add_image_window(self, image):
@@ -129,6 +130,7 @@ class MainWindow(QMainWindow, MainWindowUI):
             self.set_color_depth(None)
             self.__update_zoom_actions()
 
+        self.__update_history_actions()
         self.__show_image_status()
 
     def __activate_last_image(self):
@@ -151,12 +153,11 @@ class MainWindow(QMainWindow, MainWindowUI):
         """
 
         self.images = {window: img for window, img in self.images.items() if img != image}
+        image.history.clear()
         self.__activate_last_image()
+        self.__update_history_actions()
         self.__show_image_status()
 
-        if self.image_backup and image.subwindow == self.image_backup[0]:
-            self.__clear_backup()
-
     def __set_checked_image_type(self, is_grayscale):
         """
         Check action with a given image type.
@@ -171,20 +172,37 @@ class MainWindow(QMainWindow, MainWindowUI):
         else:
             actions[1].setChecked(True)
 
-    def __make_image_backup(self):
-        """Store copy of active image data."""
+    def __update_history_actions(self):
+        """Update undo and redo actions access depending on the history of the active image."""
+
+        history = self.active_image.history if self.active_image else None
+        self.action_undo.setEnabled(bool(history and history.can_undo()))
+        self.action_redo.setEnabled(bool(history and history.can_redo()))
 
-        self.image_backup = [window for window, img in self.images.items() if img == self.active_image]
-        self.image_backup.append(self.active_image.data.copy())
-        self.action_undo.setEnabled(True)
+    def __finish_image_change(self):
+        """Record the change of the active image data in its history, if it's recorded, and update the image."""
+
+        self.active_image.end_change()
+        self.active_image.update()
         self.set_image_type(None)
         self.set_color_depth(None)
+        self.__update_history_actions()
+
+    def __validate_in_core(self, images):
+        """
+        Check if the images are stored in memory, warn about the images stored out of core otherwise.
+
+        :param images: The images required in memory by the operation
+        :type images: list[:class:`image.Image`]
+        :rtype: bool
+        """
 
-    def __clear_backup(self):
-        """Clear current backup buffer."""
+        if any(image.is_out_of_core() for image in images):
+            QMessageBox.warning(self, "Image is too large", "The operation isn't available for images\n"
+                                                            "stored out of core.")
+            return False
 
-        self.image_backup = None
-        self.action_undo.setEnabled(False)
+        return True
 
     @validate_active_image
     def __update_zoom_actions(self):
@@ -249,18 +267,33 @@ class MainWindow(QMainWindow, MainWindowUI):
             QMessageBox.warning(self, "Not supported extension", "The opened file has unsupported extension")
             return
 
-        # Try to open .bmp image using own implementation
+        # Try to open .bmp image using own implementation, memory-mapped or decoded by OpenCV if it's faster
         if file_extension == "bmp":
-            with open(file_path, "rb") as file:
-                try:
-                    img_bmp = ImageBmp(file.read())
-                    img_data = img_bmp.pixels
-                except AssertionError:
-                    img_data = imread(file_path, -1)
+            try:
+                img_data = ImageBmp.read(file_path)
+            except AssertionError:
+                img_data = imread(file_path, -1)
+        elif file_extension == "raw":
+            try:
+                img_data = ImageRaw(file_path).pixels
+            except (AssertionError, OSError, ValueError):
+                QMessageBox.warning(self, "Can't read raw image", "The raw image or its descriptor "
+                                                                  f"'{ImageRaw.get_descriptor_path(file_path)}'\n"
+                                                                  "is missing or invalid")
+                return
         else:
             # Open image using opencv function
             img_data = imread(file_path, -1)
 
+        # Keep memory-mapped image data larger than the limit out of core instead of loading it on the first edit,
+        # the opened file backs the store until it's edited. Smaller images are loaded into memory,
+        # so their files aren't mapped anymore and may be overwritten
+        if ImageStore.is_memory_mapped(img_data):
+            if img_data.nbytes > ImageStore.RESIDENT_LIMIT:
+                img_data = ImageStore.from_memmap(img_data)
+            else:
+                img_data = img_data.copy()
+
         if img_data.shape[1] < 100 or img_data.shape[0] < 50:
             QMessageBox.warning(self, "Input image is small", "The program cannot work with images less than 100x50")
             return
@@ -281,17 +314,45 @@ class MainWindow(QMainWindow, MainWindowUI):
         if not file_path:
             return
 
-        imwrite(file_path, self.active_image.data)
+        # Stream .bmp image to the file using own implementation, reporting the progress
+        if file_path.split(".")[-1].lower() in ("bmp", "dib"):
+            progress_dialog = QProgressDialog("Saving the image...", "Cancel", 0, 100, self)
+            progress_dialog.setWindowModality(Qt.WindowModal)
+            progress_dialog.setMinimumDuration(500)
+
+            def update_progress(written_rows, rows_num):
+                progress_dialog.setValue(written_rows * 100 // rows_num)
+                return not progress_dialog.wasCanceled()
+
+            try:
+                ImageBmp.save(file_path, self.active_image.data, update_progress)
+            except (AssertionError, OSError) as error:
+                QMessageBox.warning(self, "Can't save image", str(error))
+            finally:
+                progress_dialog.close()
+            return
 
-    def restore_backup(self):
-        """Restore changed the last time the image data."""
+        img_data = self.active_image.data
+        if self.active_image.is_out_of_core():
+            img_data = img_data.to_array()
 
-        if self.image_backup:
-            self.images[self.image_backup[0]].data = self.image_backup[1]
-            self.images[self.image_backup[0]].update()
-            self.set_image_type(None)
-            self.set_color_depth(None)
-            self.__clear_backup()
+        imwrite(file_path, img_data)
+
+    @validate_active_image
+    def undo(self, *args):
+        """Restore the active image data before the last change."""
+
+        if self.active_image.history.can_undo():
+            self.active_image.undo()
+            self.__finish_image_change()
+
+    @validate_active_image
+    def redo(self, *args):
+        """Restore the active image data after the last undone change."""
+
+        if self.active_image.history.can_redo():
+            self.active_image.redo()
+            self.__finish_image_change()
 
     @validate_active_image
     def rename_title(self, *args):
@@ -315,7 +376,7 @@ class MainWindow(QMainWindow, MainWindowUI):
     def duplicate(self, *args):
         """Create the image duplicate."""
 
-        image_copy = Image(self.active_image.data, "copy_" + self.active_image.name)
+        image_copy = Image(self.active_image.share_data(), "copy_" + self.active_image.name)
         image_copy.rename()
         self.__add_image_window(image_copy)
 
@@ -344,11 +405,9 @@ class MainWindow(QMainWindow, MainWindowUI):
                 or (not is_grayscale and img_type == "BGR-Color"):
             return
 
-        self.__make_image_backup()
+        self.active_image.begin_change()
         self.active_image.change_type(img_type)
-        self.__set_checked_image_type(img_type == "Grayscale")
-        self.set_color_depth(None)
-        self.active_image.update()
+        self.__finish_image_change()
 
     @validate_active_image
     def set_color_depth(self, action):
@@ -374,7 +433,9 @@ class MainWindow(QMainWindow, MainWindowUI):
         if is_uint8:
             return
         else:
+            self.active_image.begin_change()
             self.active_image.change_color_depth_2_uint8()
+            self.__finish_image_change()
 
     def show_program_info(self):
         """Show program information in the message box."""
@@ -461,6 +522,9 @@ class MainWindow(QMainWindow, MainWindowUI):
                                                      "The image must be grayscale, 8 bits per pixel.")
             return
 
+        if not self.__validate_in_core([self.active_image]):
+            return
+
         self.active_image.run_features_dialod()
 
     @validate_active_image
@@ -475,7 +539,9 @@ class MainWindow(QMainWindow, MainWindowUI):
         :type operation: str
         """
 
-        self.__make_image_backup()
+        if operation not in Image.OUT_OF_CORE_OPERATIONS and not self.__validate_in_core([self.active_image]):
+            return
+
         is_colored = not self.active_image.is_grayscale()
 
         if operation == "watershed" and not is_colored:
@@ -509,6 +575,9 @@ class MainWindow(QMainWindow, MainWindowUI):
                                                              "minimum and maximum pixel value.")
                 return
 
+        # Only the tiles changed by the operation are recorded, a rejected dialog records nothing
+        self.active_image.begin_change()
+
         if operation == "equalize":
             self.active_image.equalize_histogram()
         elif operation == "negation":
@@ -516,12 +585,15 @@ class MainWindow(QMainWindow, MainWindowUI):
         else:
             self.active_image.run_operation_dialog(operation)
 
-        self.active_image.update()
+        self.__finish_image_change()
 
     @validate_active_image
     def image_calculator(self, *args):
         """Perform one of the double-argument point operations between two images."""
 
+        if not self.__validate_in_core(self.images.values()):
+            return
+
         new_image = Image.run_calculator_dialog(self.images.values())
 
         if new_image:
@@ -532,6 +604,9 @@ class MainWindow(QMainWindow, MainWindowUI):
     def image_panorama(self, *args):
         """Perform stitching for chosen images."""
 
+        if not self.__validate_in_core(self.images.values()):
+            return
+
         pano_image = Image.run_panorama_dialog(self.images.values())
 
         if pano_image:
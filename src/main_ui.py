@@ -1,6 +1,6 @@
 from PyQt5.QtWidgets import QMdiArea, QMenuBar, QStatusBar, QToolBar, QMenu, QAction, QActionGroup
 from PyQt5.QtCore import Qt, QRect, QMetaObject, QCoreApplication
-from PyQt5.QtGui import QIcon, QPixmap, QKeySequence
+from PyQt5.QtGui import QIcon, QPixmap, QKeySequence, QTransform
 
 from src.constants import IMAGE_TYPES
 
@@ -122,6 +122,13 @@ class MainWindowUI:
         icon.addPixmap(QPixmap("icons/undo.png"), QIcon.Normal, QIcon.Off)
         self.action_undo.setIcon(icon)
 
+        self.action_redo = QAction(main_window)
+        self.action_redo.setEnabled(False)
+        self.action_redo.setObjectName("action_redo")
+        icon = QIcon()
+        icon.addPixmap(QPixmap("icons/undo.png").transformed(QTransform().scale(-1, 1)), QIcon.Normal, QIcon.Off)
+        self.action_redo.setIcon(icon)
+
         self.action_cascade = QAction(main_window)
         self.action_cascade.setObjectName("action_cascade")
         icon = QIcon()
@@ -289,6 +296,7 @@ class MainWindowUI:
         self.menu_file.addAction(self.action_open)
         self.menu_file.addAction(self.action_save)
         self.menu_file.addAction(self.action_undo)
+        self.menu_file.addAction(self.action_redo)
         self.menu_file.addAction(self.action_cascade)
         self.menu_file.addAction(self.action_exit)
 
@@ -333,6 +341,7 @@ class MainWindowUI:
         self.file_toolbar.addAction(self.action_open)
         self.file_toolbar.addAction(self.action_save)
         self.file_toolbar.addAction(self.action_undo)
+        self.file_toolbar.addAction(self.action_redo)
         self.file_toolbar.addAction(self.action_cascade)
         self.image_toolbar.addAction(self.action_rename)
         self.image_toolbar.addAction(self.action_duplicate)
@@ -375,6 +384,7 @@ class MainWindowUI:
         self.action_open.setText(_translate(_main_title, "Open"))
         self.action_save.setText(_translate(_main_title, "Save As"))
         self.action_undo.setText(_translate(_main_title, "Undo"))
+        self.action_redo.setText(_translate(_main_title, "Redo"))
         self.action_cascade.setText(_translate(_main_title, "Cascade"))
         self.action_exit.setText(_translate(_main_title, "Exit"))
         self.action_rename.setText(_translate(_main_title, "Rename"))
@@ -406,6 +416,7 @@ class MainWindowUI:
         self.action_open.setStatusTip(_translate(_main_title, "Open a new image"))
         self.action_save.setStatusTip(_translate(_main_title, "Save selected image"))
         self.action_undo.setStatusTip(_translate(_main_title, "Undo the last image changing."))
+        self.action_redo.setStatusTip(_translate(_main_title, "Redo the last undone image changing."))
         self.action_cascade.setStatusTip(_translate(_main_title, "Arrange all the windows in a cascade pattern."))
         self.action_exit.setStatusTip(_translate(_main_title, "Exit the program"))
         self.action_rename.setStatusTip(_translate(_main_title, "Rename selected image"))
@@ -436,6 +447,7 @@ class MainWindowUI:
         self.action_open.setShortcuts(QKeySequence.keyBindings(3))
         self.action_save.setShortcuts(QKeySequence.keyBindings(5))
         self.action_undo.setShortcuts(QKeySequence.keyBindings(11))
+        self.action_redo.setShortcuts(QKeySequence.keyBindings(12))
         self.action_zoom_in.setShortcuts(QKeySequence.keyBindings(16) + ["Ctrl+="])
         self.action_zoom_out.setShortcuts(QKeySequence.keyBindings(17) + ["Ctrl+_"])
         self.action_rename.setShortcut("Ctrl+R")
@@ -36,7 +36,7 @@ class SVM(QDialog, Operation, SVMUI):
         super().__init__()
         self.init_ui(self)
 
-        self.img_data = parent.data.copy()
+        self.img_data = parent.share_data()
         self.current_img_data = None
         self.training_data = None
         self.training_shape = None
@@ -156,7 +156,7 @@ class SVM(QDialog, Operation, SVMUI):
     def make_predictions(self):
         """Predict object classification."""
 
-        img_data = self.img_data.copy()
+        img_data = self.img_data
         features = self.get_features(img_data)
 
         _, img_data = threshold(img_data, 127, 255, 0)
@@ -3,3 +3,9 @@ from .edge_detection import EdgeDetection, DirectionalEdgeDetection
 from .sharpen import Sharpen
 from .convolve import Convolve
 from .morphology import Morphology
+from .tiling import Tiling
+from .thinning import Thinning
+from .element_decomposition import ElementDecomposition
+from .morphology_cache import MorphologyCache
+from .convolution import Convolution
+from .kernel_library import KernelLibrary
@@ -0,0 +1,283 @@
+from cv2 import filter2D, sepFilter2D, copyMakeBorder, add, CV_32F, CV_64F, BORDER_CONSTANT, BORDER_ISOLATED
+from numpy import ndarray, float32, float64, sqrt, convolve
+from numpy.linalg import svd
+from scipy.signal import convolve2d
+
+from .tiling import Tiling
+
+
+class Convolution:
+    """
+    The Convolution class implements the correlation of an image with a kernel or a cascade of kernels,
+    the same as :func:`cv2.filter2D` does, choosing the cheapest way to apply them.
+
+    A kernel of rank r, found by SVD, is the sum of r outer products of a column and a row,
+    so it's applied as r separable passes of :func:`cv2.sepFilter2D`, which cost O(N) per pixel instead of O(N²).
+    Factors known in advance, e.g. of :class:`kernel_library.KernelLibrary` kernels, are used instead of SVD.
+    A kernel of full rank is applied at once by :func:`cv2.filter2D`,
+    which switches to DFT by blocks for large kernels itself.
+    A cascade of kernels is the same as their merged kernel, the full convolution of them,
+    so it's applied either as the merged kernel or kernel by kernel, whichever is cheaper,
+    e.g. two separable kernels merge into a separable one, while a separable kernel and a small one
+    are cheaper one after another than their large merged kernel.
+    The image is extended with the border once for the whole cascade,
+    so the result is the same as of the merged kernel also along the image border.
+
+    The costs of passes are estimated relatively to a multiply-add of the direct correlation,
+    as measured for float32 data on a single core.
+    """
+
+    # The relative tolerance of singular values, smaller ones are treated as zeros
+    RANK_TOLERANCE = 1e-6
+
+    # The minimum kernel area, which :func:`cv2.filter2D` convolves by DFT for float32 data,
+    # and the cost of DFT per pixel, which hardly depends on the kernel size
+    DFT_MIN_AREA = 130
+    DFT_COST = 300
+
+    # The minimum kernel area, which :func:`cv2.filter2D` convolves by DFT for float64 data
+    DFT_MIN_AREA_64F = 50
+
+    # The cost of a separable pass per pixel: per kernel row and column, and per pass
+    SEPARABLE_COST = 3.2
+    SEPARABLE_PASS_COST = 8
+
+    # The cost of extending the image with the border for a cascade per pixel
+    PADDING_COST = 15
+
+    def __init__(self, kernels, ddepth=CV_64F, factors=None):
+        """
+        Create a new convolution.
+
+        :param kernels: The kernel or the cascade of kernels applied one after another,
+                        with the default anchors at their centers
+        :type kernels: :class:`numpy.ndarray` or list[:class:`numpy.ndarray`]
+        :param ddepth: The depth of the result and of the accumulation: :data:`cv2.CV_32F` or :data:`cv2.CV_64F`
+        :type ddepth: int
+        :param factors: The precalculated separable factors of every kernel as returned by :meth:`separate`,
+                        ``None`` for the kernels to separate by SVD, by default all of them are separated
+        :type factors: list[list[tuple[:class:`numpy.ndarray`, :class:`numpy.ndarray`]] or None] or None
+        """
+
+        assert ddepth in (CV_32F, CV_64F), AssertionError("The depth must be CV_32F or CV_64F")
+
+        if not isinstance(kernels, (list, tuple)):
+            kernels = [kernels]
+
+        self.ddepth = ddepth
+        self.kernels = [float64(kernel) for kernel in kernels]
+
+        # The anchor of the merged kernel is the sum of the anchors, the default one is the center
+        self.anchor = tuple(sum(kernel.shape[axis] // 2 for kernel in self.kernels) for axis in (1, 0))
+        self.shape = tuple(sum(kernel.shape[axis] - 1 for kernel in self.kernels) + 1 for axis in (0, 1))
+
+        self.passes = self.plan(self.kernels, factors)
+
+    @property
+    def halo(self):
+        """Get the number of neighbouring pixels the convolution reads around a pixel."""
+
+        height, width = self.shape
+        anchor_x, anchor_y = self.anchor
+
+        return max(anchor_x, anchor_y, width - 1 - anchor_x, height - 1 - anchor_y)
+
+    @property
+    def uses_dft(self):
+        """
+        Check if any direct pass is convolved by DFT.
+
+        :func:`cv2.filter2D` splits the image into DFT blocks by the image size,
+        so the result of DFT differs in rounding, when the image is convolved tile by tile.
+        """
+
+        dft_min_area = self.DFT_MIN_AREA if self.ddepth == CV_32F else self.DFT_MIN_AREA_64F
+
+        return any(method == "direct" and data.size >= dft_min_area for (method, data), _ in self.passes)
+
+    @staticmethod
+    def merge(kernels):
+        """
+        Merge the cascade of kernels into the single kernel, the full convolution of them.
+
+        :param kernels: The kernels applied one after another
+        :type kernels: list[:class:`numpy.ndarray`]
+        :return: The merged kernel
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        merged = kernels[0]
+        for kernel in kernels[1:]:
+            merged = convolve2d(merged, kernel, mode="full")
+
+        return merged
+
+    @classmethod
+    def separate(cls, kernel):
+        """
+        Separate the kernel into the sum of outer products of a column and a row by SVD.
+
+        :param kernel: The kernel
+        :type kernel: :class:`numpy.ndarray`
+        :return: The pairs of the row and the column, as many as the rank of the kernel
+        :rtype: list[tuple[:class:`numpy.ndarray`, :class:`numpy.ndarray`]]
+        """
+
+        columns, values, rows = svd(float64(kernel))
+
+        factors = []
+        for i, value in enumerate(values):
+            if value <= cls.RANK_TOLERANCE * values[0]:
+                break
+
+            factors.append((rows[i] * sqrt(value), columns[:, i] * sqrt(value)))
+
+        return factors
+
+    @staticmethod
+    def merge_factors(factors):
+        """
+        Merge the separable factors of the cascade of kernels into the factors of the merged kernel.
+
+        The merged kernel of the outer products is the outer product of the convolved columns and rows.
+
+        :param factors: The factors of every kernel as returned by :meth:`separate`, or ``None``
+        :type factors: list[list[tuple[:class:`numpy.ndarray`, :class:`numpy.ndarray`]] or None]
+        :return: The factors of the merged kernel, ``None`` if factors of any kernel are unknown
+        :rtype: list[tuple[:class:`numpy.ndarray`, :class:`numpy.ndarray`]] or None
+        """
+
+        if any(kernel_factors is None for kernel_factors in factors):
+            return None
+
+        merged = factors[0]
+        for kernel_factors in factors[1:]:
+            merged = [(convolve(row, other_row), convolve(column, other_column))
+                      for row, column in merged for other_row, other_column in kernel_factors]
+
+        return merged
+
+    @classmethod
+    def calc_pass(cls, kernel, factors=None):
+        """
+        Choose the cheaper way to apply the kernel: separable passes or a direct one.
+
+        :param kernel: The kernel
+        :type kernel: :class:`numpy.ndarray`
+        :param factors: The precalculated factors of the kernel, by default it's separated by :meth:`separate`
+        :type factors: list[tuple[:class:`numpy.ndarray`, :class:`numpy.ndarray`]] or None
+        :return: The pass: ("separable", the rows and columns from :meth:`separate`) or ("direct", the kernel),
+                 and its cost per pixel
+        :rtype: tuple[tuple[str, object], float]
+        """
+
+        height, width = kernel.shape
+        area = height * width
+        direct_cost = area if area < cls.DFT_MIN_AREA else cls.DFT_COST
+
+        if factors is None:
+            factors = cls.separate(kernel)
+        separable_cost = len(factors) * (cls.SEPARABLE_COST * (height + width) + cls.SEPARABLE_PASS_COST)
+
+        if factors and separable_cost < direct_cost:
+            return ("separable", factors), separable_cost
+
+        return ("direct", kernel), direct_cost
+
+    @classmethod
+    def plan(cls, kernels, factors=None):
+        """
+        Plan the passes applying the cascade of kernels: the merged kernel or the kernels one after another.
+
+        :param kernels: The kernels applied one after another
+        :type kernels: list[:class:`numpy.ndarray`]
+        :param factors: The precalculated factors of every kernel or ``None``, by default all kernels are separated
+        :type factors: list[list[tuple[:class:`numpy.ndarray`, :class:`numpy.ndarray`]] or None] or None
+        :return: The passes and the default anchors of their kernels
+        :rtype: list[tuple[tuple[str, object], tuple[int, int]]]
+        """
+
+        if factors is None:
+            factors = [None] * len(kernels)
+
+        merged = cls.merge(kernels)
+        merged_pass, merged_cost = cls.calc_pass(merged, cls.merge_factors(factors))
+
+        if len(kernels) == 1:
+            return [(merged_pass, (merged.shape[1] // 2, merged.shape[0] // 2))]
+
+        kernel_passes = [cls.calc_pass(kernel, kernel_factors) for kernel, kernel_factors in zip(kernels, factors)]
+        if merged_cost <= cls.PADDING_COST + sum(cost for _, cost in kernel_passes):
+            return [(merged_pass, (sum(kernel.shape[1] // 2 for kernel in kernels),
+                                   sum(kernel.shape[0] // 2 for kernel in kernels)))]
+
+        return [(kernel_pass, (kernel.shape[1] // 2, kernel.shape[0] // 2))
+                for (kernel_pass, _), kernel in zip(kernel_passes, kernels)]
+
+    def __apply_pass(self, img_data, kernel_pass, anchor, border_type):
+        """Apply the pass to the image, the separable ones are summed."""
+
+        method, data = kernel_pass
+
+        if method == "direct":
+            return filter2D(img_data, self.ddepth, data, anchor=anchor, borderType=border_type)
+
+        result = None
+        for row, column in data:
+            term = sepFilter2D(img_data, self.ddepth, row, column, anchor=anchor, borderType=border_type)
+            result = term if result is None else add(result, term)
+
+        return result
+
+    def apply(self, img_data, border_type):
+        """
+        Correlate the image with the kernels.
+
+        :param img_data: The image data
+        :type img_data: :class:`numpy.ndarray`
+        :param border_type: The border type, defined in BORDER_TYPES
+        :type border_type: int
+        :return: The result of the depth :attr:`ddepth`
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        # Float32 data is correlated with SIMD, unlike 8-bit data with the float32 result
+        if self.ddepth == CV_32F:
+            img_data = float32(img_data)
+
+        if len(self.passes) == 1:
+            (kernel_pass, anchor), = self.passes
+            return self.__apply_pass(img_data, kernel_pass, anchor, border_type)
+
+        # The cascade reads the padding only, so the border isn't extrapolated by every pass again
+        height, width = self.shape
+        anchor_x, anchor_y = self.anchor
+        img_data = copyMakeBorder(img_data, anchor_y, height - 1 - anchor_y, anchor_x, width - 1 - anchor_x,
+                                  border_type & ~BORDER_ISOLATED, value=0)
+
+        for kernel_pass, anchor in self.passes:
+            img_data = self.__apply_pass(img_data, kernel_pass, anchor, BORDER_CONSTANT)
+
+        return img_data[anchor_y:anchor_y + img_data.shape[0] - height + 1,
+                        anchor_x:anchor_x + img_data.shape[1] - width + 1]
+
+    def apply_tiled(self, img_data, border_type):
+        """
+        Correlate the image with the kernels tile by tile by :class:`tiling.Tiling`.
+
+        The image in memory is correlated at once, if the convolution :attr:`uses_dft`,
+        so the result is the same as of :meth:`apply` in any case.
+        The image data stored out of core is always streamed tile by tile.
+
+        :param img_data: The image data
+        :type img_data: :class:`numpy.ndarray` or :class:`image.image_store.ImageStore`
+        :param border_type: The border type, defined in BORDER_TYPES
+        :type border_type: int
+        :return: The result of the depth :attr:`ddepth`
+        :rtype: :class:`numpy.ndarray` or :class:`image.image_store.ImageStore`
+        """
+
+        if self.uses_dft and isinstance(img_data, ndarray):
+            return self.apply(img_data, border_type)
+
+        return Tiling(self.halo).apply(lambda tile: self.apply(tile, border_type), img_data)
@@ -1,17 +1,21 @@
-from cv2 import filter2D, CV_64F, normalize, NORM_MINMAX
-from numpy import sum, abs
-from scipy.signal import convolve2d
-from PyQt5.QtWidgets import QDialog
-from PyQt5.QtCore import QCoreApplication
+from cv2 import CV_32F, normalize, NORM_MINMAX
+from numpy import sum, abs, zeros
+from PyQt5.QtWidgets import QDialog, QFileDialog, QMessageBox, QTableWidgetItem
+from PyQt5.QtCore import Qt, QCoreApplication
 
 from src.constants import BORDER_TYPES
 from ..operation import Operation
 from .convolve_ui import ConvolveUI
+from .convolution import Convolution
+from .kernel_library import KernelLibrary
 
 
 class Convolve(QDialog, Operation, ConvolveUI):
     """The Convolve class implements a local convolve operation."""
 
+    # The maximum size of the merged kernel shown as a table, larger ones are shown by the size
+    MAX_SHOWN_MERGED_SIZE = 7
+
     def __init__(self, parent):
         """
         Create a new dialog window to perform convolution.
@@ -25,13 +29,16 @@ class Convolve(QDialog, Operation, ConvolveUI):
         self.init_ui(self)
         self.__retranslate_ui()
 
-        self.img_data = parent.data.copy()
+        self.img_data = parent.share_data()
         self.current_img_data = None
 
         self.cb_border_type.activated[str].connect(self.update_img_preview)
+        self.cb_kernel_library.activated[str].connect(self.update_form)
+        self.sb_kernel_size.valueChanged.connect(self.update_library_kernel)
         self.rbtn_two_stage_convolve.clicked.connect(self.update_form)
         self.rbtn_show_hist.clicked.connect(self.update_hist)
 
+        self.update_kernel_table(1)
         self.update_form()
 
     def __retranslate_ui(self):
@@ -41,110 +48,299 @@ class Convolve(QDialog, Operation, ConvolveUI):
         _window_title = "Convolve"
 
         self.setWindowTitle(_window_title)
+        self.label_kernel_library.setText(_translate(_window_title, "Kernel library:"))
+        self.label_kernel_size.setText(_translate(_window_title, "Kernel size:"))
         self.label_two_stage_convolve.setText(_translate(_window_title, "Two-stage:"))
         self.label_border_type.setText(_translate(_window_title, "Border type:"))
         self.label_kernel.setText(_translate(_window_title, "Kernel:"))
 
+    def get_library_kernel(self):
+        """
+        Get the library kernel chosen as the first one.
+
+        :return: The name and the size of the kernel, ``None`` if the first kernel is custom
+        :rtype: tuple[str, int] or None
+        """
+
+        name = self.cb_kernel_library.currentText()
+        if name == "Custom":
+            return None
+
+        return name, self.sb_kernel_size.value()
+
     def update_form(self):
-        """Update the second kernel grid access whenever :attr:`rbtn_two_stage_convolve` clicked."""
+        """
+        Update the form whenever :attr:`rbtn_two_stage_convolve` clicked or the library kernel is chosen.
+
+        The library kernel is shown in the first table read-only, its size is set by :attr:`sb_kernel_size`.
+        """
+
+        is_library = self.get_library_kernel() is not None
+
+        self.label_kernel_size.setVisible(is_library)
+        self.sb_kernel_size.setVisible(is_library)
+        self.sb_kernel_rows[0].setEnabled(not is_library)
+        self.sb_kernel_cols[0].setEnabled(not is_library)
+        self.btns_load_kernel[0].setEnabled(not is_library)
 
         if self.rbtn_two_stage_convolve.isChecked():
-            self.grids[1].setVisible(True)
-            self.label_grid5x5.setVisible(True)
+            self.kernel_editors[1].setVisible(True)
+            self.label_merged_kernel.setVisible(True)
             self.label_kernel.setText("Kernels:")
         else:
-            self.grids[1].setVisible(False)
-            self.label_grid5x5.setVisible(False)
+            self.kernel_editors[1].setVisible(False)
+            self.label_merged_kernel.setVisible(False)
             self.label_kernel.setText("Kernel:")
 
+        self.update_kernel_table(0)
         self.update_img_preview()
 
-    def update_kernel_value(self, index, value, first_kernel):
+    def update_library_kernel(self):
+        """Update the library kernel whenever its size changed, the size is odd."""
+
+        ksize = self.sb_kernel_size.value()
+
+        if ksize % 2 == 0:
+            ksize -= 1
+            self.sb_kernel_size.setValue(ksize)
+
+        if self.get_library_kernel() is not None:
+            self.update_kernel_table(0)
+            self.schedule_img_preview()
+
+    def get_kernel_values(self, kernel_num):
+        """
+        Get the values of the kernel: the library kernel or the custom one.
+
+        :param kernel_num: The number of the kernel, 0 for the first and 1 for the second one
+        :type kernel_num: int
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        library_kernel = self.get_library_kernel()
+
+        if kernel_num == 0 and library_kernel is not None:
+            return KernelLibrary.get_kernel(*library_kernel)[0]
+
+        return self.kernels_values[kernel_num]
+
+    def update_kernel_table(self, kernel_num):
+        """
+        Fill the table with the kernel values, the library kernel is read-only.
+
+        :param kernel_num: The number of the kernel, 0 for the first and 1 for the second one
+        :type kernel_num: int
+        """
+
+        kernel_values = self.get_kernel_values(kernel_num)
+        is_editable = kernel_num == 1 or self.get_library_kernel() is None
+
+        table = self.tables_kernel[kernel_num]
+        table.blockSignals(True)
+        table.setRowCount(kernel_values.shape[0])
+        table.setColumnCount(kernel_values.shape[1])
+
+        for i, row in enumerate(kernel_values):
+            for j, value in enumerate(row):
+                item = QTableWidgetItem(f"{value:.4g}")
+                item.setTextAlignment(Qt.AlignCenter)
+                if not is_editable:
+                    item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+
+                table.setItem(i, j, item)
+
+        table.blockSignals(False)
+
+    def update_kernel_value(self, kernel_num, item):
         """
         Update kernel values whenever changed.
 
-        :param index: The index of kernel cell, e.g. (1, 2)
-        :type index: tuple[int]
-        :param value: The new value of kernel cell
-        :type value: int
-        :param first_kernel: The flag to indicate whether the first or second kernel need to update
-        :type first_kernel: bool
+        The value, which isn't a number, is reverted.
+
+        :param kernel_num: The number of the kernel, 0 for the first and 1 for the second one
+        :type kernel_num: int
+        :param item: The changed kernel cell
+        :type item: :class:`PyQt5.QtWidgets.QTableWidgetItem`
         """
 
-        i, j = index
+        kernel_values = self.kernels_values[kernel_num]
+        i, j = item.row(), item.column()
 
-        if first_kernel:
-            self.kernel1_values[i][j] = value
-        else:
-            self.kernel2_values[i][j] = value
+        try:
+            kernel_values[i][j] = float(item.text())
+        except ValueError:
+            pass
 
+        self.tables_kernel[kernel_num].blockSignals(True)
+        item.setText(f"{kernel_values[i][j]:.4g}")
+        self.tables_kernel[kernel_num].blockSignals(False)
+
+        self.schedule_img_preview()
+
+    def resize_kernel(self, kernel_num):
+        """
+        Resize the custom kernel whenever its number of rows or columns changed.
+
+        The values within the new size are kept, the new cells are zeros.
+
+        :param kernel_num: The number of the kernel, 0 for the first and 1 for the second one
+        :type kernel_num: int
+        """
+
+        rows_num = self.sb_kernel_rows[kernel_num].value()
+        cols_num = self.sb_kernel_cols[kernel_num].value()
+
+        kernel_values = zeros((rows_num, cols_num))
+        old_values = self.kernels_values[kernel_num][:rows_num, :cols_num]
+        kernel_values[:old_values.shape[0], :old_values.shape[1]] = old_values
+
+        self.kernels_values[kernel_num] = kernel_values
+        self.update_kernel_table(kernel_num)
+        self.schedule_img_preview()
+
+    def load_kernel(self, kernel_num):
+        """
+        Load the custom kernel from a text file, see :meth:`kernel_library.KernelLibrary.load`.
+
+        :param kernel_num: The number of the kernel, 0 for the first and 1 for the second one
+        :type kernel_num: int
+        """
+
+        file_path, _ = QFileDialog.getOpenFileName(self, "Load kernel", "",
+                                                   "Text Files (*.txt *.csv);;All Files (*)")
+        if not file_path:
+            return
+
+        try:
+            kernel_values = KernelLibrary.load(file_path)
+        except (OSError, UnicodeDecodeError, ValueError) as error:
+            QMessageBox.warning(self, "Incorrect Kernel", f"Can't load the kernel.\n{error}")
+            return
+
+        if max(kernel_values.shape) > self.MAX_KERNEL_SIZE:
+            QMessageBox.warning(self, "Incorrect Kernel", f"The kernel can't be larger than "
+                                                          f"{self.MAX_KERNEL_SIZE}x{self.MAX_KERNEL_SIZE}.")
+            return
+
+        self.kernels_values[kernel_num] = kernel_values
+
+        for spin_box, value in zip((self.sb_kernel_rows[kernel_num], self.sb_kernel_cols[kernel_num]),
+                                   kernel_values.shape):
+            spin_box.blockSignals(True)
+            spin_box.setValue(value)
+            spin_box.blockSignals(False)
+
+        self.update_kernel_table(kernel_num)
         self.update_img_preview()
 
     def merge_kernels(self):
         """
-        Merge two input kernels 3x3 to single kernel 5x5.
+        Merge two input kernels to the single kernel.
 
-        :return: The new merged kernel of size 5x5
+        :return: The new merged kernel of size (M1 + M2 - 1)x(N1 + N2 - 1)
         :rtype: class:`numpy.ndarray`
         """
 
-        return convolve2d(self.kernel1_values, self.kernel2_values, mode="full")
+        return Convolution.merge([self.get_kernel_values(0), self.get_kernel_values(1)])
 
-    def calc_convolve(self, border, kernel_values):
+    def calc_convolve(self, border, kernels, library_kernel=None, img_data=None):
         """
         Convolve an image based on border type and kernel values.
 
+        The kernels are applied by :class:`convolution.Convolution` with float32 accumulation,
+        which is precise enough for the result normalized to 8 bits.
+        The library kernel is applied with its factors and plan kept by :class:`kernel_library.KernelLibrary`.
+
         :param border: The border type for convolution, defined in BORDER_TYPES
         :type border: str
-        :param kernel_values: The values of kernel matrix to convolve
-        :type kernel_values: class:`numpy.ndarray`
+        :param kernels: The values of kernel matrices to convolve with one after another
+        :type kernels: list[class:`numpy.ndarray`]
+        :param library_kernel: The name and the size of the library kernel convolved with before :attr:`kernels`
+        :type library_kernel: tuple[str, int] or None
+        :param img_data: The image data to calculate on, by default it's :attr:`img_data`
+        :type img_data: class:`numpy.ndarray` or None
         :return: The new convolved image data
         :rtype: class:`numpy.ndarray`
         """
 
+        if img_data is None:
+            img_data = self.img_data
+
         border_type = BORDER_TYPES[border]
-        coeff = sum(kernel_values)
 
-        if coeff == 0:
-            coeff = 1
+        # Normalize every kernel, so the merged one is normalized as well
+        normalized_kernels = []
+        for kernel_values in kernels:
+            coeff = sum(kernel_values)
 
-        kernel = kernel_values/coeff
+            if coeff == 0:
+                coeff = 1
 
-        # Perform convolution in float 64-bit per pixel data type
-        img_data = filter2D(self.img_data, CV_64F, kernel, borderType=border_type)
+            normalized_kernels.append(kernel_values / coeff)
+
+        # Library kernels are normalized already
+        if library_kernel is None:
+            convolution = Convolution(normalized_kernels, CV_32F)
+        elif not normalized_kernels:
+            convolution = KernelLibrary.get_convolution(*library_kernel, CV_32F)
+        else:
+            kernel, factors = KernelLibrary.get_kernel(*library_kernel)
+            convolution = Convolution([kernel] + normalized_kernels, CV_32F, [factors] + [None] * len(kernels))
+
+        img_data = convolution.apply_tiled(img_data, border_type)
 
         # Normalize and convert image to uint8 data type
         return normalize(abs(img_data), None, 0, 255, NORM_MINMAX, dtype=0)
 
+    def update_merged_kernel(self):
+        """Show the merged kernel as a table, or by its size if it's too large."""
+
+        kernel_values = self.merge_kernels()
+        rows_num, cols_num = kernel_values.shape
+
+        if max(rows_num, cols_num) > self.MAX_SHOWN_MERGED_SIZE:
+            self.label_merged_kernel.setText(f"Merged kernel:\n{rows_num}x{cols_num}")
+            return
+
+        grid = """<table align="center" style="border: 1px solid black; border-collapse: collapse;">"""
+        for i in range(rows_num):
+            grid += """<tr style="border: 1px solid black; border-collapse: collapse;">"""
+            for j in range(cols_num):
+                grid += f"""<td style="border: 1px solid black; border-collapse: collapse;
+                                       padding: 5px 10px 5px 10px; font-size: 14px;
+                                       text-align: center;"> {kernel_values[i][j]:.4g}
+                            </td>"""
+
+            grid += "</tr>"
+        grid += "</table>"
+        self.label_merged_kernel.setText(grid)
+
     def update_img_preview(self):
         """
         Update image preview window.
 
-        - Calculate convolve based on border and kernel input values.
+        - Calculate convolve based on border and kernel input values in the background.
         - Reload image preview using the base :class:`operation.Operation` method.
         """
 
         border_type = self.cb_border_type.currentText()
-
-        if self.rbtn_two_stage_convolve.isChecked():
-            kernel_values = self.merge_kernels()
-
-            # Create a preview table for kernel 5x5
-            grid5x5 = """<table align="center" style="border: 1px solid black; border-collapse: collapse;">"""
-            for i in range(5):
-                grid5x5 += """<tr style="border: 1px solid black; border-collapse: collapse;">"""
-                for j in range(5):
-                    grid5x5 += f"""<td style="border: 1px solid black; border-collapse: collapse;
-                                              padding: 5px 10px 5px 10px; font-size: 14px;
-                                              text-align: center;"> {kernel_values[i][j]}
-                                   </td>"""
-
-                grid5x5 += "</tr>"
-            grid5x5 += "</table>"
-            self.label_grid5x5.setText(grid5x5)
-
+        library_kernel = self.get_library_kernel()
+
+        # Copy the kernels, which are modified on the GUI thread while the preview is calculated
+        kernels = [kernel_values.copy() for kernel_values in self.kernels_values]
+        if library_kernel is not None:
+            kernels = kernels[1:]
+        if not self.rbtn_two_stage_convolve.isChecked():
+            kernels = kernels[:1 if library_kernel is None else 0]
         else:
-            kernel_values = self.kernel1_values
+            self.update_merged_kernel()
+
+        if library_kernel is None:
+            self.run_img_preview(self.calc_convolve, border_type, kernels)
+            return
 
-        self.current_img_data = self.calc_convolve(border_type, kernel_values)
-        super().update_img_preview()
+        # Scale the library kernel to the preview, custom kernels are applied as they are
+        name, ksize = library_kernel
+        self.run_img_preview(self.calc_convolve, border_type, kernels, library_kernel,
+                             scale_args=lambda scale: (border_type, kernels,
+                                                       (name, self.scale_kernel_size(ksize, 3, scale))))
@@ -1,15 +1,20 @@
-from numpy import array
-from PyQt5.QtWidgets import QWidget, QLabel, QSpinBox, QRadioButton, QHBoxLayout, QVBoxLayout
+from numpy import ones
+from PyQt5.QtWidgets import (QWidget, QLabel, QSpinBox, QComboBox, QRadioButton, QPushButton, QTableWidget,
+                             QHBoxLayout, QVBoxLayout)
 from PyQt5.QtCore import Qt, QMetaObject
 from PyQt5.QtGui import QIcon, QPixmap
 
 from ..operation_ui import OperationUI
 from .local_ui import LocalUI
+from .kernel_library import KernelLibrary
 
 
 class ConvolveUI(OperationUI, LocalUI):
     """Build UI for :class:`convolve.Convolve`."""
 
+    # The maximum number of kernel rows and columns
+    MAX_KERNEL_SIZE = 63
+
     def init_ui(self, convolve):
         """
         Create user interface for :class:`convolve.Convolve`.
@@ -24,15 +29,21 @@ class ConvolveUI(OperationUI, LocalUI):
         self.operation_ui(self)
         self.local_ui(self)
         convolve.setObjectName("convolve")
-        self.kernel1_values = array([[1] * 3, [1] * 3, [1] * 3])
-        self.kernel2_values = array([[1] * 3, [1] * 3, [1] * 3])
+        self.kernels_values = [ones((3, 3)), ones((3, 3))]
 
         icon = QIcon()
         icon.addPixmap(QPixmap("icons/matrix.png"), QIcon.Normal, QIcon.Off)
         convolve.setWindowIcon(icon)
 
-        self.label_kernel_size.setVisible(False)
-        self.sb_kernel_size.setVisible(False)
+        self.label_kernel_library = QLabel(convolve)
+        self.label_kernel_library.setObjectName("label_kernel_library")
+
+        self.cb_kernel_library = QComboBox(convolve)
+        self.cb_kernel_library.addItems(["Custom"] + list(KernelLibrary.NAMES))
+        self.cb_kernel_library.setObjectName("cb_kernel_library")
+
+        self.sb_kernel_size.setMaximum(self.MAX_KERNEL_SIZE)
+        self.sb_kernel_size.setValue(5)
 
         self.label_two_stage_convolve = QLabel(convolve)
         self.label_two_stage_convolve.setObjectName("label_two_stage_convolve")
@@ -40,6 +51,8 @@ class ConvolveUI(OperationUI, LocalUI):
         self.rbtn_two_stage_convolve = QRadioButton()
         self.rbtn_two_stage_convolve.setObjectName("rbtn_two_stage_convolve")
 
+        self.layout_form.addRow(self.label_kernel_library, self.cb_kernel_library)
+        self.layout_form.addRow(self.label_kernel_size, self.sb_kernel_size)
         self.layout_form.addRow(self.label_two_stage_convolve, self.rbtn_two_stage_convolve)
         self.layout_form.addRow(self.label_border_type, self.cb_border_type)
 
@@ -50,22 +63,21 @@ class ConvolveUI(OperationUI, LocalUI):
         self.layout_kernels = QHBoxLayout()
         self.layout_kernels.setObjectName("layout_kernels")
 
-        self.layout_grid1 = self.create_layout_grid(convolve, True)
-        self.layout_grid2 = self.create_layout_grid(convolve, False)
-
-        self.grids = [QWidget(), QWidget()]
-        self.grids[0].setLayout(self.layout_grid1)
-        self.grids[1].setLayout(self.layout_grid2)
-        self.grids[1].setVisible(False)
+        self.sb_kernel_rows = []
+        self.sb_kernel_cols = []
+        self.btns_load_kernel = []
+        self.tables_kernel = []
+        self.kernel_editors = [self.create_kernel_editor(convolve, 0), self.create_kernel_editor(convolve, 1)]
+        self.kernel_editors[1].setVisible(False)
 
-        self.label_grid5x5 = QLabel(convolve)
-        self.label_grid5x5.setAlignment(Qt.AlignCenter)
-        self.label_grid5x5.setVisible(False)
-        self.label_grid5x5.setObjectName("label_grid5x5")
+        self.label_merged_kernel = QLabel(convolve)
+        self.label_merged_kernel.setAlignment(Qt.AlignCenter)
+        self.label_merged_kernel.setVisible(False)
+        self.label_merged_kernel.setObjectName("label_merged_kernel")
 
-        self.layout_kernels.addWidget(self.grids[0])
-        self.layout_kernels.addWidget(self.label_grid5x5)
-        self.layout_kernels.addWidget(self.grids[1])
+        self.layout_kernels.addWidget(self.kernel_editors[0])
+        self.layout_kernels.addWidget(self.label_merged_kernel)
+        self.layout_kernels.addWidget(self.kernel_editors[1])
 
         self.kernels_widget = QWidget(convolve)
         self.kernels_widget.setObjectName("kernels_widget")
@@ -81,40 +93,60 @@ class ConvolveUI(OperationUI, LocalUI):
         convolve.setLayout(self.layout)
         QMetaObject.connectSlotsByName(convolve)
 
-    def create_layout_grid(self, convolve, first_kernel):
+    def create_kernel_editor(self, convolve, kernel_num):
         """
-        Create layout grid 3x3 of spin boxes to input kernel values.
+        Create the editor of kernel values: the kernel size, the button to load it from a file and the table.
 
         :param convolve: The dialog convolve window
         :type convolve: :class:`convolve.Convolve`
-        :param first_kernel: The flag to indicate whether the layout is for first or second kernel
-        :return: bool
+        :param kernel_num: The number of the kernel, 0 for the first and 1 for the second one
+        :type kernel_num: int
+        :return: The editor widget
+        :rtype: :class:`PyQt5.QtWidgets.QWidget`
         """
 
-        layout_grid = QVBoxLayout()
+        rows_num, cols_num = self.kernels_values[kernel_num].shape
+
+        sb_kernel_rows = QSpinBox()
+        sb_kernel_rows.setRange(1, self.MAX_KERNEL_SIZE)
+        sb_kernel_rows.setValue(rows_num)
+        sb_kernel_rows.setObjectName(f"sb_kernel_rows{kernel_num + 1}")
+
+        sb_kernel_cols = QSpinBox()
+        sb_kernel_cols.setRange(1, self.MAX_KERNEL_SIZE)
+        sb_kernel_cols.setValue(cols_num)
+        sb_kernel_cols.setObjectName(f"sb_kernel_cols{kernel_num + 1}")
+
+        btn_load_kernel = QPushButton("Load...")
+        btn_load_kernel.setObjectName(f"btn_load_kernel{kernel_num + 1}")
 
-        for i in range(3):
-            layout_column = QHBoxLayout()
+        layout_size = QHBoxLayout()
+        layout_size.addWidget(sb_kernel_rows)
+        layout_size.addWidget(QLabel("x"))
+        layout_size.addWidget(sb_kernel_cols)
+        layout_size.addWidget(btn_load_kernel)
 
-            for j in range(3):
-                sb_kernel_cell = QSpinBox()
-                sb_kernel_cell.setMinimum(-100)
-                sb_kernel_cell.setMaximum(100)
-                sb_kernel_cell.setAlignment(Qt.AlignCenter)
+        table_kernel = QTableWidget(rows_num, cols_num)
+        table_kernel.horizontalHeader().setDefaultSectionSize(52)
+        table_kernel.verticalHeader().setDefaultSectionSize(26)
+        table_kernel.setMinimumSize(360, 220)
+        table_kernel.setObjectName(f"table_kernel{kernel_num + 1}")
 
-                if first_kernel:
-                    sb_kernel_cell.setValue(self.kernel1_values[i][j])
-                else:
-                    sb_kernel_cell.setValue(self.kernel2_values[i][j])
+        sb_kernel_rows.valueChanged.connect(lambda: convolve.resize_kernel(kernel_num))
+        sb_kernel_cols.valueChanged.connect(lambda: convolve.resize_kernel(kernel_num))
+        btn_load_kernel.clicked.connect(lambda: convolve.load_kernel(kernel_num))
+        table_kernel.itemChanged.connect(lambda item: convolve.update_kernel_value(kernel_num, item))
 
-                sb_kernel_cell.valueChanged.connect(
-                    lambda value, index=(i, j), first=first_kernel: convolve.update_kernel_value(index, value, first)
-                )
+        self.sb_kernel_rows.append(sb_kernel_rows)
+        self.sb_kernel_cols.append(sb_kernel_cols)
+        self.btns_load_kernel.append(btn_load_kernel)
+        self.tables_kernel.append(table_kernel)
 
-                layout_column.addWidget(sb_kernel_cell)
+        layout_editor = QVBoxLayout()
+        layout_editor.addLayout(layout_size)
+        layout_editor.addWidget(table_kernel)
 
-            widget = QWidget()
-            widget.setLayout(layout_column)
-            layout_grid.addWidget(widget)
+        editor = QWidget()
+        editor.setLayout(layout_editor)
 
-        return layout_grid
+        return editor
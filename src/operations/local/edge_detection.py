@@ -7,6 +7,7 @@ from PyQt5.QtCore import QCoreApplication
 from src.constants import BORDER_TYPES
 from ..operation import Operation
 from .edge_detection_ui import EdgeDetectionUI, DirectionalEdgeDetectionUI
+from .tiling import Tiling
 
 
 class EdgeDetection(QDialog, Operation, EdgeDetectionUI):
@@ -29,7 +30,7 @@ class EdgeDetection(QDialog, Operation, EdgeDetectionUI):
         self.__retranslate_ui()
 
         self.color_depth = parent.color_depth
-        self.img_data = parent.data.copy()
+        self.img_data = parent.share_data()
         self.current_img_data = None
 
         # Convertion, Canny method operates only on uint8 data type
@@ -45,7 +46,7 @@ class EdgeDetection(QDialog, Operation, EdgeDetectionUI):
         self.cb_edge_dt_type.activated[str].connect(self.update_form)
         self.cb_border_type.activated[str].connect(self.update_img_preview)
 
-        self.sb_kernel_size.valueChanged.connect(self.update_img_preview)
+        self.sb_kernel_size.valueChanged.connect(self.schedule_img_preview)
         self.sb_low_threshold.valueChanged.connect(self.validate_low_value)
         self.sb_high_threshold.valueChanged.connect(self.validate_high_value)
 
@@ -72,7 +73,7 @@ class EdgeDetection(QDialog, Operation, EdgeDetectionUI):
         if low_threshold >= self.sb_high_threshold.value():
             self.sb_high_threshold.setValue(low_threshold + 1)
 
-        self.update_img_preview()
+        self.schedule_img_preview()
 
     def validate_high_value(self):
         """Filter threshold range to be valid for the upper value."""
@@ -82,7 +83,7 @@ class EdgeDetection(QDialog, Operation, EdgeDetectionUI):
         if high_threshold <= self.sb_low_threshold.value():
             self.sb_low_threshold.setValue(high_threshold - 1)
 
-        self.update_img_preview()
+        self.schedule_img_preview()
 
     def update_form(self):
         """
@@ -105,7 +106,7 @@ class EdgeDetection(QDialog, Operation, EdgeDetectionUI):
 
         self.update_img_preview()
 
-    def calc_edges(self, edge_type, border, ksize, threshold):
+    def calc_edges(self, edge_type, border, ksize, threshold, img_data=None):
         """
         Detect image edges for selected edge type.
 
@@ -120,28 +121,32 @@ class EdgeDetection(QDialog, Operation, EdgeDetectionUI):
         :type ksize: int
         :param threshold: The lower:upper threshold values for Canny detection
         :type threshold: tuple[int]
+        :param img_data: The image data to calculate on, by default it's :attr:`img_data`
+        :type img_data: class:`numpy.ndarray` or None
         :return: The new image data with detected edges
         :rtype: class:`numpy.ndarray`
         """
 
         border_type = BORDER_TYPES[border]
+        if img_data is None:
+            img_data = self.img_data
 
-        # The kernel size must be odd and not larger than 31
-        if ksize % 2 == 0:
-            ksize -= 1
-            self.sb_kernel_size.setValue(ksize)
+        # Laplacian with the kernel size 1 applies 3x3 aperture
+        tiling = Tiling(Tiling.calc_kernel_halo(max(ksize, 3)))
 
         # Calculate Sobel detection for OX and OY axis and sum results
         if edge_type == "Sobel":
-            img_data_x = Sobel(self.img_data, CV_64F, 1, 0, ksize=ksize, borderType=border_type)
-            img_data_y = Sobel(self.img_data, CV_64F, 0, 1, ksize=ksize, borderType=border_type)
-            img_data = add(img_data_x, img_data_y)
+            img_data = tiling.apply(lambda tile: add(Sobel(tile, CV_64F, 1, 0, ksize=ksize, borderType=border_type),
+                                                     Sobel(tile, CV_64F, 0, 1, ksize=ksize, borderType=border_type)),
+                                    img_data)
 
         elif edge_type == "Laplacian":
-            img_data = Laplacian(self.img_data, CV_64F, ksize=ksize, borderType=border_type)
+            img_data = tiling.apply(lambda tile: Laplacian(tile, CV_64F, ksize=ksize, borderType=border_type),
+                                    img_data)
 
+        # Canny isn't local, as hysteresis traces edges through the whole image
         else:
-            img_data = Canny(self.img_data, threshold[0], threshold[1])
+            img_data = Canny(img_data, threshold[0], threshold[1])
 
         # Normalize and convert image to uint8 data type
         return normalize(abs(img_data), None, 0, 255, NORM_MINMAX, dtype=0)
@@ -150,7 +155,8 @@ class EdgeDetection(QDialog, Operation, EdgeDetectionUI):
         """
         Update image preview window.
 
-        - Calculate image edges based on form parameters.
+        - Validate kernel size to be odd.
+        - Calculate image edges based on form parameters in the background.
         - Reload image preview using the base :class:`operation.Operation` method.
         """
 
@@ -160,8 +166,12 @@ class EdgeDetection(QDialog, Operation, EdgeDetectionUI):
         low_thresh = self.sb_low_threshold.value()
         high_thresh = self.sb_high_threshold.value()
 
-        self.current_img_data = self.calc_edges(edge, border, ksize, (low_thresh, high_thresh))
-        super().update_img_preview()
+        # The kernel size must be odd and not larger than 31
+        if ksize % 2 == 0:
+            ksize -= 1
+            self.sb_kernel_size.setValue(ksize)
+
+        self.run_img_preview(self.calc_edges, edge, border, ksize, (low_thresh, high_thresh))
 
 
 class DirectionalEdgeDetection(QDialog, Operation, DirectionalEdgeDetectionUI):
@@ -194,7 +204,7 @@ class DirectionalEdgeDetection(QDialog, Operation, DirectionalEdgeDetectionUI):
         self.init_ui(self)
         self.__retranslate_ui()
 
-        self.img_data = parent.data.copy()
+        self.img_data = parent.share_data()
         self.current_img_data = None
 
         if self.img_data.dtype.itemsize > 1:
@@ -216,7 +226,7 @@ class DirectionalEdgeDetection(QDialog, Operation, DirectionalEdgeDetectionUI):
         self.label_border_type.setText(_translate(_window_title, "Border type:"))
         self.label_masks_txt.setText(_translate(_window_title, "Prewitt direction masks:\n"))
 
-    def calc_edges(self, direction, border):
+    def calc_edges(self, direction, border, img_data=None):
         """
         Detect image edges for selected direction.
         Direction specifies Prewitt mask.
@@ -224,6 +234,8 @@ class DirectionalEdgeDetection(QDialog, Operation, DirectionalEdgeDetectionUI):
         :param direction: The Prewitt mask direction, defined in DIRECTION_MASKS
         :param border: The border type for edge detection, defined in BORDER_TYPES
         :type border: str
+        :param img_data: The image data to calculate on, by default it's :attr:`img_data`
+        :type img_data: class:`numpy.ndarray` or None
         :return: The new image data with detected edges
         :rtype: class:`numpy.ndarray`
         """
@@ -231,18 +243,21 @@ class DirectionalEdgeDetection(QDialog, Operation, DirectionalEdgeDetectionUI):
         border_type = BORDER_TYPES[border]
         direction_mask = self.DIRECTION_MASKS[direction]
 
-        return filter2D(self.img_data, -1, direction_mask, borderType=border_type)
+        if img_data is None:
+            img_data = self.img_data
+
+        return Tiling(Tiling.calc_kernel_halo(direction_mask.shape)).apply(
+            lambda tile: filter2D(tile, -1, direction_mask, borderType=border_type), img_data)
 
     def update_img_preview(self):
         """
         Update image preview window.
 
-        - Calculate image edges based on chosen direction and border.
+        - Calculate image edges based on chosen direction and border in the background.
         - Reload image preview using the base :class:`operation.Operation` method.
         """
 
         direction = self.cb_edge_dt_direction.currentText()
         border = self.cb_border_type.currentText()
 
-        self.current_img_data = self.calc_edges(direction, border)
-        super().update_img_preview()
+        self.run_img_preview(self.calc_edges, direction, border)
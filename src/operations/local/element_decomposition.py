@@ -0,0 +1,264 @@
+from cv2 import (erode, dilate, subtract, morphologyEx, copyMakeBorder, getStructuringElement,
+                 MORPH_CROSS, MORPH_ERODE, MORPH_DILATE, MORPH_OPEN, MORPH_CLOSE, MORPH_GRADIENT,
+                 MORPH_TOPHAT, MORPH_BLACKHAT, BORDER_CONSTANT, BORDER_ISOLATED)
+from numpy import zeros, ones, uint8, flatnonzero, array_equal, maximum, abs as absolute, arange, iinfo, finfo
+
+
+class ElementDecomposition:
+    """
+    The ElementDecomposition class implements morphology with a large structuring element
+    decomposed into a sequence of small ones.
+
+    Erosion with the Minkowski sum of elements is the sequence of erosions with them, and so is dilation.
+    An octagon, including a diamond, is the sum of a rectangle, two diagonal lines and one or two 3x3 crosses.
+    The rectangle is applied by OpenCV as separable row and column passes.
+    A diagonal line of length n is the sum of log2(n) elements of two points, e.g. the line of length 8 is
+    the sum of the pairs of points 1, 2 and 4 pixels apart, so every pass compares only two pixels.
+    So an octagon of size NxN costs O(N + log(N)) per pixel instead of O(N²) of the element applied at once.
+
+    Other elements, e.g. ellipses, and small octagons, which are faster applied at once, aren't decomposed.
+    The result is the same as of :func:`cv2.morphologyEx` with the element.
+    """
+
+    # The minimum radius of an octagon to decompose it, smaller ones are faster applied at once
+    MIN_RADIUS = 10
+
+    def __init__(self, element):
+        """
+        Create a new decomposition.
+
+        :param element: The structuring element with the default centered anchor
+        :type element: :class:`numpy.ndarray`
+        """
+
+        self.element = element
+        self.passes = self.decompose(element)
+
+    @staticmethod
+    def calc_octagon(side_radius, diagonal_radius):
+        """
+        Calculate the octagon element, the sum of a square and a diamond.
+
+        :param side_radius: The half of the horizontal and vertical sides, the radius of the square
+        :type side_radius: int
+        :param diagonal_radius: The radius of the diamond, which makes the diagonal sides
+        :type diagonal_radius: int
+        :return: The element of size NxN, where N = 2 * (side_radius + diagonal_radius) + 1
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        radius = side_radius + diagonal_radius
+        distances = maximum(absolute(arange(-radius, radius + 1)) - side_radius, 0)
+
+        return uint8(distances[:, None] + distances[None, :] <= diagonal_radius)
+
+    @staticmethod
+    def calc_line_passes(length, direction):
+        """
+        Decompose the centered diagonal line into the elements of two points.
+
+        The points of the elements are 1, 2, 4, ... pixels apart, the last ones cover the rest of the line.
+
+        :param length: The odd number of the line pixels
+        :type length: int
+        :param direction: The column step of the line per row, 1 for the diagonal or -1 for the anti-diagonal
+        :type direction: int
+        :return: The elements and their (x, y) anchors
+        :rtype: list[tuple[:class:`numpy.ndarray`, tuple[int, int]]]
+        """
+
+        steps = []
+        covered = 1
+        while covered < length:
+            steps.append(min(covered, length - covered))
+            covered += steps[-1]
+
+        # The anchors shift the line to the center, in total by the half of its length
+        shifts = [step // 2 for step in steps]
+        remainder = (length - 1) // 2 - sum(shifts)
+        for i, step in enumerate(steps):
+            if remainder and step % 2:
+                shifts[i] += 1
+                remainder -= 1
+
+        passes = []
+        for step, shift in zip(steps, shifts):
+            kernel = zeros((step + 1, step + 1), uint8)
+
+            if direction == 1:
+                kernel[0, 0] = kernel[step, step] = 1
+                passes.append((kernel, (shift, shift)))
+            else:
+                kernel[0, step] = kernel[step, 0] = 1
+                passes.append((kernel, (step - shift, shift)))
+
+        return passes
+
+    @classmethod
+    def calc_diamond_passes(cls, radius):
+        """
+        Decompose the diamond into two diagonal lines and one or two 3x3 crosses.
+
+        The sum of the lines of length 2a+1 is the diamond of radius 2a without every second pixel,
+        the cross fills the gaps and grows it to radius 2a+1.
+
+        :param radius: The diamond radius
+        :type radius: int
+        :return: The elements and their (x, y) anchors
+        :rtype: list[tuple[:class:`numpy.ndarray`, tuple[int, int]]]
+        """
+
+        cross = getStructuringElement(MORPH_CROSS, (3, 3)), (-1, -1)
+
+        if radius <= 2:
+            return [cross] * radius
+
+        line_radius = (radius - 1) // 2
+
+        return (cls.calc_line_passes(2 * line_radius + 1, 1) + cls.calc_line_passes(2 * line_radius + 1, -1)
+                + [cross] * (radius - 2 * line_radius))
+
+    @classmethod
+    def decompose(cls, element):
+        """
+        Decompose the element into the sequence of small ones, if it's a large enough octagon.
+
+        :param element: The structuring element
+        :type element: :class:`numpy.ndarray`
+        :return: The elements and their (x, y) anchors, ``None`` if the element isn't decomposed
+        :rtype: list[tuple[:class:`numpy.ndarray`, tuple[int, int]]] or None
+        """
+
+        height, width = element.shape
+        if height != width or height % 2 == 0:
+            return None
+
+        # The top side of the octagon is centered in the top row
+        top = flatnonzero(element[0])
+        if len(top) == 0:
+            return None
+
+        radius = height // 2
+        side_radius = radius - int(top[0])
+        diagonal_radius = radius - side_radius
+
+        # Rectangles are already applied by OpenCV as separable passes
+        if radius < cls.MIN_RADIUS or diagonal_radius == 0 \
+                or not array_equal(element != 0, cls.calc_octagon(side_radius, diagonal_radius) != 0):
+            return None
+
+        passes = cls.calc_diamond_passes(diagonal_radius)
+        if side_radius:
+            passes.insert(0, (ones((2 * side_radius + 1,) * 2, uint8), (-1, -1)))
+
+        return passes
+
+    def is_decomposed(self):
+        """
+        Check if the element is decomposed.
+
+        :rtype: bool
+        """
+
+        return self.passes is not None
+
+    def __apply_passes(self, func, img_data, border_type, iterations):
+        """
+        Apply erosion or dilation with the decomposed element.
+
+        The image is extended with the border once for every iteration, as by :func:`cv2.erode`,
+        so the passes see the border pixels transformed by the previous passes.
+        The constant border, the default one of OpenCV morphology, is the maximum value for erosion
+        and the minimum one for dilation, so it never changes the result.
+
+        :param func: The operation for a pass: :func:`cv2.erode` or :func:`cv2.dilate`
+        :type func: callable
+        """
+
+        radius = self.element.shape[0] // 2
+        border_value = None
+        if border_type & ~BORDER_ISOLATED == BORDER_CONSTANT:
+            limits = iinfo(img_data.dtype) if img_data.dtype.kind in "ui" else finfo(img_data.dtype)
+            border_value = limits.max if func is erode else limits.min
+
+        for _ in range(iterations):
+            img_data = copyMakeBorder(img_data, radius, radius, radius, radius, border_type & ~BORDER_ISOLATED,
+                                      value=border_value)
+
+            for kernel, anchor in self.passes:
+                img_data = func(img_data, kernel, anchor=anchor, borderType=BORDER_CONSTANT)
+
+            img_data = img_data[radius:-radius, radius:-radius]
+
+        return img_data
+
+    def erode(self, img_data, border_type, iterations=1):
+        """
+        Erode the image with the element.
+
+        :param img_data: The image data
+        :type img_data: :class:`numpy.ndarray`
+        :param border_type: The border type, defined in BORDER_TYPES
+        :type border_type: int
+        :param iterations: The number of times erosion is applied
+        :type iterations: int
+        :return: The eroded image data
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        if not self.is_decomposed():
+            return erode(img_data, self.element, iterations=iterations, borderType=border_type)
+
+        return self.__apply_passes(erode, img_data, border_type, iterations)
+
+    def dilate(self, img_data, border_type, iterations=1):
+        """
+        Dilate the image with the element.
+
+        Parameters are the same as for :meth:`erode`.
+
+        :return: The dilated image data
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        if not self.is_decomposed():
+            return dilate(img_data, self.element, iterations=iterations, borderType=border_type)
+
+        return self.__apply_passes(dilate, img_data, border_type, iterations)
+
+    def apply(self, operation, img_data, border_type, iterations=1):
+        """
+        Apply the morphological operation with the element, the same way as :func:`cv2.morphologyEx`.
+
+        :param operation: The operation number, defined in MORPH_OPERATIONS
+        :type operation: int
+        :param img_data: The image data
+        :type img_data: :class:`numpy.ndarray`
+        :param border_type: The border type, defined in BORDER_TYPES
+        :type border_type: int
+        :param iterations: The number of times erosion and dilation are applied
+        :type iterations: int
+        :return: The transformed image data
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        if not self.is_decomposed():
+            return morphologyEx(img_data, operation, self.element, iterations=iterations, borderType=border_type)
+
+        if operation == MORPH_ERODE:
+            return self.erode(img_data, border_type, iterations)
+        if operation == MORPH_DILATE:
+            return self.dilate(img_data, border_type, iterations)
+        if operation == MORPH_OPEN:
+            return self.dilate(self.erode(img_data, border_type, iterations), border_type, iterations)
+        if operation == MORPH_CLOSE:
+            return self.erode(self.dilate(img_data, border_type, iterations), border_type, iterations)
+        if operation == MORPH_GRADIENT:
+            return subtract(self.dilate(img_data, border_type, iterations),
+                            self.erode(img_data, border_type, iterations))
+        if operation == MORPH_TOPHAT:
+            return subtract(img_data, self.apply(MORPH_OPEN, img_data, border_type, iterations))
+        if operation == MORPH_BLACKHAT:
+            return subtract(self.apply(MORPH_CLOSE, img_data, border_type, iterations), img_data)
+
+        raise ValueError("Unsupported morphological operation")
@@ -0,0 +1,149 @@
+from math import pi
+
+from cv2 import getGaussianKernel, getGaborKernel, CV_32F, CV_64F
+from numpy import array, ones, float64, isfinite, arange
+
+from .convolution import Convolution
+
+
+class KernelLibrary:
+    """
+    The KernelLibrary class provides the built-in convolution kernels and loads the kernels from text files.
+
+    Kernels are defined by the name and the odd size, the other parameters are derived from the size,
+    e.g. sigma of Gaussian is derived by the formula of :func:`cv2.getGaussianKernel` for the non-positive sigma.
+    Kernels built of Gaussians are separated analytically: Gaussian is the outer product of two 1D Gaussians,
+    Laplacian of Gaussian and Difference of Gaussians are the sums of two products,
+    the other kernels are separated by SVD once.
+    The kernels, their factors and the planned convolutions are calculated on the first use and kept,
+    so applying a library kernel again doesn't separate or plan it again.
+    """
+
+    # The names of the built-in kernels
+    NAMES = ("Gaussian", "Laplacian of Gaussian", "Difference of Gaussians",
+             "Gabor 0°", "Gabor 45°", "Gabor 90°", "Gabor 135°", "Motion Blur")
+
+    # The ratio of sigmas of the wide and the narrow Gaussian of Difference of Gaussians
+    DOG_SIGMA_RATIO = 1.6
+
+    # The kernels with their factors and the convolutions, calculated on the first use
+    _kernels = dict()
+    _convolutions = dict()
+
+    @staticmethod
+    def calc_sigma(ksize):
+        """
+        Calculate sigma of Gaussian for the kernel size by the formula of :func:`cv2.getGaussianKernel`.
+
+        :param ksize: The odd kernel size
+        :type ksize: int
+        :rtype: float
+        """
+
+        return 0.3 * ((ksize - 1) * 0.5 - 1) + 0.8
+
+    @classmethod
+    def calc_kernel(cls, name, ksize):
+        """
+        Calculate the built-in kernel and its separable factors.
+
+        :param name: The kernel name, one of :attr:`NAMES`
+        :type name: str
+        :param ksize: The odd number for NxN kernel, or the length of the motion blur
+        :type ksize: int
+        :return: The kernel and its factors as returned by :meth:`convolution.Convolution.separate`
+        :rtype: tuple[:class:`numpy.ndarray`, list[tuple[:class:`numpy.ndarray`, :class:`numpy.ndarray`]]]
+        """
+
+        assert name in cls.NAMES, AssertionError("Unknown kernel")
+
+        sigma = cls.calc_sigma(ksize)
+        gaussian = getGaussianKernel(ksize, sigma, CV_64F).ravel()
+
+        if name == "Gaussian":
+            factors = [(gaussian, gaussian)]
+
+        elif name == "Laplacian of Gaussian":
+            # The second derivative of Gaussian along one axis times Gaussian along the other one
+            x = arange(ksize) - ksize // 2
+            derivative = (x**2 - sigma**2) / sigma**4 * gaussian
+            factors = [(derivative, gaussian), (gaussian, derivative)]
+
+        elif name == "Difference of Gaussians":
+            wide_gaussian = getGaussianKernel(ksize, cls.DOG_SIGMA_RATIO * sigma, CV_64F).ravel()
+            factors = [(gaussian, gaussian), (-wide_gaussian, wide_gaussian)]
+
+        elif name == "Motion Blur":
+            # The horizontal line of the 1xN kernel
+            factors = [(ones(ksize) / ksize, ones(1))]
+
+        else:
+            theta = float(name.split()[1].rstrip("°")) * pi / 180
+            kernel = getGaborKernel((ksize, ksize), sigma, theta, 2 * sigma, 0.5, 0, CV_64F)
+
+            return kernel, Convolution.separate(kernel)
+
+        return sum(column[:, None] * row[None, :] for row, column in factors), factors
+
+    @classmethod
+    def get_kernel(cls, name, ksize):
+        """
+        Get the built-in kernel and its factors, calculating them on the first use.
+
+        Parameters and the result are the same as of :meth:`calc_kernel`, the result mustn't be modified.
+        """
+
+        key = name, ksize
+        if key not in cls._kernels:
+            cls._kernels[key] = cls.calc_kernel(name, ksize)
+
+        return cls._kernels[key]
+
+    @classmethod
+    def get_convolution(cls, name, ksize, ddepth=CV_32F):
+        """
+        Get the convolution with the built-in kernel, planning it on the first use.
+
+        :param name: The kernel name, one of :attr:`NAMES`
+        :type name: str
+        :param ksize: The odd kernel size
+        :type ksize: int
+        :param ddepth: The depth of the result and of the accumulation
+        :type ddepth: int
+        :rtype: :class:`convolution.Convolution`
+        """
+
+        key = name, ksize, ddepth
+        if key not in cls._convolutions:
+            kernel, factors = cls.get_kernel(name, ksize)
+            cls._convolutions[key] = Convolution(kernel, ddepth, [factors])
+
+        return cls._convolutions[key]
+
+    @staticmethod
+    def load(file_path):
+        """
+        Load the kernel from the text file.
+
+        Every line is a row of the kernel, values are separated by whitespaces or commas.
+        Empty lines and lines starting with "#" are skipped.
+
+        :param file_path: The path to the file
+        :type file_path: str
+        :return: The kernel of MxN size
+        :rtype: :class:`numpy.ndarray`
+        :raises ValueError: If the file isn't a matrix of finite numbers
+        """
+
+        with open(file_path) as file:
+            rows = [line.replace(",", " ").split() for line in file
+                    if line.strip() and not line.lstrip().startswith("#")]
+
+        if not rows or any(len(row) != len(rows[0]) for row in rows):
+            raise ValueError("The kernel must have rows of the same length")
+
+        kernel = array(rows, float64)
+        if not isfinite(kernel).all():
+            raise ValueError("The kernel values must be finite")
+
+        return kernel
@@ -1,11 +1,16 @@
-from cv2 import subtract, bitwise_or, getStructuringElement, morphologyEx, countNonZero, threshold
-from numpy import zeros, uint8, add, r_
+from math import sqrt
+
+from cv2 import subtract, bitwise_or, getStructuringElement, countNonZero, threshold
+from numpy import zeros, uint8, add, r_, ndarray
 from PyQt5.QtWidgets import QDialog
-from PyQt5.QtCore import QCoreApplication
+from PyQt5.QtCore import Qt, QCoreApplication
 
 from src.constants import BORDER_TYPES, MORPH_SHAPES, MORPH_OPERATIONS
 from ..operation import Operation
 from .morphology_ui import MorphologyUI
+from .thinning import Thinning
+from .element_decomposition import ElementDecomposition
+from .morphology_cache import MorphologyCache
 
 
 class Morphology(QDialog, Operation, MorphologyUI):
@@ -26,18 +31,27 @@ class Morphology(QDialog, Operation, MorphologyUI):
         self.init_ui(self)
         self.__retranslate_ui()
 
-        self.img_data = parent.data.copy()
+        self.img_data = parent.share_data()
         self.current_img_data = None
         self.structuring_element = None
+        self.morphology_cache = MorphologyCache()
 
         self.sb_kernel_size.setMaximum(99)
 
+        # Skeletonization erodes the whole image until it's empty, so it can't be streamed tile by tile
+        if parent.is_out_of_core():
+            index = self.cb_operation.findText("Skeletonize")
+            self.cb_operation.model().item(index).setEnabled(False)
+            self.cb_operation.setItemData(index, "The operation isn't available for images stored out of core",
+                                          Qt.ToolTipRole)
+
         self.cb_operation.activated[str].connect(self.update_img_preview)
         self.cb_border_type.activated[str].connect(self.update_img_preview)
+        self.cb_skeleton_method.activated[str].connect(self.update_img_preview)
         self.cb_struct_element_shape.activated[str].connect(self.update_structuring_element)
 
         self.sb_kernel_size.valueChanged.connect(self.update_structuring_element)
-        self.sb_iterations.valueChanged.connect(self.update_img_preview)
+        self.sb_iterations.valueChanged.connect(self.schedule_img_preview)
         self.rbtn_show_hist.clicked.connect(self.update_hist)
 
         self.update_structuring_element()
@@ -50,11 +64,37 @@ class Morphology(QDialog, Operation, MorphologyUI):
 
         self.setWindowTitle(_window_title)
         self.label_operation.setText(_translate(_window_title, "Operation:"))
+        self.label_skeleton_method.setText(_translate(_window_title, "Skeleton method:"))
         self.label_struct_element_shape.setText(_translate(_window_title, "Shape of \nstructuring element:"))
         self.label_kernel_size.setText(_translate(_window_title, "Kernel size:"))
         self.label_iterations.setText(_translate(_window_title, "Iterations:"))
         self.label_border_type.setText(_translate(_window_title, "Border type:"))
 
+    @staticmethod
+    def calc_structuring_element(shape, ksize):
+        """
+        Calculate structuring element of the given shape and size.
+
+        Large diamonds and octagons are decomposed by :class:`element_decomposition.ElementDecomposition`.
+
+        :param shape: The shape of structuring element, defined in MORPH_SHAPES, "Diamond" or "Octagon"
+        :type shape: str
+        :param ksize: The odd number for NxN structuring element
+        :type ksize: int
+        :return: The structuring element
+        :rtype: class:`numpy.ndarray`
+        """
+
+        if shape == "Diamond":
+            return uint8(add.outer(*[r_[:ksize, ksize:-1:-1]] * 2) >= ksize)
+
+        if shape == "Octagon":
+            # The regular octagon, its straight sides are sqrt(2) - 1 of the radius
+            side_radius = round(ksize // 2 * (sqrt(2) - 1))
+            return ElementDecomposition.calc_octagon(side_radius, ksize // 2 - side_radius)
+
+        return getStructuringElement(MORPH_SHAPES[shape], (ksize, ksize))
+
     def update_structuring_element(self):
         """Update structuring element whenever shape or kernel size changed."""
 
@@ -65,34 +105,51 @@ class Morphology(QDialog, Operation, MorphologyUI):
             ksize -= 1
             self.sb_kernel_size.setValue(ksize)
 
-        if shape == "Diamond":
-            self.structuring_element = uint8(add.outer(*[r_[:ksize, ksize:-1:-1]] * 2) >= ksize)
-        else:
-            self.structuring_element = getStructuringElement(MORPH_SHAPES[shape], (ksize, ksize))
+        self.structuring_element = self.calc_structuring_element(shape, ksize)
 
-        self.update_img_preview()
+        self.schedule_img_preview()
 
-    def calc_skeletonize(self, border):
+    def calc_skeletonize(self, method, border, structuring_element=None, img_data=None):
         """
         Calculate skeletonization of the image
 
+        The skeleton is thinned by :class:`thinning.Thinning` with one of its methods.
+        The "Morphological" method is the reference one: the union of differences between
+        the image eroded n times and its opening, it depends on the structuring element and the border type.
+
+        :param method: The skeletonization method, one of :attr:`thinning.Thinning.METHODS` or "Morphological"
+        :type method: str
         :param border: The border type for morphology, defined in BORDER_TYPES
         :type border: str
+        :param structuring_element: The structuring element, by default it's :attr:`structuring_element`
+        :type structuring_element: class:`numpy.ndarray` or None
+        :param img_data: The image data to calculate on, by default it's :attr:`img_data`
+        :type img_data: class:`numpy.ndarray` or None
         :return: The new skeletonized image data
         :rtype: class:`numpy.ndarray`
         """
 
         border_type = BORDER_TYPES[border]
-        _, img_data = threshold(self.img_data, 127, 255, 0)
+        if structuring_element is None:
+            structuring_element = self.structuring_element
+        if img_data is None:
+            img_data = self.img_data
+
+        # Skeletonization erodes the whole image until it's empty, so it isn't streamed tile by tile
+        assert isinstance(img_data, ndarray), AssertionError("The image stored out of core can't be skeletonized")
+
+        _, img_data = threshold(img_data, 127, 255, 0)
+
+        if method != "Morphological":
+            return Thinning(method).apply(img_data)
 
         skeleton = zeros(img_data.shape, uint8)
+        decomposition = ElementDecomposition(structuring_element)
 
         while True:
-            opened = morphologyEx(img_data, MORPH_OPERATIONS["Open"],
-                                  self.structuring_element, borderType=border_type)
+            opened = decomposition.apply(MORPH_OPERATIONS["Open"], img_data, border_type)
             diff = subtract(img_data, opened)
-            eroded = morphologyEx(img_data, MORPH_OPERATIONS["Erode"],
-                                  self.structuring_element, borderType=border_type)
+            eroded = decomposition.erode(img_data, border_type)
             skeleton = bitwise_or(skeleton, diff)
             img_data = eroded.copy()
 
@@ -101,48 +158,64 @@ class Morphology(QDialog, Operation, MorphologyUI):
 
         return skeleton
 
-    def calc_edges(self, border):
+    def calc_edges(self, border, structuring_element=None, img_data=None):
         """
         Calculate edges based on morphological dilate and erode operations
 
+        Dilation and erosion are shared with other operations by :attr:`morphology_cache`.
+
         :param border: The border type for morphology, defined in BORDER_TYPES
         :type border: str
+        :param structuring_element: The structuring element, by default it's :attr:`structuring_element`
+        :type structuring_element: class:`numpy.ndarray` or None
+        :param img_data: The image data to calculate on, by default it's :attr:`img_data`
+        :type img_data: class:`numpy.ndarray` or None
         :return: The new image data with detected edges
         :rtype: class:`numpy.ndarray`
         """
 
-        border_type = BORDER_TYPES[border]
-
-        dilated = morphologyEx(self.img_data, MORPH_OPERATIONS["Dilate"],
-                               self.structuring_element, borderType=border_type)
-        eroded = morphologyEx(self.img_data, MORPH_OPERATIONS["Erode"],
-                              self.structuring_element, borderType=border_type)
+        if structuring_element is None:
+            structuring_element = self.structuring_element
+        if img_data is None:
+            img_data = self.img_data
 
-        return dilated - eroded
+        return self.morphology_cache.calc_edges(img_data, structuring_element, BORDER_TYPES[border])
 
-    def calc_morphology(self, operation_name, border, iterations):
+    def calc_morphology(self, operation_name, border, iterations, structuring_element=None, img_data=None):
         """
         Calculate morphological transformation based on structuring element,
         operation and border type
 
+        Erosion, dilation, opening and closing are cached by :attr:`morphology_cache`,
+        so switching between the operations derived from them costs only their differences.
+
         :param operation_name: The type of morphological operation
         :type operation_name: str
         :param border: The border type for morphology, defined in BORDER_TYPES
         :type border: str
         :param iterations: The number of times to execute operation
         :type iterations: str
+        :param structuring_element: The structuring element, by default it's :attr:`structuring_element`
+        :type structuring_element: class:`numpy.ndarray` or None
+        :param img_data: The image data to calculate on, by default it's :attr:`img_data`
+        :type img_data: class:`numpy.ndarray` or None
         :return: The new morphological transformed image data
         :rtype: class:`numpy.ndarray`
         """
 
-        return morphologyEx(self.img_data, MORPH_OPERATIONS[operation_name], self.structuring_element,
-                            iterations=iterations, borderType=BORDER_TYPES[border])
+        if structuring_element is None:
+            structuring_element = self.structuring_element
+        if img_data is None:
+            img_data = self.img_data
+
+        return self.morphology_cache.apply(operation_name, img_data, structuring_element, BORDER_TYPES[border],
+                                           iterations)
 
     def update_img_preview(self):
         """
         Update image preview window.
 
-        - Calculate morphological transformation.
+        - Calculate morphological transformation in the background.
         - Reload histogram preview.
         - Reload image preview using the base :class:`operation.Operation` method.
         """
@@ -151,14 +224,29 @@ class Morphology(QDialog, Operation, MorphologyUI):
         border_type = self.cb_border_type.currentText()
         iterations = self.sb_iterations.value()
 
+        # Pass the current structuring element, as it's replaced on the GUI thread while the preview is calculated
+        structuring_element = self.structuring_element
+
+        # Scale structuring element to the preview, the minimum 3x3 element still changes the image.
+        # The kernel size is scaled rather than the element side, which is 2 * ksize + 1 for diamonds
+        shape = self.cb_struct_element_shape.currentText()
+        ksize = self.sb_kernel_size.value()
+
+        def scale_element(scale):
+            return self.calc_structuring_element(shape, self.scale_kernel_size(ksize, 3, scale))
+
+        self.cb_skeleton_method.setEnabled(operation_name == "Skeletonize")
+
         if operation_name == "Skeletonize":
             self.sb_iterations.setEnabled(False)
-            self.current_img_data = self.calc_skeletonize(border_type)
+            self.run_img_preview(self.calc_skeletonize, self.cb_skeleton_method.currentText(), border_type,
+                                 structuring_element)
         elif operation_name == "Edge Detection":
             self.sb_iterations.setEnabled(False)
-            self.current_img_data = self.calc_edges(border_type)
+            self.run_img_preview(self.calc_edges, border_type, structuring_element,
+                                 scale_args=lambda scale: (border_type, scale_element(scale)))
         else:
             self.sb_iterations.setEnabled(True)
-            self.current_img_data = self.calc_morphology(operation_name, border_type, iterations)
-
-        super().update_img_preview()
+            self.run_img_preview(self.calc_morphology, operation_name, border_type, iterations, structuring_element,
+                                 scale_args=lambda scale: (operation_name, border_type, iterations,
+                                                           scale_element(scale)))
@@ -0,0 +1,220 @@
+from collections import OrderedDict
+from threading import Lock
+
+from cv2 import subtract
+from numpy import ndarray
+
+from src.constants import MORPH_OPERATIONS
+from .tiling import Tiling
+from .element_decomposition import ElementDecomposition
+
+
+class MorphologyCache:
+    """
+    The MorphologyCache class memoizes the morphological primitives of images for a dialog.
+
+    Erosion, dilation, opening and closing are cached by the image, the structuring element,
+    the number of iterations and the border type, so flipping through the operations recalculates nothing:
+    opening dilates the cached erosion, closing erodes the cached dilation,
+    top hat, black hat and edges are only differences of the cached results.
+    Switching back to the previous border type or element reuses its results as well.
+
+    The least recently used results are dropped once their size exceeds :attr:`memory_cap`.
+    Cached results are read-only, they're shared by all operations using them.
+    The image data stored out of core isn't cached, it's streamed tile by tile anyway.
+    """
+
+    # The default number of bytes of cached results
+    MEMORY_CAP = 2**28
+
+    def __init__(self, memory_cap=None):
+        """
+        Create a new empty cache.
+
+        :param memory_cap: The number of bytes of cached results, by default it's :attr:`MEMORY_CAP`
+        :type memory_cap: int or None
+        """
+
+        self.memory_cap = memory_cap or self.MEMORY_CAP
+
+        # The results and their images by the keys, the images are referenced to keep their ids unique
+        self._results = OrderedDict()
+        self._nbytes = 0
+
+        # Previews are calculated both on the GUI thread and in the background
+        self._lock = Lock()
+
+        self.hits_num = 0
+        self.misses_num = 0
+
+    @property
+    def nbytes(self):
+        """Get the number of bytes of cached results."""
+
+        return self._nbytes
+
+    def clear(self):
+        """Drop all cached results."""
+
+        with self._lock:
+            self._results.clear()
+            self._nbytes = 0
+
+    def erode(self, img_data, structuring_element, border_type, iterations=1):
+        """
+        Get the image eroded with the element.
+
+        :param img_data: The image data
+        :type img_data: :class:`numpy.ndarray` or :class:`image.image_store.ImageStore`
+        :param structuring_element: The structuring element
+        :type structuring_element: :class:`numpy.ndarray`
+        :param border_type: The border type, defined in BORDER_TYPES
+        :type border_type: int
+        :param iterations: The number of times erosion is applied
+        :type iterations: int
+        :return: The eroded image data
+        :rtype: :class:`numpy.ndarray` or :class:`image.image_store.ImageStore`
+        """
+
+        return self.__get("Erode", img_data, structuring_element, border_type, iterations, "erode", img_data)
+
+    def dilate(self, img_data, structuring_element, border_type, iterations=1):
+        """
+        Get the image dilated with the element.
+
+        Parameters are the same as for :meth:`erode`.
+
+        :return: The dilated image data
+        :rtype: :class:`numpy.ndarray` or :class:`image.image_store.ImageStore`
+        """
+
+        return self.__get("Dilate", img_data, structuring_element, border_type, iterations, "dilate", img_data)
+
+    def open(self, img_data, structuring_element, border_type, iterations=1):
+        """
+        Get the opening of the image, the dilation of its cached erosion.
+
+        Parameters are the same as for :meth:`erode`.
+
+        :return: The opened image data
+        :rtype: :class:`numpy.ndarray` or :class:`image.image_store.ImageStore`
+        """
+
+        return self.__get("Open", img_data, structuring_element, border_type, iterations, "dilate",
+                          lambda: self.erode(img_data, structuring_element, border_type, iterations))
+
+    def close(self, img_data, structuring_element, border_type, iterations=1):
+        """
+        Get the closing of the image, the erosion of its cached dilation.
+
+        Parameters are the same as for :meth:`erode`.
+
+        :return: The closed image data
+        :rtype: :class:`numpy.ndarray` or :class:`image.image_store.ImageStore`
+        """
+
+        return self.__get("Close", img_data, structuring_element, border_type, iterations, "erode",
+                          lambda: self.dilate(img_data, structuring_element, border_type, iterations))
+
+    def apply(self, operation_name, img_data, structuring_element, border_type, iterations=1):
+        """
+        Apply the morphological operation from the cached primitives.
+
+        The result is the same as of :func:`cv2.morphologyEx`.
+
+        :param operation_name: The operation, defined in MORPH_OPERATIONS
+        :type operation_name: str
+        :return: The transformed image data
+        :rtype: :class:`numpy.ndarray` or :class:`image.image_store.ImageStore`
+
+        Other parameters are the same as for :meth:`erode`.
+        """
+
+        # Compound operations on the image data stored out of core are streamed at once, as it isn't cached
+        if not isinstance(img_data, ndarray):
+            decomposition = ElementDecomposition(structuring_element)
+            halo = Tiling.calc_kernel_halo(structuring_element.shape, iterations)
+            if operation_name not in ("Erode", "Dilate"):
+                halo *= 2
+
+            return Tiling(halo).apply(lambda tile: decomposition.apply(MORPH_OPERATIONS[operation_name], tile,
+                                                                       border_type, iterations), img_data)
+
+        if operation_name == "Top Hat":
+            return subtract(img_data, self.open(img_data, structuring_element, border_type, iterations))
+        if operation_name == "Black Hat":
+            return subtract(self.close(img_data, structuring_element, border_type, iterations), img_data)
+
+        primitives = {"Erode": self.erode, "Dilate": self.dilate, "Open": self.open, "Close": self.close}
+        assert operation_name in primitives, AssertionError("Unknown morphological operation")
+
+        return primitives[operation_name](img_data, structuring_element, border_type, iterations)
+
+    def calc_edges(self, img_data, structuring_element, border_type):
+        """
+        Get the morphological gradient of the image, the difference of its cached dilation and erosion.
+
+        :return: The image data with detected edges
+        :rtype: :class:`numpy.ndarray` or :class:`image.image_store.ImageStore`
+
+        Parameters are the same as for :meth:`erode`.
+        """
+
+        if not isinstance(img_data, ndarray):
+            decomposition = ElementDecomposition(structuring_element)
+
+            def calc_tile_edges(tile):
+                return subtract(decomposition.dilate(tile, border_type), decomposition.erode(tile, border_type))
+
+            return Tiling(Tiling.calc_kernel_halo(structuring_element.shape)).apply(calc_tile_edges, img_data)
+
+        return subtract(self.dilate(img_data, structuring_element, border_type),
+                        self.erode(img_data, structuring_element, border_type))
+
+    def __get(self, primitive, img_data, structuring_element, border_type, iterations, operation, source):
+        """
+        Get the cached primitive or calculate it on the source tile by tile on a cache miss.
+
+        :param primitive: The name of the primitive
+        :type primitive: str
+        :param operation: The name of the method of :class:`element_decomposition.ElementDecomposition`
+                          applied to the source: "erode" or "dilate"
+        :type operation: str
+        :param source: The image data to apply the operation to, or the function returning it
+        :type source: :class:`numpy.ndarray` or callable
+        """
+
+        def calc():
+            func = getattr(ElementDecomposition(structuring_element), operation)
+            source_data = source() if callable(source) else source
+
+            return Tiling(Tiling.calc_kernel_halo(structuring_element.shape, iterations)).apply(
+                lambda tile: func(tile, border_type, iterations), source_data)
+
+        if not isinstance(img_data, ndarray):
+            return calc()
+
+        key = (primitive, id(img_data), structuring_element.shape, structuring_element.tobytes(),
+               border_type, iterations)
+
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits_num += 1
+                return self._results[key][1]
+
+            self.misses_num += 1
+
+        result = calc()
+        result.flags.writeable = False
+
+        with self._lock:
+            if key not in self._results and result.nbytes <= self.memory_cap:
+                self._results[key] = img_data, result
+                self._nbytes += result.nbytes
+
+            while self._nbytes > self.memory_cap:
+                _, (_, dropped) = self._results.popitem(last=False)
+                self._nbytes -= dropped.nbytes
+
+        return result
@@ -41,9 +41,16 @@ class MorphologyUI(OperationUI, LocalUI):
         self.label_struct_element_shape.setObjectName("label_struct_element_shape")
 
         self.cb_struct_element_shape = QComboBox(morphology)
-        self.cb_struct_element_shape.addItems(["Diamond", "Rectangle", "Ellipse", "Cross"])
+        self.cb_struct_element_shape.addItems(["Diamond", "Rectangle", "Ellipse", "Cross", "Octagon"])
         self.cb_struct_element_shape.setObjectName("cb_struct_element_shape")
 
+        self.label_skeleton_method = QLabel(morphology)
+        self.label_skeleton_method.setObjectName("label_skeleton_method")
+
+        self.cb_skeleton_method = QComboBox(morphology)
+        self.cb_skeleton_method.addItems(["Zhang-Suen", "Guo-Hall", "Morphological"])
+        self.cb_skeleton_method.setObjectName("cb_skeleton_method")
+
         self.label_iterations = QLabel(morphology)
         self.label_iterations.setObjectName("label_iterations")
 
@@ -53,6 +60,7 @@ class MorphologyUI(OperationUI, LocalUI):
         self.sb_iterations.setObjectName("sb_iterations")
 
         self.layout_form.addRow(self.label_operation, self.cb_operation)
+        self.layout_form.addRow(self.label_skeleton_method, self.cb_skeleton_method)
         self.layout_form.addRow(self.label_struct_element_shape, self.cb_struct_element_shape)
         self.layout_form.addRow(self.label_kernel_size, self.sb_kernel_size)
         self.layout_form.addRow(self.label_iterations, self.sb_iterations)
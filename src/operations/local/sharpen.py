@@ -6,6 +6,7 @@ from PyQt5.QtCore import QCoreApplication
 from src.constants import BORDER_TYPES
 from ..operation import Operation
 from .sharpen_ui import SharpenUI
+from .tiling import Tiling
 
 
 class Sharpen(QDialog, Operation, SharpenUI):
@@ -26,7 +27,7 @@ class Sharpen(QDialog, Operation, SharpenUI):
         self.init_ui(self)
         self.__retranslate_ui()
 
-        self.img_data = parent.data.copy()
+        self.img_data = parent.share_data()
         self.current_img_data = None
 
         if self.img_data.dtype.itemsize > 1:
@@ -50,36 +51,50 @@ class Sharpen(QDialog, Operation, SharpenUI):
         self.label_border_type.setText(_translate(_window_title, "Border type:"))
         self.label_masks.setText(_translate(_window_title, "Laplacian masks:"))
 
-    def calc_sharpen(self, border):
+    def get_mask(self):
         """
-        Sharpen an image based on chosen Laplacian mask.
+        Return the chosen Laplacian mask.
+
+        :rtype: class:`numpy.ndarray`
+        """
+
+        if self.rbtn_mask1.isChecked():
+            return array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
+        elif self.rbtn_mask2.isChecked():
+            return array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
+        else:
+            return array([[1, -2, 1], [-2, 5, -2], [1, -2, 1]])
+
+    def calc_sharpen(self, border, mask, img_data=None):
+        """
+        Sharpen an image based on Laplacian mask.
 
         :param border: The border type for sharpening, defined in BORDER_TYPES
         :type border: str
+        :param mask: The Laplacian mask, gets from :meth:`get_mask`
+        :type mask: class:`numpy.ndarray`
+        :param img_data: The image data to calculate on, by default it's :attr:`img_data`
+        :type img_data: class:`numpy.ndarray` or None
         :return: The image sharpening
         :rtype: class:`numpy.ndarray`
         """
 
-        border_type = BORDER_TYPES[border]
+        if img_data is None:
+            img_data = self.img_data
 
-        if self.rbtn_mask1.isChecked():
-            mask = array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
-        elif self.rbtn_mask2.isChecked():
-            mask = array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
-        else:
-            mask = array([[1, -2, 1], [-2, 5, -2], [1, -2, 1]])
+        border_type = BORDER_TYPES[border]
 
-        return filter2D(self.img_data, -1, mask, borderType=border_type)
+        return Tiling(Tiling.calc_kernel_halo(mask.shape)).apply(
+            lambda tile: filter2D(tile, -1, mask, borderType=border_type), img_data)
 
     def update_img_preview(self):
         """
         Update image preview window.
 
-        - Calculate image sharpen.
+        - Calculate image sharpen in the background.
         - Reload image preview using the base :class:`operation.Operation` method.
         """
 
         border = self.cb_border_type.currentText()
 
-        self.current_img_data = self.calc_sharpen(border)
-        super().update_img_preview()
+        self.run_img_preview(self.calc_sharpen, border, self.get_mask())
@@ -5,6 +5,7 @@ from PyQt5.QtCore import QCoreApplication
 from src.constants import BORDER_TYPES
 from ..operation import Operation
 from .smooth_ui import SmoothUI
+from .tiling import Tiling
 
 
 class Smooth(QDialog, Operation, SmoothUI):
@@ -25,12 +26,12 @@ class Smooth(QDialog, Operation, SmoothUI):
         self.init_ui(self)
         self.__retranslate_ui()
 
-        self.img_data = parent.data.copy()
+        self.img_data = parent.share_data()
         self.current_img_data = None
 
         self.cb_smooth_type.activated[str].connect(self.update_form)
         self.cb_border_type.activated[str].connect(self.update_img_preview)
-        self.sb_kernel_size.valueChanged.connect(self.update_img_preview)
+        self.sb_kernel_size.valueChanged.connect(self.schedule_img_preview)
         self.rbtn_show_hist.clicked.connect(self.update_hist)
 
         self.update_form()
@@ -62,7 +63,7 @@ class Smooth(QDialog, Operation, SmoothUI):
 
         self.update_img_preview()
 
-    def calc_smooth(self, smooth, border, ksize):
+    def calc_smooth(self, smooth, border, ksize, img_data=None):
         """
         Calculate the smoothing of the selected type.
 
@@ -72,22 +73,25 @@ class Smooth(QDialog, Operation, SmoothUI):
         :type border: str
         :param ksize: The number for NxN kernel
         :type ksize: int
+        :param img_data: The image data to calculate on, by default it's :attr:`img_data`
+        :type img_data: class:`numpy.ndarray` or None
         :return: The smoothed image data
         :rtype: class:`numpy.ndarray`
         """
 
-        border_type = BORDER_TYPES[border]
+        if img_data is None:
+            img_data = self.img_data
 
-        if ksize % 2 == 0:
-            ksize -= 1
-            self.sb_kernel_size.setValue(ksize)
+        border_type = BORDER_TYPES[border]
+        tiling = Tiling(Tiling.calc_kernel_halo(ksize))
 
         if smooth == "Blur":
-            img_data = blur(self.img_data, (ksize, ksize), borderType=border_type)
+            img_data = tiling.apply(lambda tile: blur(tile, (ksize, ksize), borderType=border_type), img_data)
         elif smooth == "Gaussian Blur":
-            img_data = GaussianBlur(self.img_data, (ksize, ksize), 0, borderType=border_type)
+            img_data = tiling.apply(lambda tile: GaussianBlur(tile, (ksize, ksize), 0, borderType=border_type),
+                                    img_data)
         else:
-            img_data = medianBlur(self.img_data, ksize)
+            img_data = tiling.apply(lambda tile: medianBlur(tile, ksize), img_data)
 
         return img_data
 
@@ -95,7 +99,8 @@ class Smooth(QDialog, Operation, SmoothUI):
         """
         Update image preview window.
 
-        - Calculate image smoothing based on kernel size, smooth and border type.
+        - Validate kernel size to be odd.
+        - Calculate image smoothing based on kernel size, smooth and border type in the background.
         - Reload image preview using the base :class:`operation.Operation` method.
         """
 
@@ -103,5 +108,10 @@ class Smooth(QDialog, Operation, SmoothUI):
         border_type = self.cb_border_type.currentText()
         kernel_size = self.sb_kernel_size.value()
 
-        self.current_img_data = self.calc_smooth(smooth_type, border_type, kernel_size)
-        super().update_img_preview()
+        if kernel_size % 2 == 0:
+            kernel_size -= 1
+            self.sb_kernel_size.setValue(kernel_size)
+
+        self.run_img_preview(self.calc_smooth, smooth_type, border_type, kernel_size,
+                             scale_args=lambda scale: (smooth_type, border_type,
+                                                       self.scale_kernel_size(kernel_size, scale=scale)))
@@ -0,0 +1,151 @@
+from concurrent.futures import ThreadPoolExecutor
+from math import ceil
+from os import cpu_count
+
+from numpy import empty, ndarray
+
+
+class Tiling:
+    """
+    The Tiling class runs a local (neighbourhood) operation on an image tile by tile in parallel.
+
+    The image is split into tiles of full rows, every tile is extended with the halo of neighbouring rows,
+    which the operation reads around the tile, and processed on a shared thread pool.
+    OpenCV functions release the GIL, so tiles are processed on all cores.
+    Tiles span the whole image width, as OpenCV extrapolates the border of every row of the input,
+    which makes narrow tiles several times slower, while the rows of a tile are contiguous in memory.
+
+    Tiles are views of the image clipped at its boundary,
+    so the operation extrapolates the image border itself, exactly as for the whole image.
+    The result is stitched without the halo, which makes it bit-identical to the untiled call,
+    as long as the halo isn't narrower than the distance the operation reads from
+    and the operation doesn't depend on the image size otherwise,
+    e.g. :func:`cv2.filter2D` splits the image into DFT blocks by its size for large kernels,
+    so such convolutions are applied at once by :meth:`convolution.Convolution.apply_tiled`.
+    """
+
+    # The approximate number of pixels in a tile without the halo
+    TILE_PIXELS = 2**22
+
+    # The thread pool shared by all tilings, created on the first use
+    _executor = None
+
+    def __init__(self, halo, tile_pixels=None):
+        """
+        Create a new tiling.
+
+        :param halo: The number of neighbouring pixels the operation reads around a pixel
+        :type halo: int
+        :param tile_pixels: The approximate number of pixels in a tile, by default it's :attr:`TILE_PIXELS`
+        :type tile_pixels: int or None
+        """
+
+        assert halo >= 0, AssertionError("The halo must be non-negative")
+
+        self.halo = halo
+        self.tile_pixels = tile_pixels or self.TILE_PIXELS
+
+    @staticmethod
+    def calc_kernel_halo(ksize, iterations=1):
+        """
+        Calculate the halo for the kernel with the default centered anchor.
+
+        :param ksize: The kernel size, the number for NxN kernel or the (height, width) pair
+        :type ksize: int or tuple[int, int]
+        :param iterations: The number of times the kernel is applied one after another
+        :type iterations: int
+        :return: The halo width
+        :rtype: int
+        """
+
+        if isinstance(ksize, int):
+            ksize = ksize, ksize
+
+        return max(ksize) // 2 * iterations
+
+    @classmethod
+    def get_workers_num(cls):
+        """Get the number of threads processing tiles."""
+
+        return cpu_count() or 1
+
+    @classmethod
+    def get_executor(cls):
+        """Get the thread pool shared by all tilings."""
+
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(max_workers=cls.get_workers_num(), thread_name_prefix="tiling")
+
+        return cls._executor
+
+    def split(self, height, width):
+        """
+        Split the image into tiles of full rows.
+
+        The number of tiles is a multiple of the number of workers to load all of them evenly,
+        a tile is at least twice as high as the halo to keep the overhead of the halo low.
+
+        :param height: The image height
+        :type height: int
+        :param width: The image width
+        :type width: int
+        :return: The tiles as triples of row slices: the tile with the halo in the image,
+                 the tile without the halo within the former, and the tile without the halo in the image
+        :rtype: list[tuple[slice, slice, slice]]
+        """
+
+        workers_num = self.get_workers_num()
+        tiles_num = ceil(ceil(height * width / self.tile_pixels) / workers_num) * workers_num
+        tile_height = max(ceil(height / tiles_num), 2 * self.halo, 1)
+
+        tiles = []
+        for row in range(0, height, tile_height):
+            row_end = min(row + tile_height, height)
+            top = max(0, row - self.halo)
+            bottom = min(height, row_end + self.halo)
+
+            tiles.append((slice(top, bottom), slice(row - top, row_end - top), slice(row, row_end)))
+
+        return tiles
+
+    def apply(self, func, img_data):
+        """
+        Apply the operation to the image tile by tile.
+
+        The image fitting into a single tile is processed with the only call.
+        The image data stored out of core is streamed by :meth:`image.image_store.ImageStore.map_tiles`
+        into a new store within its memory budget.
+
+        :param func: The operation, takes the image data and returns the result of the same height and width,
+                     mustn't access widgets
+        :type func: callable
+        :param img_data: The image data
+        :type img_data: class:`numpy.ndarray` or class:`image.image_store.ImageStore`
+        :return: The stitched result of the operation
+        :rtype: class:`numpy.ndarray` or class:`image.image_store.ImageStore`
+        """
+
+        if not isinstance(img_data, ndarray):
+            return img_data.map_tiles(func, self.halo)
+
+        height, width = img_data.shape[:2]
+
+        if height * width <= self.tile_pixels:
+            return func(img_data)
+
+        tiles = self.split(height, width)
+
+        def process(tile):
+            source, inner, _ = tile
+            return func(img_data[source])[inner]
+
+        results = self.get_executor().map(process, tiles)
+
+        out_data = None
+        for (_, _, target), result in zip(tiles, results):
+            if out_data is None:
+                out_data = empty((height, width) + result.shape[2:], result.dtype)
+
+            out_data[target] = result
+
+        return out_data
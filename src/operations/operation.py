@@ -1,39 +1,516 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from cv2 import resize, INTER_AREA
+from numpy import ascontiguousarray, arange, ndarray
+from PyQt5.QtWidgets import QProgressDialog
 from PyQt5.QtGui import QImage, QPixmap
-from PyQt5.QtCore import QSize
+from PyQt5.QtCore import Qt, QObject, QSize, QTimer, QCoreApplication, QEventLoop, pyqtSignal, pyqtSlot
 
 from src.constants import BYTES_PER_PIXEL_2_BW_FORMAT
+from image.analyze import calc_histogram
+
+
+class PreviewExecutor(QObject):
+    """
+    The PreviewExecutor class runs preview calculations on a background thread.
+
+    Calculations run one at a time. A new calculation supersedes the previous ones:
+    a queued calculation is canceled, and the result of a running one is dropped,
+    so only the result of the latest calculation is delivered on the GUI thread.
+    A progressive calculation consists of several steps, e.g. coarse to fine previews,
+    the result of every step is delivered, and the remaining steps are skipped once it's superseded.
+    """
+
+    result_ready = pyqtSignal(int)
+    step_ready = pyqtSignal(int, object)
+
+    def __init__(self):
+        """Create a new executor with a single worker thread."""
+
+        super().__init__()
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preview")
+        self._job_id = 0
+        self._future = None
+        self._on_result = None
+
+        # The number of calculations canceled or dropped in favor of newer ones
+        self.superseded_num = 0
+
+        # The signals are emitted from the worker thread, so the delivery is queued to the GUI thread
+        self.result_ready.connect(self.__deliver)
+        self.step_ready.connect(self.__deliver_step)
+
+    def submit(self, calc, args, on_result):
+        """
+        Run the calculation in the background, superseding the previous ones.
+
+        :param calc: The function calculating the preview, mustn't access widgets
+        :type calc: callable
+        :param args: The arguments of :attr:`calc`
+        :type args: tuple
+        :param on_result: The function called on the GUI thread with the result of :attr:`calc`
+        :type on_result: callable
+        """
+
+        self.submit_progressive([(calc, args)], on_result)
+
+    def submit_progressive(self, steps, on_result):
+        """
+        Run the steps of the calculation one by one in the background, superseding the previous calculations.
+
+        :param steps: The pairs of the function calculating the preview, which mustn't access widgets,
+                      and its arguments, e.g. from coarse to fine preview
+        :type steps: list[tuple[callable, tuple]]
+        :param on_result: The function called on the GUI thread with the result of every step
+        :type on_result: callable
+        """
+
+        # Supersede the previous calculation before canceling it, as canceling calls back immediately
+        self._job_id += 1
+        job_id = self._job_id
+
+        if self._future is not None:
+            self._future.cancel()
+            self.superseded_num += 1
+
+        self._on_result = on_result
+        self._future = self._executor.submit(self.__run_steps, job_id, steps)
+        self._future.add_done_callback(lambda _: self.result_ready.emit(job_id))
+
+    def __run_steps(self, job_id, steps):
+        """
+        Run the steps of the calculation on the worker thread.
+
+        Results of intermediate steps are sent with :attr:`step_ready`,
+        the result of the last step is returned.
+        The remaining steps are skipped once the calculation is superseded.
+        """
+
+        for i, (calc, args) in enumerate(steps):
+            if job_id != self._job_id:
+                return None
+
+            result = calc(*args)
+
+            if i < len(steps) - 1:
+                self.step_ready.emit(job_id, result)
+
+        return result
+
+    def run(self, calc, args):
+        """
+        Run the calculation in the background and return its result, superseding all previous calculations.
+
+        The GUI events are processed while waiting, so the application stays responsive.
+
+        :param calc: The function to calculate
+        :type calc: callable
+        :param args: The arguments of :attr:`calc`
+        :type args: tuple
+        :return: The result of :attr:`calc`
+        """
+
+        self._job_id += 1
+
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+            self.superseded_num += 1
+
+        future = self._executor.submit(calc, *args)
+        while not wait([future], timeout=0.05).done:
+            QCoreApplication.processEvents(QEventLoop.AllEvents, 50)
+
+        return future.result()
+
+    def is_busy(self):
+        """Check if the latest calculation isn't delivered yet."""
+
+        return self._future is not None
+
+    def wait(self):
+        """Wait for the latest calculation and deliver its result immediately."""
+
+        if self._future is not None:
+            self.__deliver(self._job_id)
+
+    @pyqtSlot(int)
+    def __deliver(self, job_id):
+        """
+        Deliver the result of the calculation, unless it's superseded or already delivered.
+
+        Errors raised by the calculation are re-raised on the GUI thread.
+
+        :param job_id: The number of the finished calculation
+        :type job_id: int
+        """
+
+        if job_id != self._job_id or self._future is None:
+            return
+
+        future, self._future = self._future, None
+        self._on_result(future.result())
+
+    @pyqtSlot(int, object)
+    def __deliver_step(self, job_id, result):
+        """
+        Deliver the result of the intermediate step, unless the calculation is superseded or already delivered.
+
+        :param job_id: The number of the calculation
+        :type job_id: int
+        :param result: The result of the step
+        """
+
+        if job_id == self._job_id and self._future is not None:
+            self._on_result(result)
+
+
+class PreviewScheduler(QObject):
+    """
+    The PreviewScheduler class coalesces bursts of parameter changes into a single preview update.
+
+    Every request restarts the timer, so the update runs only once the parameters
+    stay unchanged for the interval, and it uses the final state of the form.
+    """
+
+    def __init__(self, update, interval):
+        """
+        Create a new scheduler.
+
+        :param update: The function updating the preview
+        :type update: callable
+        :param interval: The time in milliseconds to wait for the next change
+        :type interval: int
+        """
+
+        super().__init__()
+
+        self._update = update
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.__run)
+
+        self.requested_num = 0
+        self.updated_num = 0
+
+    @property
+    def interval(self):
+        """Get the time in milliseconds to wait for the next change."""
+
+        return self._timer.interval()
+
+    @interval.setter
+    def interval(self, value):
+        """Set the time in milliseconds to wait for the next change."""
+
+        self._timer.setInterval(value)
+
+    @property
+    def skipped_num(self):
+        """Get the number of requested updates coalesced into other ones."""
+
+        return self.requested_num - self.updated_num - self.is_pending()
+
+    def is_pending(self):
+        """Check if the update is scheduled."""
+
+        return self._timer.isActive()
+
+    def schedule(self):
+        """Request the update, postponing the scheduled one."""
+
+        self.requested_num += 1
+        self._timer.start()
+
+    def cancel(self):
+        """Cancel the scheduled update, e.g. when the preview is already updated with the final state."""
+
+        if self.is_pending():
+            self._timer.stop()
+
+    def flush(self):
+        """Run the scheduled update immediately."""
+
+        if self.is_pending():
+            self._timer.stop()
+            self.__run()
+
+    def __run(self):
+        """Run the update."""
+
+        self.updated_num += 1
+        self._update()
 
 
 class Operation:
     """The Operation class represents the base logic for operation classes."""
 
+    # The time in milliseconds to wait for the next parameter change before updating the preview
+    PREVIEW_DEBOUNCE_INTERVAL = 150
+
+    # The scales of progressive preview levels relative to :attr:`preview_img_data`, from coarse to fine
+    PREVIEW_LEVELS = (1 / 8, 1 / 2, 1)
+
+    # The minimum number of pixels of :attr:`preview_img_data` to refine the preview progressively
+    PROGRESSIVE_PREVIEW_MIN_PIXELS = 2**18
+
+    # The maximum width and height of image preview of the image data stored out of core
+    OUT_OF_CORE_PREVIEW_SIZE = 1200
+
+    @staticmethod
+    def calc_preview_scale(height, width):
+        """
+        Calculate the scale of image preview relative to the image size.
+
+        :param height: The image height
+        :type height: int
+        :param width: The image width
+        :type width: int
+        :return: The scale of image preview, from 0.4 to 1
+        :rtype: float
+        """
+
+        if width > 1200 or height > 1200:
+            return 0.4
+        elif width > 800 or height > 800:
+            return 0.6
+        elif width > 300 and height > 300:
+            return 0.8
+
+        return 1
+
+    @property
+    def preview_scale(self):
+        """
+        Get the scale of image preview for :attr:`img_data`.
+
+        The preview of the image data stored out of core is limited by :attr:`OUT_OF_CORE_PREVIEW_SIZE`.
+        """
+
+        height, width = self.img_data.shape[:2]
+        scale = self.calc_preview_scale(height, width)
+
+        if not isinstance(self.img_data, ndarray):
+            scale = min(scale, self.OUT_OF_CORE_PREVIEW_SIZE / max(height, width))
+
+        return scale
+
+    def get_preview_size(self, scale=None):
+        """
+        Get the size of :attr:`img_data` downscaled for image preview.
+
+        :param scale: The scale relative to :attr:`img_data`, by default it's :attr:`preview_scale`
+        :type scale: float or None
+        :return: The width and the height, at least 1 pixel each
+        :rtype: tuple[int, int]
+        """
+
+        if scale is None:
+            scale = self.preview_scale
+
+        height, width = self.img_data.shape[:2]
+
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    @property
+    def preview_img_data(self):
+        """
+        Get the proxy of :attr:`img_data` downscaled to the size of image preview.
+
+        The proxy is cached until :attr:`img_data` is replaced.
+        Operations calculate the preview on the proxy, as it's shown downscaled anyway.
+        """
+
+        if getattr(self, "_preview_source", None) is not self.img_data:
+            self._preview_source = self.img_data
+            self._preview_levels = dict()
+
+            if not isinstance(self.img_data, ndarray):
+                self._preview_img_data = self.img_data.downscale(self.get_preview_size())
+            elif self.preview_scale == 1:
+                self._preview_img_data = self.img_data
+            else:
+                self._preview_img_data = resize(self.img_data, self.get_preview_size(), interpolation=INTER_AREA)
+
+        return self._preview_img_data
+
+    def get_preview_levels(self):
+        """
+        Get the progressive preview levels of :attr:`img_data`, from coarse to fine.
+
+        Levels are :attr:`preview_img_data` downscaled by :attr:`PREVIEW_LEVELS`.
+        A small proxy has the only level, as it's calculated fast enough anyway.
+        Levels are cached until :attr:`img_data` is replaced.
+
+        :return: The pairs of the scale relative to :attr:`img_data` and the level image data
+        :rtype: list[tuple[float, :class:`numpy.ndarray`]]
+        """
+
+        preview_img_data = self.preview_img_data
+        height, width = preview_img_data.shape[:2]
+
+        if height * width < self.PROGRESSIVE_PREVIEW_MIN_PIXELS:
+            return [(self.preview_scale, preview_img_data)]
+
+        levels = []
+        for level in self.PREVIEW_LEVELS:
+            scale = self.preview_scale * level
+
+            if level == 1:
+                levels.append((scale, preview_img_data))
+                continue
+
+            if level not in self._preview_levels:
+                self._preview_levels[level] = resize(preview_img_data, self.get_preview_size(scale),
+                                                     interpolation=INTER_AREA)
+            levels.append((scale, self._preview_levels[level]))
+
+        return levels
+
+    def scale_kernel_size(self, ksize, min_size=1, scale=None):
+        """
+        Scale the kernel size to get the same effect on the downscaled image as on :attr:`img_data`.
+
+        :param ksize: The odd kernel size for :attr:`img_data`
+        :type ksize: int
+        :param min_size: The minimum odd kernel size
+        :type min_size: int
+        :param scale: The scale of the image relative to :attr:`img_data`, by default it's :attr:`preview_scale`
+        :type scale: float or None
+        :return: The odd kernel size for the downscaled image
+        :rtype: int
+        """
+
+        if scale is None:
+            scale = self.preview_scale
+
+        return max(min_size, int(ksize * scale) // 2 * 2 + 1)
+
+    @property
+    def preview_scheduler(self):
+        """Get the :class:`PreviewScheduler` of the operation, created on the first access."""
+
+        if getattr(self, "_preview_scheduler", None) is None:
+            self._preview_scheduler = PreviewScheduler(self.update_img_preview, self.PREVIEW_DEBOUNCE_INTERVAL)
+
+        return self._preview_scheduler
+
+    @property
+    def preview_executor(self):
+        """Get the :class:`PreviewExecutor` of the operation, created on the first access."""
+
+        if getattr(self, "_preview_executor", None) is None:
+            self._preview_executor = PreviewExecutor()
+
+        return self._preview_executor
+
+    def run_img_preview(self, calc, *args, on_result=None, scale_args=None):
+        """
+        Calculate new image data progressively and update image preview window with every level of it.
+
+        The preview is calculated on the levels of :attr:`preview_img_data` from :meth:`get_preview_levels`,
+        which are passed to :attr:`calc` as the keyword argument `img_data`.
+        All levels are calculated in the background from the coarsest one, every finer level refines the previous one,
+        and the remaining levels are dropped as soon as parameters change again.
+        The calculation is kept to run it on the full resolution :attr:`img_data` in :meth:`accept_changes`.
+        Widgets must be read and validated before, on the GUI thread, and passed within :attr:`args`.
+
+        :param calc: The function calculating new image data
+        :type calc: callable
+        :param args: The arguments of :attr:`calc`
+        :param on_result: The function called with the result of :attr:`calc`,
+                          by default it's :meth:`show_img_preview`
+        :type on_result: callable or None
+        :param scale_args: The function returning the arguments of :attr:`calc` for the image of the given scale
+                           relative to :attr:`img_data`, e.g. with kernel sizes scaled by :meth:`scale_kernel_size`,
+                           by default :attr:`args` are used for every scale
+        :type scale_args: callable or None
+        """
+
+        # The form is read in its final state, so the scheduled update is redundant
+        if getattr(self, "_preview_scheduler", None) is not None:
+            self._preview_scheduler.cancel()
+
+        on_result = on_result or self.show_img_preview
+        self._accept_calc = calc, args, on_result
+
+        steps = [(self.__calc_on_preview, (calc, scale_args(scale) if scale_args else args, level_img_data))
+                 for scale, level_img_data in self.get_preview_levels()]
+
+        self.preview_executor.submit_progressive(steps, on_result)
+
+    @staticmethod
+    def __calc_on_preview(calc, args, preview_img_data):
+        """Call :attr:`calc` with :attr:`args` on the image preview data."""
+
+        return calc(*args, img_data=preview_img_data)
+
+    def schedule_img_preview(self, *args):
+        """
+        Update image preview window once the parameters stop changing.
+
+        Connect it to the signals of widgets, which change in bursts, e.g. :attr:`QSpinBox.valueChanged`.
+        Signal arguments are ignored, the preview reads the form in its final state.
+        """
+
+        self.preview_scheduler.schedule()
+
+    def count_skipped_previews(self):
+        """
+        Count preview calculations skipped so far.
+
+        Both coalesced parameter changes and calculations superseded by newer ones are counted.
+
+        :rtype: int
+        """
+
+        skipped_num = 0
+
+        if getattr(self, "_preview_scheduler", None) is not None:
+            skipped_num += self._preview_scheduler.skipped_num
+        if getattr(self, "_preview_executor", None) is not None:
+            skipped_num += self._preview_executor.superseded_num
+
+        return skipped_num
+
+    def show_img_preview(self, img_data):
+        """
+        Set new image data and reload it to the preview window.
+
+        :param img_data: The new image data
+        :type img_data: :class:`numpy.ndarray`
+        """
+
+        self.current_img_data = img_data
+
+        # Image data calculated on accepting isn't shown
+        if not getattr(self, "_accepting", False):
+            Operation.update_img_preview(self)
+
     def update_img_preview(self):
         """
         Update image preview window.
 
         - Convert new image data to :class:`PyQt5.QtGui.QImage`.
+        - Resize the image to the preview size, whatever preview level it's calculated on.
         - Reload the image to the preview window.
         """
 
         img_data = self.current_img_data
         height, width = img_data.shape[:2]
 
-        scale = 1
-        if width > 1200 or height > 1200:
-            scale = 0.4
-        elif width > 800 or height > 800:
-            scale = 0.6
-        elif width > 300 and height > 300:
-            scale = 0.8
-
+        # Pass the row size explicitly, as rows of the proxy image aren't aligned to 4 bytes
+        img_data = ascontiguousarray(img_data)
         if len(img_data.shape) == 2:
             pixel_bytes = img_data.dtype.itemsize
-            image = QImage(img_data, width, height, BYTES_PER_PIXEL_2_BW_FORMAT[pixel_bytes])
+            image = QImage(img_data, width, height, pixel_bytes * width, BYTES_PER_PIXEL_2_BW_FORMAT[pixel_bytes])
         else:
             image = QImage(img_data, width, height, 3 * width, QImage.Format_BGR888)
 
         pixmap = QPixmap(image)
-        pixmap = pixmap.scaled(scale * pixmap.size())
+        pixmap = pixmap.scaled(QSize(*self.get_preview_size()))
         self.label_image.setPixmap(pixmap)
 
         # Prevent from calculating histogram for images with color depth higher than 8-bit
@@ -41,9 +518,26 @@ class Operation:
             self.rbtn_show_hist.setEnabled(False)
         else:
             self.hist_canvas.axes.clear()
-            self.hist_canvas.axes.hist(img_data.ravel(), 256, [0, 256])
+            histogram = sum(calc_histogram(img_data, 256).values())
+            self.hist_canvas.axes.hist(arange(256), 256, [0, 256], weights=histogram)
             self.hist_canvas.draw()
 
+    def __calc_full_resolution(self):
+        """Calculate the accepted image data on the full resolution in the background, showing the progress."""
+
+        calc, args, on_result = self._accept_calc
+
+        progress_dialog = QProgressDialog("Applying the operation...", None, 0, 0, self)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(500)
+
+        self._accepting = True
+        try:
+            on_result(self.preview_executor.run(calc, args))
+        finally:
+            self._accepting = False
+            progress_dialog.close()
+
     def update_hist(self):
         """Update histogram canvas visibility whenever :attr:`rbtn_show_hist` clicked."""
 
@@ -56,7 +550,15 @@ class Operation:
             self.adjustSize()
 
     def accept_changes(self):
-        """Accept changed image data to the original one."""
+        """Accept changed image data to the original one, waiting for the scheduled and background previews."""
+
+        if getattr(self, "_preview_scheduler", None) is not None:
+            self._preview_scheduler.flush()
+        if getattr(self, "_preview_executor", None) is not None:
+            self._preview_executor.wait()
+
+        if getattr(self, "_accept_calc", None) is not None and self.preview_img_data is not self.img_data:
+            self.__calc_full_resolution()
 
         self.img_data = self.current_img_data
         self.accept()
@@ -1,3 +1,5 @@
 from .normalize import Normalize
 from .posterize import Posterize
 from .img_calculator import ImageCalculator
+from .lut import apply_lut
+from .point_pipeline import PointPipeline
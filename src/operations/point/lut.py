@@ -0,0 +1,177 @@
+from cv2 import LUT
+from numpy import asarray, arange, take, where, unique, trunc, abs, clip, uint8, int64
+
+
+def apply_lut(img_data, lut, inplace=False):
+    """
+    Apply LUT to the image with a single pass over the image data.
+
+    8-bit images are mapped with OpenCV LUT,
+    images of other data types are mapped with a single array gather.
+    The LUT is applied to every channel of a multi-channel image.
+    The LUT values are cast to the image data type, so the data type is preserved.
+
+    :param img_data: The image data
+    :type img_data: :class:`numpy.ndarray`
+    :param lut: The Lookup Table, must have an entry for every possible pixel value
+    :type lut: list[int] or :class:`numpy.ndarray`
+    :param inplace: The flag to write the result into :attr:`img_data` instead of a new array
+    :type inplace: bool
+    :return: The image data with applied LUT
+    :rtype: :class:`numpy.ndarray`
+    """
+
+    lut = asarray(lut).astype(img_data.dtype, copy=False)
+    out = img_data if inplace else None
+
+    if img_data.dtype == uint8 and lut.size == 256:
+        # OpenCV can't write into a non-contiguous view, e.g. a tile of the image
+        if inplace and not img_data.flags.c_contiguous:
+            img_data[...] = LUT(img_data, lut)
+            return img_data
+
+        return LUT(img_data, lut, dst=out)
+
+    return take(lut, img_data, out=out, mode="clip")
+
+
+def compose_luts(first_lut, second_lut):
+    """
+    Compose two LUTs into one.
+
+    Applying the result is the same as applying
+    :attr:`first_lut` and then :attr:`second_lut`.
+
+    :param first_lut: The Lookup Table to apply first
+    :type first_lut: :class:`numpy.ndarray` or list[int]
+    :param second_lut: The Lookup Table to apply second
+    :type second_lut: :class:`numpy.ndarray` or list[int]
+    :return: The composed Lookup Table
+    :rtype: :class:`numpy.ndarray`
+    """
+
+    return asarray(second_lut)[asarray(first_lut)]
+
+
+def calc_negation_lut(color_depth):
+    """
+    Calculate LUT for negation point operation.
+
+    :param color_depth: The number of possible pixel values
+    :type color_depth: int
+    :return: The Lookup Table
+    :rtype: :class:`numpy.ndarray`
+    """
+
+    return arange(color_depth - 1, -1, -1, dtype=int64)
+
+
+def calc_equalization_lut(cumulative_hist):
+    """
+    Calculate LUT for histogram equalization.
+
+    Normalize the cumulative histogram to 0-255 range,
+    taking the second smallest cumulative value as a minimum.
+
+    :param cumulative_hist: The cumulative histogram of the image
+    :type cumulative_hist: :class:`numpy.ndarray`
+    :return: The Lookup Table, ``None`` if the image has too few distinct values to equalize
+    :rtype: :class:`numpy.ndarray` or None
+    """
+
+    cumulative_hist = asarray(cumulative_hist, dtype=int64)
+
+    # Find min/max values in the cumulative histogram, excluding zero as a minimum
+    ord_hist_values = unique(cumulative_hist)
+    if len(ord_hist_values) < 2 or ord_hist_values[1] == ord_hist_values[-1]:
+        return None
+
+    hist_min = ord_hist_values[1]
+    hist_max = ord_hist_values[-1]
+
+    # Normalize cumulative sum to 0-255 range
+    return abs(trunc(((cumulative_hist - hist_min) * 255) / (hist_max - hist_min))).astype(int64)
+
+
+def calc_posterize_lut(color_depth, bins_num):
+    """
+    Calculate LUT for posterizing point operation.
+
+    Every pixel value is set to the beginning of its bin,
+    the last bin is filled up to color depth with a maximum pixel value.
+
+    :param color_depth: The number of possible pixel values
+    :type color_depth: int
+    :param bins_num: The number of bins to posterize
+    :type bins_num: int
+    :return: The Lookup Table
+    :rtype: :class:`numpy.ndarray`
+    """
+
+    bin_length = color_depth // bins_num
+    values = arange(color_depth, dtype=int64)
+
+    return where(values < (bins_num - 1) * bin_length, values // bin_length * bin_length, color_depth - 1)
+
+
+def calc_threshold_binary_lut(color_depth, thresh_value):
+    """
+    Calculate LUT for threshold binary point operation.
+
+    Pixels higher than :attr:`thresh_value` are set to the maximum value, other pixels are set to 0.
+
+    :param color_depth: The number of possible pixel values
+    :type color_depth: int
+    :param thresh_value: The value for thresholding
+    :type thresh_value: int
+    :return: The Lookup Table
+    :rtype: :class:`numpy.ndarray`
+    """
+
+    return where(arange(color_depth) > thresh_value, color_depth - 1, 0).astype(int64)
+
+
+def calc_threshold_zero_lut(color_depth, thresh_value):
+    """
+    Calculate LUT for threshold to zero point operation.
+
+    Pixels lower than :attr:`thresh_value` are set to 0, other pixels are kept.
+
+    :param color_depth: The number of possible pixel values
+    :type color_depth: int
+    :param thresh_value: The value for thresholding
+    :type thresh_value: int
+    :return: The Lookup Table
+    :rtype: :class:`numpy.ndarray`
+    """
+
+    values = arange(color_depth, dtype=int64)
+
+    return where(values < thresh_value, 0, values)
+
+
+def calc_normalize_lut(color_depth, img_min, img_max, min_val, max_val):
+    """
+    Calculate LUT for contrast stretching.
+
+    Linearly map the image range [:attr:`img_min`; :attr:`img_max`]
+    to the range [:attr:`min_val`; :attr:`max_val`].
+
+    :param color_depth: The number of possible pixel values
+    :type color_depth: int
+    :param img_min: The minimum pixel value in the image
+    :type img_min: int
+    :param img_max: The maximum pixel value in the image, must be higher than :attr:`img_min`
+    :type img_max: int
+    :param min_val: The lower stretching bound
+    :type min_val: int
+    :param max_val: The upper stretching bound
+    :type max_val: int
+    :return: The Lookup Table
+    :rtype: :class:`numpy.ndarray`
+    """
+
+    values = arange(color_depth, dtype=int64)
+    lut = min_val + ((values - int(img_min)) * (max_val - min_val)) / (int(img_max) - int(img_min))
+
+    return clip(trunc(lut), 0, color_depth - 1).astype(int64)
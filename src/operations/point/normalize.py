@@ -1,6 +1,9 @@
+from numpy import nonzero
 from PyQt5.QtWidgets import QDialog
 
+from image.analyze import remap_histogram
 from ..operation import Operation
+from .lut import apply_lut, calc_normalize_lut
 from .normalize_ui import NormalizeUI
 
 
@@ -19,10 +22,17 @@ class Normalize(QDialog, Operation, NormalizeUI):
 
         self.color_depth = parent.color_depth
         self.original_hist = parent.calc_histogram()['b']
-        self.img_data = parent.data.copy()
+        self.img_data = parent.share_data()
         self.current_img_data = None
+        self.current_lut = None
+        self.normalized_fill = None
 
-        self.init_ui(self, [self.img_data.min(), self.img_data.max()])
+        # Find min/max pixel values in the image from its histogram
+        present_values = nonzero(self.original_hist)[0]
+        self.img_min = present_values[0]
+        self.img_max = present_values[-1]
+
+        self.init_ui(self, [self.img_min, self.img_max])
         self.label_txt.setText("Choose the range for normalization:")
         self.setWindowTitle("Normalize")
 
@@ -34,51 +44,19 @@ class Normalize(QDialog, Operation, NormalizeUI):
         self.update_right_value()
         self.update_plot_preview()
 
-    def calc_histogram(self, img_data):
-        """
-        Calculate image histogram data.
-
-        :param img_data: The image data to calculate histogram
-        :type img_data: :class:`numpy.ndarray`
-        :return: The histogram data
-        :rtype: list
-        """
-
-        histogram = [0] * self.color_depth
-
-        for w in range(img_data.shape[0]):
-            for h in range(img_data.shape[1]):
-                pixel = img_data[w][h]
-                histogram[pixel] += 1
-
-        return histogram
-
-    def normalize_histogram(self, min_val, max_val):
+    def calc_stretching_lut(self, min_val, max_val):
         """
-        Calculate histogram normalization:
-
-        - Define min/max pixel values in the image.
-        - Calculate contrast stretching for range: [:attr:`min_val`; :attr:`max_val`]
+        Calculate LUT for contrast stretching of the image to the range [:attr:`min_val`; :attr:`max_val`].
 
         :param min_val: The lower stretching bound
         :type min_val: int
         :param max_val: The upper stretching bound
         :type max_val: int
-        :return: The new updated image data
-        :rtype: class:`numpy.ndarray`
+        :return: The Lookup Table
+        :rtype: :class:`numpy.ndarray`
         """
 
-        img_data = self.img_data.copy()
-
-        img_min = img_data.min()
-        img_max = img_data.max()
-
-        for w in range(img_data.shape[0]):
-            for h in range(img_data.shape[1]):
-                # Linear transformation
-                img_data[w][h] = min_val + (img_data[w][h] - img_min) * (max_val - min_val)/(img_max - img_min)
-
-        return img_data
+        return calc_normalize_lut(self.color_depth, self.img_min, self.img_max, min_val, max_val)
 
     def update_left_value(self):
         """Update :attr:`label_left_value` whenever is changed."""
@@ -94,18 +72,31 @@ class Normalize(QDialog, Operation, NormalizeUI):
         """
         Update histogram preview window.
 
-        Calculate image normalization based on slider range.
-        Draw original and normalized histogram.
+        Calculate normalization LUT based on slider range.
+        Derive the normalized histogram from the original one without touching the pixels.
+        Draw original and normalized histogram, redrawing only the normalized one after the first draw.
         """
 
         min_val = self.range_slider.first_position
         max_val = self.range_slider.second_position
-        img_data = self.normalize_histogram(min_val, max_val)
-        new_hist = self.calc_histogram(img_data)
+        self.current_lut = self.calc_stretching_lut(min_val, max_val)
+        new_hist = remap_histogram(self.original_hist, self.current_lut)
+
+        values = range(self.color_depth)
+        axes = self.hist_canvas.axes
+
+        if self.normalized_fill is None:
+            axes.clear()
+            axes.fill_between(values, self.original_hist, step="mid", color='b', alpha=0.7)
+        else:
+            self.normalized_fill.remove()
+
+        self.normalized_fill = axes.fill_between(values, new_hist, step="mid", color='g', alpha=0.7)
+        axes.set_ylim(0, 1.05 * max(self.original_hist.max(), new_hist.max()))
+        self.hist_canvas.draw_idle()
 
-        self.hist_canvas.axes.clear()
-        self.hist_canvas.axes.bar(range(256), self.original_hist, color='b', alpha=0.7)
-        self.hist_canvas.axes.bar(range(256), new_hist, color='g', alpha=0.7)
-        self.hist_canvas.draw()
+    def accept_changes(self):
+        """Apply normalization LUT of the chosen range to the image data and accept it."""
 
-        self.current_img_data = img_data
+        self.current_img_data = apply_lut(self.img_data, self.current_lut)
+        super().accept_changes()
@@ -0,0 +1,170 @@
+from numpy import arange, nonzero, int64
+
+from image.analyze import calc_cumulative_histogram, remap_histogram
+from .lut import (apply_lut, compose_luts, calc_negation_lut, calc_equalization_lut, calc_posterize_lut,
+                  calc_threshold_binary_lut, calc_threshold_zero_lut, calc_normalize_lut)
+
+
+class PointPipeline:
+    """
+    The PointPipeline class fuses successive point operations into a single LUT.
+
+    Every added operation is composed with the LUT of the previous ones,
+    so applying the pipeline costs one pass over the image regardless of its length.
+    Operations depending on the image content (equalization, normalization)
+    use the histogram of the intermediate image, derived from the source histogram.
+    """
+
+    def __init__(self, color_depth, histogram=None):
+        """
+        Create a new empty pipeline.
+
+        :param color_depth: The number of possible pixel values of the image
+        :type color_depth: int
+        :param histogram: The histogram data of the source image,
+                          required by :meth:`equalization` and :meth:`normalization`
+        :type histogram: :class:`numpy.ndarray` or list[int] or None
+        """
+
+        self.color_depth = color_depth
+        self._source_histogram = histogram
+        self._lut = arange(color_depth, dtype=int64)
+        self._operations = []
+
+    @property
+    def lut(self):
+        """Get :attr:`_lut`, the composed Lookup Table of all added operations."""
+
+        return self._lut
+
+    @property
+    def operations(self):
+        """Get :attr:`_operations`, the names of added operations."""
+
+        return self._operations
+
+    def is_identity(self):
+        """
+        Check if the pipeline doesn't change the image.
+
+        ``True`` if no operation is added, otherwise ``False``.
+
+        :rtype: bool
+        """
+
+        return not self._operations
+
+    def calc_histogram(self):
+        """
+        Calculate the histogram of the image after all added operations.
+
+        :return: The histogram data
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        assert self._source_histogram is not None, ValueError("The pipeline has no source histogram")
+
+        return remap_histogram(self._source_histogram, self._lut, self.color_depth)
+
+    def add_lut(self, lut, name="lut"):
+        """
+        Add a point operation given by its LUT.
+
+        :param lut: The Lookup Table of the operation
+        :type lut: :class:`numpy.ndarray` or list[int]
+        :param name: The name of the operation
+        :type name: str
+        :return: The pipeline itself
+        :rtype: :class:`PointPipeline`
+        """
+
+        self._lut = compose_luts(self._lut, lut)
+        self._operations.append(name)
+        return self
+
+    def negation(self):
+        """Add negation. Return the pipeline itself."""
+
+        return self.add_lut(calc_negation_lut(self.color_depth), "negation")
+
+    def equalization(self):
+        """
+        Add histogram equalization. Return the pipeline itself.
+
+        The operation is skipped if the image has too few distinct values to equalize.
+        """
+
+        lut = calc_equalization_lut(calc_cumulative_histogram(self.calc_histogram()))
+
+        if lut is None:
+            return self
+
+        return self.add_lut(lut, "equalization")
+
+    def posterize(self, bins_num):
+        """
+        Add posterizing. Return the pipeline itself.
+
+        :param bins_num: The number of bins to posterize
+        :type bins_num: int
+        """
+
+        return self.add_lut(calc_posterize_lut(self.color_depth, bins_num), "posterize")
+
+    def threshold_binary(self, thresh_value):
+        """
+        Add threshold binary. Return the pipeline itself.
+
+        :param thresh_value: The value for thresholding
+        :type thresh_value: int
+        """
+
+        return self.add_lut(calc_threshold_binary_lut(self.color_depth, thresh_value), "threshold_binary")
+
+    def threshold_zero(self, thresh_value):
+        """
+        Add threshold to zero. Return the pipeline itself.
+
+        :param thresh_value: The value for thresholding
+        :type thresh_value: int
+        """
+
+        return self.add_lut(calc_threshold_zero_lut(self.color_depth, thresh_value), "threshold_zero")
+
+    def normalization(self, min_val, max_val):
+        """
+        Add contrast stretching to the range [:attr:`min_val`; :attr:`max_val`]. Return the pipeline itself.
+
+        The operation is skipped if the image has the same minimum and maximum pixel value.
+
+        :param min_val: The lower stretching bound
+        :type min_val: int
+        :param max_val: The upper stretching bound
+        :type max_val: int
+        """
+
+        present_values = nonzero(self.calc_histogram())[0]
+        img_min, img_max = present_values[0], present_values[-1]
+
+        if img_min == img_max:
+            return self
+
+        return self.add_lut(calc_normalize_lut(self.color_depth, img_min, img_max, min_val, max_val),
+                            "normalization")
+
+    def apply(self, img_data, inplace=False):
+        """
+        Apply all added operations to the image in a single pass.
+
+        :param img_data: The image data
+        :type img_data: :class:`numpy.ndarray`
+        :param inplace: The flag to write the result into :attr:`img_data` instead of a new array
+        :type inplace: bool
+        :return: The image data after all operations
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        if self.is_identity():
+            return img_data if inplace else img_data.copy()
+
+        return apply_lut(img_data, self._lut, inplace)
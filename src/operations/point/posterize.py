@@ -1,6 +1,7 @@
 from PyQt5.QtWidgets import QDialog
 
 from ..operation import Operation
+from .lut import apply_lut, calc_posterize_lut
 from .posterize_ui import PosterizeUI
 
 
@@ -23,7 +24,7 @@ class Posterize(QDialog, Operation, PosterizeUI):
         self.setWindowTitle("Posterize")
 
         self.color_depth = parent.color_depth
-        self.img_data = parent.data.copy()
+        self.img_data = parent.share_data()
         self.current_img_data = None
 
         self.bins_slider.setMinimum(2)
@@ -37,22 +38,6 @@ class Posterize(QDialog, Operation, PosterizeUI):
         self.update_bins_value()
         self.update_img_preview()
 
-    def __apply_lut(self, lut):
-        """
-        Apply LUT to the image.
-
-        :param lut: The Lookup Table
-        :type lut: list[int]
-        """
-
-        img_data = self.img_data.copy()
-
-        for w in range(img_data.shape[0]):
-            for h in range(img_data.shape[1]):
-                img_data[w][h] = lut[img_data[w][h]]
-
-        return img_data
-
     def calc_posterize_lut(self, bins_num):
         """
         Calculate LUT for posterizing point operation.
@@ -66,20 +51,10 @@ class Posterize(QDialog, Operation, PosterizeUI):
         :param bins_num: The number of bins to posterize
         :type bins_num: int
         :return: The Lookup Table
-        :rtype: list[int]
+        :rtype: :class:`numpy.ndarray`
         """
 
-        lut = []
-        bin_length = self.color_depth // bins_num
-        bins_range = [i * bin_length for i in range(bins_num)]
-
-        for i in range(bins_num - 1):
-            lut.extend([bins_range[i]] * bin_length)
-
-        # Fill the last bin range up to color depth with a maximum pixel value
-        lut.extend([self.color_depth - 1] * (self.color_depth - bins_range[-1]))
-
-        return lut
+        return calc_posterize_lut(self.color_depth, bins_num)
 
     def update_bins_value(self):
         """Update :attr:`label_bins_num` whenever is changed."""
@@ -98,5 +73,5 @@ class Posterize(QDialog, Operation, PosterizeUI):
         bins_num = self.bins_slider.value()
         lut = self.calc_posterize_lut(bins_num)
 
-        self.current_img_data = self.__apply_lut(lut)
+        self.current_img_data = apply_lut(self.img_data, lut)
         super().update_img_preview()
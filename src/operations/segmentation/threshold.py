@@ -1,4 +1,4 @@
-from cv2 import (threshold, adaptiveThreshold, THRESH_BINARY, THRESH_OTSU,
+from cv2 import (threshold, adaptiveThreshold, THRESH_BINARY, THRESH_TOZERO, THRESH_OTSU,
                  ADAPTIVE_THRESH_MEAN_C, ADAPTIVE_THRESH_GAUSSIAN_C,
                  normalize, NORM_MINMAX)
 from numpy import abs
@@ -28,7 +28,7 @@ class Threshold(QDialog, Operation, ThresholdUI):
         self.__retranslate_ui()
 
         self.color_depth = parent.color_depth
-        self.img_data = parent.data.copy()
+        self.img_data = parent.share_data()
         self.current_img_data = None
 
         self.threshold_slider.setMaximum(self.color_depth - 1)
@@ -76,7 +76,7 @@ class Threshold(QDialog, Operation, ThresholdUI):
 
         self.update_img_preview()
 
-    def calc_threshold_binary(self, thresh_value):
+    def calc_threshold_binary(self, thresh_value, img_data=None):
         """
         Calculate threshold binary point operation.
 
@@ -87,19 +87,24 @@ class Threshold(QDialog, Operation, ThresholdUI):
 
         :param thresh_value: The value for thresholding
         :type thresh_value: int
+        :param img_data: The image data to calculate on, by default it's :attr:`img_data`
+        :type img_data: class:`numpy.ndarray` or None
         :return: The new thresholded image data
         :rtype: class:`numpy.ndarray`
         """
 
-        img_data = self.img_data.copy()
+        if img_data is None:
+            img_data = self.img_data
+
+        if img_data.dtype.itemsize == 1:
+            return threshold(img_data, thresh_value, self.color_depth - 1, THRESH_BINARY)[1]
 
-        for w in range(img_data.shape[0]):
-            for h in range(img_data.shape[1]):
-                img_data[w][h] = self.color_depth - 1 if img_data[w][h] > thresh_value else 0
+        img_data = (img_data > thresh_value).astype(img_data.dtype)
+        img_data *= self.color_depth - 1
 
         return img_data
 
-    def calc_threshold_zero(self, thresh_value):
+    def calc_threshold_zero(self, thresh_value, img_data=None):
         """
         Calculate threshold to zero point operation.
 
@@ -108,20 +113,22 @@ class Threshold(QDialog, Operation, ThresholdUI):
 
         :param thresh_value: The value for thresholding
         :type thresh_value: int
+        :param img_data: The image data to calculate on, by default it's :attr:`img_data`
+        :type img_data: class:`numpy.ndarray` or None
         :return: The new thresholded image data
         :rtype: class:`numpy.ndarray`
         """
 
-        img_data = self.img_data.copy()
+        if img_data is None:
+            img_data = self.img_data
 
-        for w in range(img_data.shape[0]):
-            for h in range(img_data.shape[1]):
-                if img_data[w][h] < thresh_value:
-                    img_data[w][h] = 0
+        # OpenCV keeps only pixels higher than the threshold, so lower it by one to keep equal pixels
+        if img_data.dtype.itemsize == 1:
+            return threshold(img_data, thresh_value - 1, self.color_depth - 1, THRESH_TOZERO)[1]
 
-        return img_data
+        return img_data * (img_data >= thresh_value)
 
-    def calc_adaptive_thresh(self, method, block_size):
+    def calc_adaptive_thresh(self, method, block_size, img_data=None):
         """
         Calculate adaptive threshold based on method and block size.
 
@@ -129,34 +136,52 @@ class Threshold(QDialog, Operation, ThresholdUI):
         :type method: str
         :param block_size: The value for block size
         :type block_size: int
+        :param img_data: The image data to calculate on, by default it's :attr:`img_data`
+        :type img_data: class:`numpy.ndarray` or None
         :return: The new thresholded image data
         :rtype: class:`numpy.ndarray`
         """
 
-        # Validate block size value to be odd
-        if block_size % 2 == 0:
-            block_size -= 1
-            self.threshold_slider.setProperty("value", block_size)
+        if img_data is None:
+            img_data = self.img_data
 
         # Conversion, adaptive threshold operates only on uint8 data type
-        if self.img_data.dtype.itemsize > 1:
-            img_data = normalize(abs(self.img_data), None, 0, 255, NORM_MINMAX, dtype=0)
-        else:
-            img_data = self.img_data
+        if img_data.dtype.itemsize > 1:
+            img_data = normalize(abs(img_data), None, 0, 255, NORM_MINMAX, dtype=0)
 
         adaptive_method = ADAPTIVE_THRESH_MEAN_C if method == "Mean" else ADAPTIVE_THRESH_GAUSSIAN_C
 
         return adaptiveThreshold(img_data, 255, adaptive_method, THRESH_BINARY, block_size, 5)
 
-    def calc_theshold_otsu(self):
-        """Calculate Otsu's thresholding."""
+    def calc_theshold_otsu(self, img_data=None):
+        """
+        Calculate Otsu's thresholding.
+
+        :param img_data: The image data to calculate on, by default it's :attr:`img_data`
+        :type img_data: class:`numpy.ndarray` or None
+        :return: The pair: found threshold value and the new thresholded image data
+        :rtype: tuple[float, class:`numpy.ndarray`]
+        """
+
+        if img_data is None:
+            img_data = self.img_data
+
+        return threshold(img_data, 0, self.color_depth-1, THRESH_BINARY + THRESH_OTSU)
+
+    def show_otsu_preview(self, otsu_result):
+        """
+        Show the threshold value found by Otsu's thresholding and the thresholded image data.
+
+        :param otsu_result: The result of :meth:`calc_theshold_otsu`
+        :type otsu_result: tuple[float, class:`numpy.ndarray`]
+        """
 
-        thresh_value, img_data = threshold(self.img_data, 0, self.color_depth-1, THRESH_BINARY + THRESH_OTSU)
+        thresh_value, img_data = otsu_result
 
         self.label_slider_value.setText(str(int(thresh_value)))
         self.threshold_slider.setProperty("value", thresh_value)
 
-        return img_data
+        self.show_img_preview(img_data)
 
     def update_slider_value(self):
         """Update :attr:`label_slider_value` whenever is changed."""
@@ -167,7 +192,7 @@ class Threshold(QDialog, Operation, ThresholdUI):
         """
         Update image preview window.
 
-        - Calculate image thresholding based on type and slider value.
+        - Calculate image thresholding based on type and slider value in the background.
         - Reload image preview using the base :class:`operation.Operation` method.
         """
 
@@ -175,15 +200,18 @@ class Threshold(QDialog, Operation, ThresholdUI):
         slider_value = self.threshold_slider.value()
 
         if threshold_type == "Threshold Binary":
-            img_data = self.calc_threshold_binary(slider_value)
+            self.run_img_preview(self.calc_threshold_binary, slider_value)
         elif threshold_type == "Threshold Zero":
-            img_data = self.calc_threshold_zero(slider_value)
-        elif threshold_type == "Adaptive Mean Threshold":
-            img_data = self.calc_adaptive_thresh("Mean", slider_value)
-        elif threshold_type == "Adaptive Gaussian Threshold":
-            img_data = self.calc_adaptive_thresh("Gaussian", slider_value)
-        else:
-            img_data = self.calc_theshold_otsu()
+            self.run_img_preview(self.calc_threshold_zero, slider_value)
+        elif threshold_type in ("Adaptive Mean Threshold", "Adaptive Gaussian Threshold"):
+            method = "Mean" if threshold_type == "Adaptive Mean Threshold" else "Gaussian"
 
-        self.current_img_data = img_data
-        super().update_img_preview()
+            # Validate block size value to be odd
+            if slider_value % 2 == 0:
+                slider_value -= 1
+                self.threshold_slider.setProperty("value", slider_value)
+
+            self.run_img_preview(self.calc_adaptive_thresh, method, slider_value,
+                                 scale_args=lambda scale: (method, self.scale_kernel_size(slider_value, 3, scale)))
+        else:
+            self.run_img_preview(self.calc_theshold_otsu, on_result=self.show_otsu_preview)
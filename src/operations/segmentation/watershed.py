@@ -30,7 +30,7 @@ class Watershed(QDialog, Operation, WatershedUI):
         self.init_ui(self)
         self.__retranslate_ui()
 
-        self.img_data = parent.data.copy()
+        self.img_data = parent.share_data()
         self.current_img_data = None
 
         obj_count, self.preview = self.calc_watershed(self.img_data)
@@ -99,7 +99,8 @@ class Watershed(QDialog, Operation, WatershedUI):
         markers2 = watershed(img_color, markers)
         obj_count = max(markers2)
 
-        # Add object border lines for color and grayscale image data
+        # Add object border lines for color and grayscale image data, the given image data may be shared read-only
+        img_color = img_color.copy()
         img_gray[markers2 == -1] = 255
         img_color[markers2 == -1] = [0, 0, 255]
 
@@ -0,0 +1,19 @@
+from os import environ, path
+import sys
+
+import pytest
+from PyQt5.QtWidgets import QApplication
+
+# The program imports its modules relative to src, and the constants relative to the repository root
+ROOT_PATH = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path[:0] = [ROOT_PATH, path.join(ROOT_PATH, "src")]
+
+# Widgets are created without a display
+environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture(scope="session")
+def app():
+    """The application, which runs the event loop of signals queued across threads."""
+
+    return QApplication.instance() or QApplication([])
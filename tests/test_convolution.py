@@ -0,0 +1,20 @@
+import pytest
+from cv2 import CV_32F, CV_64F, BORDER_REFLECT_101
+from numpy import array_equal, float32
+from numpy.random import default_rng
+
+import image  # noqa: F401, the image package must be imported before the operations
+from operations.local import Convolution, Tiling
+
+
+@pytest.mark.parametrize("ksize, ddepth", [(3, CV_32F), (15, CV_32F), (9, CV_64F), (31, CV_32F)])
+def test_tiled_equals_untiled(ksize, ddepth):
+    """The image convolved tile by tile is the same as convolved at once, also if DFT is used."""
+
+    rng = default_rng(0)
+    img_data = rng.random((3000, 3000), float32)
+    convolution = Convolution(rng.random((ksize, ksize)), ddepth)
+
+    assert Tiling.TILE_PIXELS < img_data.size
+    assert array_equal(convolution.apply_tiled(img_data, BORDER_REFLECT_101),
+                       convolution.apply(img_data, BORDER_REFLECT_101))
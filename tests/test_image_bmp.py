@@ -0,0 +1,72 @@
+from struct import pack
+
+import pytest
+from cv2 import normalize, NORM_MINMAX
+from numpy import array_equal, stack, full, uint8, int16
+from numpy.random import default_rng
+
+import image  # noqa: F401, the image package must be imported before the operations
+from image.image_bmp import ImageBmp
+
+
+def test_save_over_opened_file(tmp_path):
+    """Saving the memory-mapped pixels of the opened BMP over its own file keeps the image."""
+
+    img_data = default_rng(0).integers(0, 256, (300, 401, 3), uint8)
+    file_path = str(tmp_path / "image.bmp")
+    ImageBmp.save(file_path, img_data)
+
+    assert ImageBmp.save(file_path, ImageBmp.open(file_path).pixels)
+
+    assert array_equal(ImageBmp.open(file_path).pixels, img_data)
+    assert not (tmp_path / "image.bmp.tmp").exists()
+
+
+def test_failed_save_keeps_file(tmp_path):
+    """The existing file is kept intact if saving fails partway through."""
+
+    file_path = str(tmp_path / "image.bmp")
+    ImageBmp.save(file_path, default_rng(0).integers(0, 256, (300, 400), uint8))
+    content = (tmp_path / "image.bmp").read_bytes()
+
+    def fail(written_rows, rows_num):
+        raise OSError("No space left on device")
+
+    with pytest.raises(OSError):
+        ImageBmp.save(file_path, default_rng(1).integers(0, 256, (300, 400), uint8), fail)
+
+    assert (tmp_path / "image.bmp").read_bytes() == content
+    assert not (tmp_path / "image.bmp.tmp").exists()
+
+
+def test_save_signed_data(tmp_path):
+    """Signed data is saved as its absolute values normalized to 8 bits, as the image converts it."""
+
+    img_data = default_rng(0).integers(-1000, 500, (300, 400), int16)
+    file_path = str(tmp_path / "image.bmp")
+    ImageBmp.save(file_path, img_data)
+
+    assert array_equal(ImageBmp.open(file_path).pixels, normalize(abs(img_data), None, 0, 255, NORM_MINMAX, dtype=0))
+
+
+def test_read_rle_as_decoded(tmp_path):
+    """The RLE8 image read by OpenCV is the same as decoded by own implementation."""
+
+    rng = default_rng(0)
+    width, height = 160, 50
+    color_table = rng.integers(0, 256, (256, 4), uint8)
+    runs = rng.integers(0, 256, (height, width // 16), uint8)
+
+    # Every row consists of runs of 16 pixels and ends with the end-of-line escape
+    data = b"".join(stack((full(width // 16, 16, uint8), row), axis=1).tobytes() + b"\0\0" for row in runs) + b"\0\1"
+    data_offset = ImageBmp.FILE_HEADER_SIZE + ImageBmp.INFO_HEADER_SIZE + color_table.nbytes
+    file_path = tmp_path / "image.bmp"
+    file_path.write_bytes(pack("<2sIHHI", b"BM", data_offset + len(data), 0, 0, data_offset) +
+                          pack("<IiiHHIIiiII", ImageBmp.INFO_HEADER_SIZE, width, height, 1, 8, ImageBmp.BI_RLE8,
+                               len(data), 0, 0, 0, 0) + color_table.tobytes() + data)
+
+    bmp_image = ImageBmp.open(str(file_path))
+
+    assert bmp_image.is_decoded_faster_by_opencv()
+    assert array_equal(ImageBmp.read(str(file_path)), bmp_image.pixels)
+    assert array_equal(bmp_image.pixels, color_table[runs.repeat(16, axis=1)[::-1], :3])
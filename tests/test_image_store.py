@@ -0,0 +1,27 @@
+from os import path
+
+import image  # noqa: F401, the image package must be imported before the operations
+from image import image_store
+from image.image_store import ImageStore
+
+
+def test_locked_file_removed_at_exit(tmp_path, monkeypatch):
+    """The temporary file, which can't be removed on closing, e.g. still mapped on Windows, is removed at exit."""
+
+    store = ImageStore((100, 200), "uint8", directory=str(tmp_path))
+    file_path = store._file_path
+
+    def locked_remove(locked_path):
+        raise PermissionError(f"The file '{locked_path}' is used by another process")
+
+    with monkeypatch.context() as context:
+        context.setattr(image_store, "remove", locked_remove)
+        store.close()
+
+    assert path.exists(file_path)
+    assert file_path in ImageStore._pending_removals
+
+    ImageStore.remove_pending_files()
+
+    assert not path.exists(file_path)
+    assert file_path not in ImageStore._pending_removals
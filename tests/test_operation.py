@@ -0,0 +1,32 @@
+from threading import current_thread, main_thread
+
+import image  # noqa: F401, the image package must be imported before the operations
+from operations.operation import Operation
+
+
+class LevelsOperation(Operation):
+    """The operation with fixed preview levels and no widgets."""
+
+    def __init__(self, levels):
+        self.levels = levels
+
+    def get_preview_levels(self):
+        return self.levels
+
+
+def test_preview_levels_calculated_in_background(app):
+    """No preview level is calculated on the GUI thread, all of them are shown from coarse to fine."""
+
+    operation = LevelsOperation([(0.25, "coarse"), (0.5, "middle"), (1, "fine")])
+    threads, results = [], []
+
+    def calc(offset, img_data):
+        threads.append(current_thread())
+        return img_data, offset
+
+    operation.run_img_preview(calc, 1, on_result=results.append)
+    while operation.preview_executor.is_busy():
+        app.processEvents()
+
+    assert main_thread() not in threads
+    assert results == [("coarse", 1), ("middle", 1), ("fine", 1)]